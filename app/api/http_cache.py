@@ -0,0 +1,118 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+from fastapi import Request
+from fastapi.responses import Response
+from config import settings
+
+# Encodings the compression middleware appends to a strong ETag ("<tag>-gzip"),
+# so each encoded representation has its own validator
+ENCODING_SUFFIXES = ("-br", "-gzip")
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from the parts that identify a representation (route, params, data version)."""
+    return '"' + hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest() + '"'
+
+
+def _base_etag(tag: str) -> str:
+    tag = tag.strip()
+    for suffix in ENCODING_SUFFIXES:
+        if tag.endswith(suffix + '"'):
+            return tag[:-len(suffix) - 1] + '"'
+    return tag
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for GET; encoding suffixes ignored)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (_base_etag(tag.strip().removeprefix("W/")) for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def cache_control(expires_at: float | None) -> str:
+    """Browser caching that ends when the cached series behind the response expires.
+
+    The series TTL follows market hours (minutes while the session is open,
+    until the next open otherwise). A stale series served while it refreshes,
+    or one that is not cached at all (expires_at None), gets max-age=0.
+    """
+    max_age = max(0, int(expires_at - time.time())) if expires_at is not None else 0
+    return f"public, max-age={max_age}, stale-while-revalidate={settings.HTTP_STALE_WHILE_REVALIDATE}"
+
+
+class ResponseCache:
+    """Byte-bounded LRU of rendered response bodies keyed by ETag.
+
+    The ETag already encodes the data version, so entries never need
+    invalidating: new data means a new key, and old ones age out.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[bytes, str]] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, etag: str) -> tuple[bytes, str] | None:
+        entry = self._entries.get(etag)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(etag)
+        self.hits += 1
+        return entry
+
+    def put(self, etag: str, body: bytes, media_type: str):
+        if len(body) > self.max_bytes or etag in self._entries:
+            return
+        self._entries[etag] = (body, media_type)
+        self._bytes += len(body)
+        while self._bytes > self.max_bytes:
+            _, (old_body, _) = self._entries.popitem(last=False)
+            self._bytes -= len(old_body)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+        }
+
+
+def cached_response(request: Request, etag: str, render, expires_at: float | None, vary: str | None = None) -> Response:
+    """Answers 304 when the client already has `etag`, else serves the cached or freshly rendered body.
+
+    render() returns the Response to cache; only 200 responses are stored.
+    `expires_at` is the expiry of the series the body is built from (see cache_control).
+    `vary` names the request headers the representation was negotiated from
+    (e.g. "Accept"); it is sent on 304s too, so shared caches key on it.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control(expires_at)}
+    if vary:
+        headers["Vary"] = vary
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    cached = response_cache.get(etag)
+    if cached is not None:
+        body, media_type = cached
+        return Response(content=body, media_type=media_type, headers=headers)
+    response = render()
+    if response.status_code == 200:
+        response_cache.put(etag, bytes(response.body), response.media_type)
+    response.headers.update(headers)
+    return response
+
+
+# Shared cache for rendered pages and chart data
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MAX_BYTES)
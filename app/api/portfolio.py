@@ -0,0 +1,121 @@
+from fastapi import APIRouter, Body, HTTPException
+from fastapi.responses import Response
+import pandas as pd
+from app.services.stock_analyzer import fetch_many
+from app.services.portfolio import align_prices, analyze_portfolio, price_column
+from app.services.cache import frame_version
+from app.services.rate_limiter import RateLimitExceeded
+from app.services.executor import cpu_pool
+from app.api.http_cache import make_etag, response_cache
+from app.api.responses import json_response
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+def _portfolio_body(symbols: list[str], frames: list[pd.DataFrame], weights: list[float], benchmark_frame: pd.DataFrame | None,
+                    confidence: float, window: int, covariance: bool, meta: dict) -> bytes:
+    """Aligns the series, runs the analytics and serializes them (runs on the worker pool)."""
+    dates, prices = align_prices(frames + ([benchmark_frame] if benchmark_frame is not None else []))
+    benchmark = None
+    if benchmark_frame is not None:
+        prices, benchmark = prices[:, :-1], prices[:, -1]
+    analysis = analyze_portfolio(dates, prices, weights, benchmark, confidence=confidence, window=window)
+    if not covariance:
+        # Half the body for large universes; it is correlation * outer(volatility, volatility)
+        del analysis["covariance"]
+    return bytes(json_response({"symbols": symbols, **meta, **analysis}).body)
+
+def _price_frames(frames: list[pd.DataFrame]) -> list[pd.DataFrame]:
+    """Only the price column of each series, which is all the analytics read.
+
+    Arguments to the process pool are pickled; the full OHLC frames would
+    send about four times as much (some 80 MB for 500 symbols x 10 years).
+    """
+    return [df[[price_column(df)]] for df in frames]
+
+@router.post("/analyze") # Risk and return of a weighted basket of symbols
+async def analyze_portfolio_api(
+    symbols: list[str] = Body(..., description="Stock symbols in the portfolio, e.g. [\"AAPL\", \"MSFT\"]"),
+    weights: list[float] | None = Body(None, description="Target weights in the same order as symbols (normalized to sum to 1); equal weights if omitted"),
+    benchmark: str | None = Body(settings.PORTFOLIO_BENCHMARK, description="Benchmark symbol for beta, or \"\" for none"),
+    period: str = Body("5y", description="History to analyze e.g., 1y, 5y, 10y, max"),
+    confidence: float = Body(0.95, gt=0.5, lt=1.0, description="VaR/CVaR confidence level"),
+    window: int = Body(21, ge=2, le=252, description="Rolling volatility window in trading days"),
+    covariance: bool = Body(False, description="Also return the annualized covariance matrix"),
+):
+    requested = [s.strip().upper() for s in symbols if s.strip()]
+    if not requested:
+        raise HTTPException(status_code=400, detail="At least one symbol is required.")
+    if len(requested) > settings.PORTFOLIO_MAX_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.PORTFOLIO_MAX_SYMBOLS} symbols per portfolio.")
+    if len(set(requested)) != len(requested):
+        raise HTTPException(status_code=400, detail="Each symbol may appear only once.")
+    if weights is None:
+        weights = [1.0] * len(requested)
+    if len(weights) != len(requested):
+        raise HTTPException(status_code=400, detail="weights must have one entry per symbol.")
+    if sum(weights) <= 0:
+        raise HTTPException(status_code=400, detail="weights must sum to a positive number.")
+    benchmark = benchmark.strip().upper() if benchmark and benchmark.strip() else None
+    logger.info("Portfolio analysis requested for %s symbols, period: %s, benchmark: %s", len(requested), period, benchmark)
+
+    try:
+        # Same cache and upstream path as single-symbol requests
+        results = await fetch_many(requested + ([benchmark] if benchmark and benchmark not in requested else []), period=period)
+        limited = [result for result in results.values() if isinstance(result, RateLimitExceeded)]
+        if limited:
+            retry_after = max(e.retry_after for e in limited)
+            logger.warning("Upstream rate limit hit for %s portfolio symbols", len(limited))
+            raise HTTPException(status_code=429, detail="Upstream rate limit reached, please retry shortly.", headers={"Retry-After": str(int(retry_after) + 1)})
+
+        # Symbols without data are left out (and reported); the remaining weights are renormalized
+        symbols_used, frames, weights_used, excluded = [], [], [], {}
+        for symbol, weight in zip(requested, weights):
+            result = results[symbol]
+            if isinstance(result, Exception):
+                logger.error("Portfolio fetch failed for %s: %s", symbol, result)
+                excluded[symbol] = "Error fetching stock data."
+            elif result.empty:
+                excluded[symbol] = f"No data found for {symbol}"
+            else:
+                symbols_used.append(symbol)
+                frames.append(result)
+                weights_used.append(weight)
+        if not frames:
+            raise HTTPException(status_code=404, detail="No data found for any symbol in the portfolio.")
+        if sum(weights_used) <= 0:
+            raise HTTPException(status_code=400, detail="Weights of the symbols with data must sum to a positive number.")
+
+        benchmark_frame = results.get(benchmark) if benchmark else None
+        if benchmark_frame is not None and (isinstance(benchmark_frame, Exception) or benchmark_frame.empty):
+            excluded.setdefault(benchmark, "Benchmark has no data; beta is omitted.")
+            benchmark_frame = None
+
+        # Cached per universe, weights, parameters and data version (the last bar of every series)
+        etag = make_etag(
+            "portfolio", tuple(symbols_used), tuple(weights_used), benchmark if benchmark_frame is not None else None,
+            period, confidence, window, covariance, tuple(frame_version(df) for df in frames),
+            frame_version(benchmark_frame) if benchmark_frame is not None else None,
+        )
+        cached = response_cache.get(etag)
+        if cached is not None:
+            body, media_type = cached
+            return Response(content=body, media_type=media_type, headers={"ETag": etag})
+
+        meta = {"benchmark": benchmark if benchmark_frame is not None else None, "period": period, "excluded": excluded}
+        try:
+            body = await cpu_pool.run(
+                _portfolio_body, symbols_used, _price_frames(frames), weights_used,
+                _price_frames([benchmark_frame])[0] if benchmark_frame is not None else None, confidence, window, covariance, meta,
+            )
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=str(ve))
+        response_cache.put(etag, body, "application/json")
+        return Response(content=body, media_type="application/json", headers={"ETag": etag})
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error analyzing portfolio of %s symbols: %s", len(requested), e, exc_info=True)
+        raise HTTPException(status_code=500, detail="Error analyzing portfolio.")
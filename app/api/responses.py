@@ -0,0 +1,128 @@
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+# Fast JSON encoding is optional: orjson serializes NumPy arrays directly
+try:
+    import orjson
+except ImportError: # pragma: no cover - depends on the environment
+    orjson = None
+
+# Arrow IPC output is optional and only offered when pyarrow is installed
+try:
+    import pyarrow as pa
+except ImportError: # pragma: no cover - depends on the environment
+    pa = None
+
+# Response formats for chart data, selected by ?format= or the Accept header
+FORMAT_SPLIT = "split" # Legacy pandas orient='split' (row lists)
+FORMAT_COLUMNS = "columns" # One JSON array per field, epoch-ms dates
+FORMAT_BINARY = "binary" # Raw little-endian columns behind a small JSON header
+FORMAT_ARROW = "arrow" # Arrow IPC stream
+FORMATS = (FORMAT_SPLIT, FORMAT_COLUMNS, FORMAT_BINARY, FORMAT_ARROW)
+
+BINARY_MEDIA_TYPE = "application/octet-stream"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+ACCEPT_FORMATS = {BINARY_MEDIA_TYPE: FORMAT_BINARY, ARROW_MEDIA_TYPE: FORMAT_ARROW}
+# Vary header for responses whose format can come from Accept (the same URL has several bodies)
+NEGOTIATED_VARY = "Accept"
+
+BINARY_MAGIC = b"FTC1"
+
+
+def negotiate_format(format_param: str | None, accept: str | None) -> str:
+    """Picks the response format: an explicit ?format= wins, then the Accept header, then 'split'."""
+    if format_param:
+        fmt = format_param.lower()
+        if fmt not in FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unknown format '{format_param}'. Use one of: {', '.join(FORMATS)}")
+    else:
+        fmt = FORMAT_SPLIT
+        for media_type in (accept or "").split(","):
+            media_type = media_type.split(";")[0].strip().lower()
+            if media_type in ACCEPT_FORMATS:
+                fmt = ACCEPT_FORMATS[media_type]
+                break
+    if fmt == FORMAT_ARROW and pa is None:
+        raise HTTPException(status_code=406, detail="Arrow format requires pyarrow, which is not installed.")
+    return fmt
+
+
+def epoch_ms(index: pd.DatetimeIndex) -> np.ndarray:
+    """DatetimeIndex as int64 milliseconds since the epoch (what JS Date and Plotly accept)."""
+    return index.values.astype("datetime64[ms]").astype(np.int64)
+
+
+def column_arrays(df: pd.DataFrame, float32: bool = False) -> dict[str, np.ndarray]:
+    """DataFrame columns as contiguous float arrays (float32 halves the payload, at ~7 significant digits)."""
+    dtype = np.float32 if float32 else np.float64
+    return {column: np.ascontiguousarray(df[column].to_numpy(dtype=dtype)) for column in df.columns}
+
+
+def json_response(payload) -> Response:
+    """Serializes with orjson (NumPy-aware, NaN -> null) when available, else the stdlib."""
+    if orjson is not None:
+        body = orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    else:
+        body = json.dumps(_to_builtin(payload), allow_nan=False).encode()
+    return Response(content=body, media_type="application/json")
+
+
+def _to_builtin(value):
+    if isinstance(value, dict):
+        return {k: _to_builtin(v) for k, v in value.items()}
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == "f":
+            return np.where(np.isnan(value), None, value).tolist()
+        return value.tolist()
+    return value
+
+
+def columnar_payload(df: pd.DataFrame, float32: bool = False) -> dict:
+    """Column-oriented payload: {"index": [epoch ms...], "columns": {name: [...]}}."""
+    return {"index": epoch_ms(df.index), "columns": column_arrays(df, float32)}
+
+
+def binary_body(df: pd.DataFrame, float32: bool = False) -> bytes:
+    """Raw little-endian encoding of a DataFrame.
+
+    Layout: b"FTC1", uint32 header length, UTF-8 JSON header
+    {"rows", "columns", "dtype"} padded with spaces to an 8-byte boundary,
+    then the int64 epoch-ms index, then each column in header order.
+    Every array starts 8-byte aligned so clients can view it with typed arrays.
+    """
+    dtype = "<f4" if float32 else "<f8"
+    header = json.dumps({"rows": len(df), "columns": list(df.columns), "dtype": dtype, "index": "<i8 epoch ms"}).encode()
+    header += b" " * (-(len(BINARY_MAGIC) + 4 + len(header)) % 8)
+    parts = [BINARY_MAGIC, struct.pack("<I", len(header)), header, epoch_ms(df.index).astype("<i8").tobytes()]
+    for values in column_arrays(df, float32).values():
+        data = values.astype(dtype).tobytes()
+        parts.append(data + b"\0" * (-len(data) % 8))
+    return b"".join(parts)
+
+
+def arrow_body(df: pd.DataFrame, float32: bool = False) -> bytes:
+    """Arrow IPC stream with a timestamp[ms] 'Date' column followed by the data columns."""
+    arrays = [pa.array(df.index.values.astype("datetime64[ms]"))]
+    names = ["Date"]
+    for column, values in column_arrays(df, float32).items():
+        arrays.append(pa.array(values, from_pandas=True)) # NaN -> null
+        names.append(column)
+    table = pa.Table.from_arrays(arrays, names=names)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def frame_response(df: pd.DataFrame, fmt: str, float32: bool = False) -> Response:
+    """Builds the chart-data response for a negotiated format (everything except legacy 'split')."""
+    if fmt == FORMAT_BINARY:
+        return Response(content=binary_body(df, float32), media_type=BINARY_MEDIA_TYPE)
+    if fmt == FORMAT_ARROW:
+        return Response(content=arrow_body(df, float32), media_type=ARROW_MEDIA_TYPE)
+    return json_response(columnar_payload(df, float32))
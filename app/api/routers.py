@@ -1,6 +1,21 @@
 from fastapi import APIRouter
-from app.api import stock, sentiment # Use . for relative imports if preferred and works with your run structure
+from fastapi.responses import JSONResponse, Response
+from app.api import stock, sentiment, portfolio # Use . for relative imports if preferred and works with your run structure
+from config import settings
+from app.services.http_client import http_client
+from app.services.cache import stock_cache
+from app.services.rate_limiter import alpha_vantage_limiter, news_api_limiter
+from app.services.stock_analyzer import series_flights
+from app.services.sentiment_analyzer import news_flights
+from app.services.quote_stream import quote_hub
+from app.services.executor import cpu_pool, loop_monitor
+from app.services.news_store import news_store
+from app.services.series_store import series_store
+from app.services.shared_state import shared_state
+from app.services.metrics import CONTENT_TYPE, registry
+from app.api.http_cache import response_cache
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
@@ -10,10 +25,104 @@ api_router = APIRouter()
 api_router.include_router(stock.router, prefix="/stocks", tags=["Stocks"])
 # Include sentiment routes
 api_router.include_router(sentiment.router, prefix="/sentiment", tags=["Sentiment"])
+# Include portfolio routes
+api_router.include_router(portfolio.router, prefix="/portfolio", tags=["Portfolio"])
+
+# Scrape-time metrics read from the services' own counters
+_CACHES = {"stock": stock_cache, "response": response_cache}
+_LIMITERS = {"alpha_vantage": alpha_vantage_limiter, "news_api": news_api_limiter}
+_FLIGHTS = {"alpha_vantage": series_flights, "news_api": news_flights}
+
+def _cache_lookups():
+    for name, cache in _CACHES.items():
+        stats = cache.stats()
+        yield {"cache": name, "result": "hit"}, stats["hits"]
+        yield {"cache": name, "result": "miss"}, stats["misses"]
+        if "stale_hits" in stats:
+            yield {"cache": name, "result": "stale_hit"}, stats["stale_hits"]
+
+def _cache_hit_ratio():
+    for name, cache in _CACHES.items():
+        stats = cache.stats()
+        lookups = stats["hits"] + stats.get("stale_hits", 0) + stats["misses"]
+        if lookups:
+            yield {"cache": name}, (stats["hits"] + stats.get("stale_hits", 0)) / lookups
+
+registry.callback("cache_lookups_total", "Cache lookups, by cache and result.", _cache_lookups, type="counter")
+registry.callback("cache_hit_ratio", "Share of cache lookups served from the cache (fresh or stale).", _cache_hit_ratio)
+registry.callback("cache_bytes", "Bytes held in each cache.", lambda: [({"cache": name}, cache.stats()["bytes"]) for name, cache in _CACHES.items()])
+registry.callback("upstream_rate_limit_tokens", "Upstream calls currently available in each provider's budget.",
+                  lambda: [({"provider": name}, limiter.stats()["tokens_available"]) for name, limiter in _LIMITERS.items()])
+registry.callback("upstream_rate_limited_total", "Upstream calls rejected by the local rate limiter.",
+                  lambda: [({"provider": name}, limiter.rejected) for name, limiter in _LIMITERS.items()], type="counter")
+registry.callback("upstream_coalesced_total", "Upstream calls avoided by coalescing identical in-flight requests.",
+                  lambda: [({"provider": name}, flight.coalesced) for name, flight in _FLIGHTS.items()], type="counter")
+registry.callback("upstream_connections_in_use", "Pooled upstream connections in use.", lambda: [({}, http_client.stats()["connections_in_use"])])
+registry.callback("event_loop_lag_seconds", "Event-loop lag over the recent window (mean, p99, max).",
+                  lambda: [({"stat": stat}, loop_monitor.stats().get(f"{stat}_ms", float("nan")) / 1000) for stat in ("mean", "p99", "window_max")])
+registry.callback("worker_pool_in_flight", "Tasks running or queued on the CPU worker pool.", lambda: [({}, cpu_pool.in_flight)])
+registry.callback("worker_pool_busy_seconds_total", "Time spent in worker pool tasks.", lambda: [({}, cpu_pool.busy_seconds)], type="counter")
+registry.callback("shared_state_events_total", "Series taken from other workers and fetches left to the worker holding the lease.",
+                  lambda: [({"event": "series_hit"}, shared_state.series_hits), ({"event": "lease_wait"}, shared_state.lease_waits)] if shared_state else [],
+                  type="counter")
+registry.callback("quote_stream_subscriptions", "Open quote stream subscriptions.", lambda: [({}, quote_hub.stats()["subscriptions"])])
+
+@api_router.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
+
+def _writable(path: str) -> bool:
+    # A directory that does not exist yet is fine as long as it can be created
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            return False
+        path = parent
+    return os.access(path, os.W_OK)
+
+async def _dependency_checks() -> dict:
+    """Real state of each dependency: "ok", or a short reason it is not."""
+    lag = loop_monitor.stats()
+    checks = {
+        "http_client": "ok" if http_client.stats()["started"] else "not started",
+        "news_store": "ok" if await news_store.ping() else "unavailable",
+        "series_store": "ok" if not settings.INCREMENTAL_UPDATES or _writable(series_store.root) else "not writable",
+        "alpha_vantage": "not configured" if not settings.ALPHA_VANTAGE_API_KEY else ("rate limited" if alpha_vantage_limiter.stats()["tokens_available"] < 1 else "ok"),
+        "news_api": "not configured" if not settings.NEWS_API_KEY else ("rate limited" if news_api_limiter.stats()["tokens_available"] < 1 else "ok"),
+        "event_loop": "ok" if lag.get("p99_ms", 0) <= settings.HEALTH_MAX_LOOP_LAG_MS else f"lagging (p99 {lag['p99_ms']} ms)",
+    }
+    if shared_state is not None:
+        checks["shared_state"] = "ok" if await shared_state.ping() else "unavailable"
+    return checks
+
+# Without these nothing can be served; anything else only degrades the API
+CRITICAL_DEPENDENCIES = ("http_client", "news_store", "series_store", "shared_state")
 
 @api_router.get("/health")
 async def health_check():
-    logger.info("API health check accessed.")
-    return {"status": "healthy", "message": "API is operational"}
+    logger.debug("API health check accessed.")
+    checks = await _dependency_checks()
+    if any(checks.get(name, "ok") != "ok" for name in CRITICAL_DEPENDENCIES):
+        status = "unhealthy"
+    elif any(result != "ok" for result in checks.values()):
+        status = "degraded"
+    else:
+        status = "healthy"
+    return JSONResponse(status_code=503 if status == "unhealthy" else 200, content={
+        "status": status,
+        "message": "API is operational" if status != "unhealthy" else "A required dependency is unavailable",
+        "checks": checks,
+        "worker_pid": os.getpid(), # Each worker process answers with its own counters
+        "http_client": http_client.stats(),
+        "stock_cache": stock_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "upstream": {
+            "alpha_vantage": {**alpha_vantage_limiter.stats(), **series_flights.stats()},
+            "news_api": {**news_api_limiter.stats(), **news_flights.stats()},
+        },
+        "quote_stream": quote_hub.stats(),
+        "worker_pool": cpu_pool.stats(),
+        "event_loop_lag": loop_monitor.stats(),
+    })
 
-logger.info("API router configured with stock and sentiment routes.") 
\ No newline at end of file
+logger.info("API router configured with stock, sentiment and portfolio routes.")
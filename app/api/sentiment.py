@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Query, HTTPException
-from app.services.sentiment_analyzer import fetch_news_sentiment, analyze_text_sentiment
+from fastapi import APIRouter, Body, Query, HTTPException
+from app.services.sentiment_analyzer import fetch_news_sentiment, analyze_text_sentiment, analyze_texts_sentiment, sentiment_rollups
+from config import settings
+from app.services.rate_limiter import RateLimitExceeded
 import logging
 
 logger = logging.getLogger(__name__)
@@ -7,29 +9,56 @@ router = APIRouter()
 
 @router.get("/sentiment/news")
 async def get_news_sentiment_api(query: str = Query(..., description="Search query for news articles, e.g., a stock symbol or company name")):
-    logger.info(f"News sentiment API requested for query: {query}")
+    logger.info("News sentiment API requested for query: %s", query)
     try:
         sentiment_data = await fetch_news_sentiment(query)
         if not sentiment_data:
-            logger.warning(f"No news sentiment data found for query: {query}")
+            logger.warning("No news sentiment data found for query: %s", query)
             raise HTTPException(status_code=404, detail=f"No news sentiment data found for '{query}'")
         return sentiment_data # Expects a list of dicts or similar JSON serializable structure
+    except RateLimitExceeded as e:
+        logger.warning("Upstream rate limit hit for news query '%s': %s", query, e)
+        raise HTTPException(status_code=429, detail="Upstream rate limit reached, please retry shortly.", headers={"Retry-After": str(int(e.retry_after) + 1)})
     except Exception as e:
-        logger.error(f"Error fetching news sentiment for '{query}': {e}", exc_info=True)
+        logger.error("Error fetching news sentiment for '%s': %s", query, e, exc_info=True)
         raise HTTPException(status_code=500, detail="Error fetching news sentiment.")
 
+@router.get("/sentiment/rollups") # Sentiment over time, served from the local store only
+async def get_sentiment_rollups_api(
+    query: str = Query(..., description="Query previously used for news sentiment, e.g., a stock symbol"),
+    bucket: str = Query("day", pattern="^(hour|day)$", description="Aggregation bucket: hour or day"),
+    days: int = Query(30, ge=1, le=365, description="How many days back to return"),
+):
+    logger.info("Sentiment rollups requested for query: %s, bucket: %s, days: %s", query, bucket, days)
+    try:
+        return {"query": query, "bucket": bucket, "buckets": await sentiment_rollups(query, bucket, days)}
+    except Exception as e:
+        logger.error("Error reading sentiment rollups for '%s': %s", query, e, exc_info=True)
+        raise HTTPException(status_code=500, detail="Error reading sentiment rollups.")
+
 @router.get("/sentiment/text")
 async def get_text_sentiment_api(text: str = Query(..., description="Text to analyze for sentiment")):
-    logger.info(f"Text sentiment API requested for text: '{text[:50]}...'")
+    logger.info("Text sentiment API requested for text: '%s...'", text[:50])
     if not text.strip():
         raise HTTPException(status_code=400, detail="Text cannot be empty.")
     try:
         sentiment_result = await analyze_text_sentiment(text)
         return sentiment_result # Expects a dict like {"sentiment": "positive", "score": 0.8}
     except Exception as e:
-        logger.error(f"Error analyzing text sentiment: {e}", exc_info=True)
+        logger.error("Error analyzing text sentiment: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail="Error analyzing text sentiment.")
 
+@router.post("/batch")
+async def get_batch_sentiment_api(texts: list[str] = Body(..., embed=True, description="Texts to score, e.g. headlines")):
+    logger.info("Batch sentiment API requested for %s texts", len(texts))
+    if len(texts) > settings.SENTIMENT_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {settings.SENTIMENT_BATCH_MAX} texts per batch.")
+    try:
+        return await analyze_texts_sentiment(texts) # Same order as the input
+    except Exception as e:
+        logger.error("Error analyzing batch sentiment: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail="Error analyzing batch sentiment.")
+
 # Note: These are JSON API endpoints. 
 # If you need to display sentiment on an HTML page (like stock.html for a stock symbol),
 # you would typically call these API endpoints from JavaScript (e.g., in charts.js)
@@ -1,57 +1,246 @@
-from fastapi import APIRouter, Request, HTTPException, Query
-from fastapi.responses import HTMLResponse
+from fastapi import APIRouter, Request, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 from app.templates import templates  # Updated import to break circular dependency
-from app.services.stock_analyzer import fetch_stock_data, analyze_stock_data
+from app.services.stock_analyzer import fetch_stock_data, fetch_many, latest_analysis, series_expires_at, slice_period
+from app.api.responses import FORMAT_SPLIT, NEGOTIATED_VARY, column_arrays, frame_response, json_response, negotiate_format
+from config import settings
+from app.services.indicators import indicator_frame
+from app.services.downsample import downsample, downsample_cache
+from app.services.cache import frame_version
+from app.api.http_cache import cached_response, make_etag
+from app.services.rate_limiter import RateLimitExceeded
+from app.services.quote_stream import quote_hub
+from app.services.executor import cpu_pool
+import asyncio
+import json
 import logging
 import pandas as pd
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+def _parse_symbols(symbols: str, limit: int) -> list[str]:
+    """Comma-separated symbols -> upper-cased, de-duplicated list (order kept). Raises ValueError."""
+    requested = list(dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip()))
+    if not requested:
+        raise ValueError("At least one symbol is required.")
+    if len(requested) > limit:
+        raise ValueError(f"At most {limit} symbols per request.")
+    return requested
+
+@router.get("/batch") # JSON endpoint for many symbols in one round-trip
+async def get_batch_stock_data(
+    symbols: str = Query(..., description="Comma-separated stock symbols, e.g. AAPL,MSFT,GOOGL"),
+    period: str = Query("1y", description="Period for stock data e.g., 1mo, 3mo, 1y, 5y, max"),
+):
+    try:
+        requested = _parse_symbols(symbols, settings.BATCH_MAX_SYMBOLS)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    logger.info("Batch stock data requested for %s symbols, period: %s", len(requested), period)
+
+    results = await fetch_many(requested, period=period)
+    data, errors = {}, {}
+    for symbol, result in results.items():
+        if isinstance(result, RateLimitExceeded):
+            errors[symbol] = "Upstream rate limit reached, please retry shortly."
+        elif isinstance(result, Exception):
+            logger.error("Batch fetch failed for %s: %s", symbol, result)
+            errors[symbol] = "Error fetching stock data."
+        elif result.empty:
+            errors[symbol] = f"No data found for {symbol}"
+        else:
+            # Column-oriented: one array per field instead of one list per row
+            data[symbol] = {"index": result.index.strftime('%Y-%m-%d').tolist(), **column_arrays(result)}
+    return json_response({"period": period, "data": data, "errors": errors})
+
+@router.websocket("/stream") # Real-time delta bars, one shared poller per symbol
+async def stream_quotes_ws(websocket: WebSocket, symbols: str = Query(..., description="Comma-separated stock symbols")):
+    try:
+        requested = _parse_symbols(symbols, settings.STREAM_MAX_SYMBOLS)
+    except ValueError as ve:
+        await websocket.close(code=1008, reason=str(ve))
+        return
+    await websocket.accept()
+    logger.info("WebSocket quote stream opened for %s", ', '.join(requested))
+    subscription = quote_hub.subscribe(requested)
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), timeout=settings.STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                await websocket.send_json({"type": "heartbeat"}) # Also detects clients that went away
+                continue
+            if message is None: # Dropped as a slow consumer, or shutting down
+                await websocket.close(code=1013, reason="Stream closed, please reconnect.")
+                return
+            await websocket.send_json(message)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        quote_hub.unsubscribe(subscription)
+        logger.info("WebSocket quote stream closed for %s", ', '.join(requested))
+
+@router.get("/stream/sse") # Server-Sent Events fallback for the quote stream
+async def stream_quotes_sse(request: Request, symbols: str = Query(..., description="Comma-separated stock symbols")):
+    try:
+        requested = _parse_symbols(symbols, settings.STREAM_MAX_SYMBOLS)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    logger.info("SSE quote stream opened for %s", ', '.join(requested))
+    subscription = quote_hub.subscribe(requested)
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), timeout=settings.STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if message is None:
+                    return
+                yield f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+        finally:
+            quote_hub.unsubscribe(subscription)
+            logger.info("SSE quote stream closed for %s", ', '.join(requested))
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @router.get("/stock/{symbol}", response_class=HTMLResponse)
 async def get_stock_page(request: Request, symbol: str):
-    logger.info(f"Stock page requested for symbol: {symbol.upper()}")
+    logger.info("Stock page requested for symbol: %s", symbol.upper())
     try:
         # In a real app, you might fetch more comprehensive data or pre-calculated analysis
         # For now, let's assume stock_analyzer gives us what we need for the template
         raw_data = await fetch_stock_data(symbol.upper())
         if raw_data.empty:
-            logger.warning(f"No data found for symbol: {symbol.upper()}")
+            logger.warning("No data found for symbol: %s", symbol.upper())
             raise HTTPException(status_code=404, detail=f"No data found for stock symbol {symbol.upper()}")
         
         # For the stock.html template, we might pass the raw data or a summary
         # The actual plotting might happen client-side via Plotly.js or server-side
-        context = {
-            "request": request,
-            "symbol": symbol.upper(),
-            "title": f"{symbol.upper()} Stock Analysis",
-            "data_summary": raw_data.head().to_html() # Example: pass first 5 rows as HTML table
-        }
-        return templates.TemplateResponse("stock.html", context)
+        # Rendered once per data version; repeat visitors get a 304 or the cached page
+        def render():
+            context = {
+                "request": request,
+                "symbol": symbol.upper(),
+                "title": f"{symbol.upper()} Stock Analysis",
+                "data_summary": raw_data.head().to_html() # Example: pass first 5 rows as HTML table
+            }
+            return templates.TemplateResponse(request, "stock.html", context)
+
+        # base_url is part of the key because url_for() renders absolute URLs
+        etag = make_etag("stock_page", str(request.base_url), symbol.upper(), frame_version(raw_data))
+        return cached_response(request, etag, render, series_expires_at(symbol.upper()))
+    except RateLimitExceeded as e:
+        logger.warning("Upstream rate limit hit for %s: %s", symbol.upper(), e)
+        raise HTTPException(status_code=429, detail="Upstream rate limit reached, please retry shortly.", headers={"Retry-After": str(int(e.retry_after) + 1)})
     except HTTPException as he:
-        logger.error(f"HTTPException for {symbol.upper()}: {he.detail}")
+        logger.error("HTTPException for %s: %s", symbol.upper(), he.detail)
         raise he # Re-raise HTTPException to let FastAPI handle it
     except Exception as e:
-        logger.error(f"Error fetching stock page for {symbol.upper()}: {e}", exc_info=True)
+        logger.error("Error fetching stock page for %s: %s", symbol.upper(), e, exc_info=True)
         # Render an error page or return a JSON error
         raise HTTPException(status_code=500, detail=f"An internal error occurred while fetching data for {symbol.upper()}.")
 
 @router.get("/stock/{symbol}/data") # JSON endpoint for fetching data for charts
-async def get_stock_json_data(symbol: str, period: str = Query("1y", description="Period for stock data e.g., 1mo, 3mo, 1y, 5y, max")):
-    logger.info(f"Stock JSON data requested for symbol: {symbol.upper()}, period: {period}")
+async def get_stock_json_data(
+    request: Request,
+    symbol: str,
+    period: str = Query("1y", description="Period for stock data e.g., 1mo, 3mo, 1y, 5y, max"),
+    format: str | None = Query(None, description="split (default), columns, binary or arrow. Accept: application/octet-stream or application/vnd.apache.arrow.stream also select binary/arrow"),
+    float32: bool = Query(False, description="Send prices as float32 (columns/binary/arrow formats)"),
+    max_points: int | None = Query(None, ge=10, description="Downsample to at most this many points (e.g. the chart's pixel width)"),
+    chart: str = Query("candlestick", pattern="^(candlestick|line)$", description="candlestick: OHLC bucket aggregation, line: LTTB on Close"),
+):
+    logger.info("Stock JSON data requested for symbol: %s, period: %s", symbol.upper(), period)
+    fmt = negotiate_format(format, request.headers.get("accept"))
     try:
         stock_df = await fetch_stock_data(symbol.upper(), period=period)
         if stock_df.empty:
-            logger.warning(f"No JSON data found for symbol: {symbol.upper()} with period {period}")
+            logger.warning("No JSON data found for symbol: %s with period %s", symbol.upper(), period)
             raise HTTPException(status_code=404, detail=f"No data found for {symbol.upper()}")
-        
-        # Convert DataFrame to JSON suitable for Plotly.js or other charting libraries
-        # Ensure datetime index is converted to string if it's not already JSON serializable
-        if isinstance(stock_df.index, pd.DatetimeIndex):
-            stock_df.index = stock_df.index.strftime('%Y-%m-%d')
-        return stock_df.to_dict(orient='split') # Example: {'index': [...], 'columns': [...], 'data': [[...], ...]}
+
+        # The ETag covers everything that shapes the body, so a period toggle back to
+        # an unchanged series is a 304 (or a cached body) without any re-serialization
+        etag = make_etag("stock_data", symbol.upper(), period, fmt, float32, max_points, chart, frame_version(stock_df))
+        return cached_response(
+            request, etag, lambda: _chart_data_response(symbol.upper(), period, stock_df, fmt, float32, max_points, chart),
+            series_expires_at(symbol.upper(), period), vary=NEGOTIATED_VARY,
+        )
+    except HTTPException:
+        raise
+    except RateLimitExceeded as e:
+        logger.warning("Upstream rate limit hit for %s: %s", symbol.upper(), e)
+        raise HTTPException(status_code=429, detail="Upstream rate limit reached, please retry shortly.", headers={"Retry-After": str(int(e.retry_after) + 1)})
     except Exception as e:
-        logger.error(f"Error fetching stock JSON data for {symbol.upper()}: {e}", exc_info=True)
+        logger.error("Error fetching stock JSON data for %s: %s", symbol.upper(), e, exc_info=True)
         raise HTTPException(status_code=500, detail="Error fetching stock data.")
 
-# Add more JSON endpoints as needed, e.g., for specific indicators 
\ No newline at end of file
+def _chart_data_response(symbol: str, period: str, stock_df: pd.DataFrame, fmt: str, float32: bool, max_points: int | None, chart: str) -> Response:
+    if max_points is not None and len(stock_df) > max_points:
+        key = (symbol, period, max_points, chart, frame_version(stock_df))
+        stock_df = downsample_cache.get_or_compute(key, lambda: downsample(stock_df, max_points, chart))
+
+    if fmt != FORMAT_SPLIT:
+        # Column-oriented formats: one array per field, no per-row objects
+        return frame_response(stock_df, fmt, float32=float32)
+
+    # Convert DataFrame to JSON suitable for Plotly.js or other charting libraries
+    # Ensure datetime index is converted to string if it's not already JSON serializable
+    if isinstance(stock_df.index, pd.DatetimeIndex):
+        stock_df = stock_df.set_axis(stock_df.index.strftime('%Y-%m-%d')) # New frame, cached data stays untouched
+    return json_response(stock_df.to_dict(orient='split')) # Example: {'index': [...], 'columns': [...], 'data': [[...], ...]}
+
+@router.get("/stock/{symbol}/analysis") # JSON summary of the latest indicator values
+async def get_stock_analysis(symbol: str):
+    logger.info("Stock analysis requested for symbol: %s", symbol.upper())
+    try:
+        analysis = await latest_analysis(symbol.upper())
+        if "error" in analysis:
+            raise HTTPException(status_code=404, detail=f"No data found for {symbol.upper()}")
+        return analysis
+    except HTTPException:
+        raise
+    except RateLimitExceeded as e:
+        logger.warning("Upstream rate limit hit for %s: %s", symbol.upper(), e)
+        raise HTTPException(status_code=429, detail="Upstream rate limit reached, please retry shortly.", headers={"Retry-After": str(int(e.retry_after) + 1)})
+    except Exception as e:
+        logger.error("Error analyzing %s: %s", symbol.upper(), e, exc_info=True)
+        raise HTTPException(status_code=500, detail="Error analyzing stock data.")
+
+@router.get("/stock/{symbol}/indicators") # JSON endpoint for technical indicators
+async def get_stock_indicators(
+    symbol: str,
+    names: str = Query("sma:50,sma:200,rsi", description="Comma-separated indicators, optionally with args, e.g. sma:50,ema:20,rsi:14,macd:12:26:9,bollinger:20:2,atr,vwap"),
+    period: str = Query("1y", description="Period to return e.g., 1mo, 3mo, 1y, 5y, max"),
+):
+    logger.info("Indicators requested for symbol: %s, names: %s, period: %s", symbol.upper(), names, period)
+    specs = [name for name in names.split(",") if name.strip()]
+    if not specs:
+        raise HTTPException(status_code=400, detail="At least one indicator name is required.")
+    try:
+        # Indicators are computed over the full history so long windows are warmed up
+        # at the start of the requested period, then sliced
+        history = await fetch_stock_data(symbol.upper(), period="max")
+        if history.empty:
+            raise HTTPException(status_code=404, detail=f"No data found for {symbol.upper()}")
+        try:
+            indicators = slice_period(await cpu_pool.run(indicator_frame, history, specs), period)
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=str(ve))
+        return json_response({
+            "symbol": symbol.upper(),
+            "period": period,
+            "index": indicators.index.strftime('%Y-%m-%d').tolist(),
+            "indicators": column_arrays(indicators), # NaN warm-up values become null
+        })
+    except HTTPException:
+        raise
+    except RateLimitExceeded as e:
+        logger.warning("Upstream rate limit hit for %s: %s", symbol.upper(), e)
+        raise HTTPException(status_code=429, detail="Upstream rate limit reached, please retry shortly.", headers={"Retry-After": str(int(e.retry_after) + 1)})
+    except Exception as e:
+        logger.error("Error computing indicators for %s: %s", symbol.upper(), e, exc_info=True)
+        raise HTTPException(status_code=500, detail="Error computing indicators.") 
\ No newline at end of file
@@ -6,6 +6,12 @@ import logging
 from config import settings
 from app.api.routers import api_router
 from app.templates import templates  # Import templates from the new module
+from app.services.http_client import http_client
+from app.services.quote_stream import quote_hub
+from app.services.executor import cpu_pool, loop_monitor
+from app.middleware import CompressionMiddleware, MetricsMiddleware
+from app.services.news_store import news_store
+from app.services.shared_state import shared_state
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +21,11 @@ app = FastAPI(
     debug=settings.DEBUG
 )
 
+# brotli/gzip for HTML, JSON and chart data (event streams are left alone)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+# Outermost, so latency includes compression
+app.add_middleware(MetricsMiddleware)
+
 # Mount static files directory
 static_dir_path = Path(settings.STATIC_DIR).resolve()
 app.mount("/static", StaticFiles(directory=static_dir_path), name="static")
@@ -24,6 +35,9 @@ app.include_router(api_router, prefix="/api")
 
 @app.on_event("startup")
 async def startup_event():
+    await http_client.start() # Pooled session shared by all upstream calls
+    cpu_pool.start() # Parsing and indicator work runs here, not on the event loop
+    loop_monitor.start()
     logger.info("Application startup complete.")
     logger.info(f"Static files mounted from: {static_dir_path}")
 
@@ -39,7 +53,14 @@ async def startup_event():
             logger.warning(f"Templates directory {path} does not exist!")
 
 @app.on_event("shutdown")
-def shutdown_event():
+async def shutdown_event():
+    await quote_hub.close() # Stop pollers and disconnect stream clients
+    await http_client.close()
+    await loop_monitor.close()
+    cpu_pool.close()
+    news_store.close()
+    if shared_state is not None:
+        shared_state.close()
     logger.info("Application shutdown complete.")
 
 # Example root endpoint serving an HTML page
@@ -49,6 +70,7 @@ tags_metadata = [{"name": "root", "description": "Root HTML endpoint."}]
 async def read_root(request: Request):
     logger.info("Root endpoint / was accessed.")
     return templates.TemplateResponse(
+        request,
         "index.html",
-        {"request": request, "title": "Dashboard"}
+        {"title": "Dashboard"}
     )
\ No newline at end of file
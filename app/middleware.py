@@ -0,0 +1,169 @@
+import time
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.services.metrics import http_request_duration, http_requests, http_requests_in_flight
+
+# Brotli is optional: without it only gzip is offered
+try:
+    import brotli
+except ImportError: # pragma: no cover - depends on the environment
+    brotli = None
+
+
+class BrotliResponder(IdentityResponder):
+    """Brotli counterpart of Starlette's GZipResponder (same buffering and exclusion rules)."""
+
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int):
+        super().__init__(app, minimum_size)
+        self.quality = quality
+        self._compressor = None
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if self._compressor is None:
+            self._compressor = brotli.Compressor(quality=self.quality)
+        data = self._compressor.process(body)
+        return data + (self._compressor.flush() if more_body else self._compressor.finish())
+
+
+def _accepted_encodings(accept_encoding: str) -> dict[str, float]:
+    """Accept-Encoding -> {coding: q}, dropping q=0."""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                continue
+        if coding and q > 0:
+            accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def _revalidated_etag(etag: str, if_none_match: str, preferred: str) -> str | None:
+    """The encoded variant of `etag` ("<tag>-br") the client sent in If-None-Match, preferring `preferred`."""
+    sent = {tag.strip() for tag in if_none_match.split(",")}
+    for encoding in dict.fromkeys([preferred, "br", "gzip"]):
+        if f'{etag[:-1]}-{encoding}"' in sent:
+            return f'{etag[:-1]}-{encoding}"'
+    return None
+
+
+def _vary_on(headers: MutableHeaders, field: str):
+    """Adds `field` to Vary unless it is already listed (keeps what the route set, e.g. Accept)."""
+    fields = [f.strip() for f in headers.get("vary", "").split(",") if f.strip()]
+    if not any(f.lower() == field.lower() or f == "*" for f in fields):
+        headers["Vary"] = ", ".join(fields + [field])
+
+
+class CompressionMiddleware:
+    """Compresses responses with brotli (if installed) or gzip, whichever the client prefers.
+
+    Small bodies, event streams and already-encoded responses pass through
+    untouched. A strong ETag gets an encoding suffix ("<tag>-br") so each
+    encoded representation has its own validator; app.api.http_cache strips
+    it again when matching If-None-Match, and a 304 repeats the suffixed tag
+    the client revalidated with. Every response (compressed or not, 304s
+    included) lists Accept-Encoding in Vary, alongside any Vary the route set.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 500, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        accepted = _accepted_encodings(request_headers.get("accept-encoding", ""))
+        if_none_match = request_headers.get("if-none-match", "")
+        if brotli is not None and "br" in accepted and accepted["br"] >= accepted.get("gzip", 0):
+            responder = BrotliResponder(self.app, self.minimum_size, self.brotli_quality)
+        elif "gzip" in accepted:
+            responder = GZipResponder(self.app, self.minimum_size, compresslevel=self.gzip_level)
+        else:
+            responder = None
+
+        async def send_with_etag(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                # Starlette only adds it to bodies it compressed; small bodies and
+                # 304s would otherwise be cached for every encoding
+                _vary_on(headers, "Accept-Encoding")
+                encoding = headers.get("content-encoding")
+                etag = headers.get("etag")
+                if responder is not None and etag and etag.endswith('"') and not etag.startswith("W/"):
+                    if encoding:
+                        headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+                    elif message["status"] == 304:
+                        # A 304 has no body to encode; it must still name the
+                        # representation the client holds, i.e. the suffixed tag
+                        # it sent, or caches treat it as a different response
+                        suffixed = _revalidated_etag(etag, if_none_match, responder.content_encoding)
+                        if suffixed:
+                            headers["ETag"] = suffixed
+            await send(message)
+
+        if responder is None:
+            await self.app(scope, receive, send_with_etag)
+        else:
+            await responder(scope, receive, send_with_etag)
+
+
+def _route_label(scope: Scope) -> str:
+    """Full path template of the matched route, e.g. "/api/stocks/stock/{symbol}/data"."""
+    route = scope.get("route")
+    path = scope["path"]
+    if route is None:
+        return "/static" if path.startswith("/static/") else "unmatched"
+    # Included routers keep their own relative templates; the router prefixes
+    # are the part of the concrete path in front of what the route matched
+    for i, char in enumerate(path):
+        if char == "/" and route.path_regex.match(path[i:]):
+            return path[:i] + route.path
+    return route.path
+
+
+class MetricsMiddleware:
+    """Records per-route request counts, latency and in-flight requests.
+
+    Routes are labelled by their path template ("/api/stocks/stock/{symbol}/data"),
+    not the concrete path, so label cardinality stays bounded. Latency runs
+    until the last body chunk is sent; streaming responses (SSE) are counted
+    when they end, WebSockets are not timed.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            label = _route_label(scope)
+            http_requests.inc(method=scope["method"], route=label, status=status)
+            http_request_duration.observe(time.perf_counter() - start, method=scope["method"], route=label)
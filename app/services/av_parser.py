@@ -0,0 +1,86 @@
+import io
+import json
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+# orjson decodes the JSON payloads several times faster when it is installed
+try:
+    import orjson
+except ImportError: # pragma: no cover - depends on the environment
+    orjson = None
+
+# Parsers for Alpha Vantage time-series payloads.
+#
+# Both formats are decoded straight into NumPy arrays (datetime64 dates plus
+# one float64 array per field) in ascending date order, then wrapped in a
+# DataFrame without further copies. The legacy path (dict-of-dicts DataFrame,
+# string->datetime, string->float astype, rename, sort_index) made several
+# full copies of a 20-year history.
+
+
+def column_name(field: str) -> str:
+    """Alpha Vantage field -> DataFrame column ("1. open" / "open" -> "Open", "adjusted_close" -> "Adjusted close")."""
+    return field.split('. ')[-1].replace('_', ' ').capitalize()
+
+
+def _frame(dates: np.ndarray, fields: list[str], columns: list[np.ndarray]) -> pd.DataFrame:
+    """Builds the series DataFrame, reordering to ascending dates (AV sends newest first)."""
+    if len(dates) > 1 and dates[0] > dates[-1]:
+        order = slice(None, None, -1)
+        if not (np.diff(dates[order]) >= np.timedelta64(0)).all():
+            order = np.argsort(dates, kind="stable")
+    elif len(dates) > 1 and not (np.diff(dates) >= np.timedelta64(0)).all():
+        order = np.argsort(dates, kind="stable")
+    else:
+        order = slice(None)
+    index = pd.DatetimeIndex(dates[order].astype("datetime64[ns]"))
+    data = {column_name(field): np.ascontiguousarray(values[order]) for field, values in zip(fields, columns)}
+    return pd.DataFrame(data, index=index, copy=False)
+
+
+def parse_csv(body: bytes) -> pd.DataFrame:
+    """Parses a datatype=csv response ("timestamp,open,high,...") in one C-level pass.
+
+    Rows are read into a preallocated structured array (datetime64[D] plus one
+    float64 field per column) by np.loadtxt.
+    """
+    header_end = body.find(b"\n")
+    if header_end < 0 or not body[header_end + 1:].strip():
+        return pd.DataFrame()
+    fields = body[:header_end].decode().strip().split(",")[1:] # First column is the date
+    dtype = np.dtype([("date", "datetime64[D]")] + [(f"c{i}", np.float64) for i in range(len(fields))])
+    rows = np.loadtxt(io.BytesIO(body[header_end + 1:]), delimiter=",", dtype=dtype, ndmin=1)
+    return _frame(rows["date"], fields, [rows[f"c{i}"] for i in range(len(fields))])
+
+
+def parse_json(body: bytes) -> pd.DataFrame | dict:
+    """Parses a datatype=json response.
+
+    Returns the decoded JSON instead of a DataFrame when it holds no time
+    series (error or throttling message).
+    """
+    data = orjson.loads(body) if orjson is not None else json.loads(body)
+    series_key = next((key for key in data if "Time Series" in key), None)
+    if series_key is None:
+        return data
+    series = data[series_key]
+    if not series:
+        return pd.DataFrame()
+    fields = list(next(iter(series.values())))
+    dates = np.array(list(series), dtype="datetime64[D]")
+    # One (n, fields) float64 array converted from the strings in a single call
+    values = np.array(list(map(itemgetter(*fields), series.values())), dtype=np.float64).reshape(len(dates), len(fields))
+    return _frame(dates, fields, list(values.T))
+
+
+def parse_series(body: bytes) -> pd.DataFrame | dict:
+    """Parses an Alpha Vantage response body in either datatype.
+
+    Errors come back as JSON even when CSV was requested, so the format is
+    sniffed from the body rather than taken from the request.
+    """
+    if body[:64].lstrip()[:1] == b"{":
+        return parse_json(body)
+    return parse_csv(body)
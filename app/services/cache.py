@@ -0,0 +1,304 @@
+import asyncio
+import logging
+import os
+import pickle
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import pandas as pd
+from config import settings
+from app.services.market_hours import MARKET_CLOSE, is_market_open, market_now, seconds_until_next_open
+from app.services.shared_state import SharedState, shared_state
+
+logger = logging.getLogger(__name__)
+
+
+def series_ttl(now: datetime | None = None) -> float:
+    """TTL (seconds) for a daily series fetched at `now`, following market hours.
+
+    While the session is open (and shortly after the close, until the daily
+    bar settles) entries refresh every CACHE_TTL_MARKET_OPEN seconds. Outside
+    that window nothing changes until the next open, so entries live until then.
+    """
+    now = market_now(now)
+    if is_market_open(now):
+        return float(settings.CACHE_TTL_MARKET_OPEN)
+    close_today = datetime.combine(now.date(), MARKET_CLOSE, tzinfo=now.tzinfo)
+    since_close = (now - close_today).total_seconds()
+    if now.weekday() < 5 and 0 <= since_close < settings.CACHE_POST_CLOSE_WINDOW:
+        return float(settings.CACHE_TTL_MARKET_OPEN)
+    return max(float(settings.CACHE_TTL_MARKET_OPEN), seconds_until_next_open(now))
+
+
+def frame_version(df: pd.DataFrame) -> tuple:
+    """Identifies a series' data: length plus the last bar's timestamp and values (today's bar changes intraday)."""
+    return (len(df), df.index[-1].value, float(df.iloc[-1].sum())) if len(df) else (0,)
+
+
+class CacheEntry:
+    __slots__ = ("df", "fetched_at", "expires_at", "nbytes")
+
+    def __init__(self, df: pd.DataFrame, fetched_at: float, expires_at: float):
+        self.df = df
+        self.fetched_at = fetched_at
+        self.expires_at = expires_at
+        self.nbytes = int(df.memory_usage(index=True).sum())
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.expires_at
+
+    def is_servable(self, now: float) -> bool:
+        # Expired entries are still served (while a refresh runs) for a bounded time
+        return now < self.expires_at + settings.CACHE_STALE_SECONDS
+
+
+class SeriesCache:
+    """Tiered cache of parsed stock DataFrames keyed by (symbol, function).
+
+    Tier 1 is an in-process LRU bounded by CACHE_MAX_BYTES. Tier 2 is an
+    optional pickle-per-key directory that survives restarts, bounded by
+    CACHE_DISK_MAX_BYTES (least recently used files go first); its reads and
+    writes run on a thread. With several
+    workers, `shared` state holds the latest copy of every series: a worker
+    whose own copy is missing or expired picks up one another worker already
+    fetched. Expired entries are served stale while a single background task
+    refreshes them.
+    """
+
+    def __init__(self, max_bytes: int | None = None, disk_dir: str | None = None, shared: SharedState | None = None,
+                 disk_max_bytes: int | None = None):
+        self.max_bytes = max_bytes if max_bytes is not None else settings.CACHE_MAX_BYTES
+        self.disk_max_bytes = disk_max_bytes if disk_max_bytes is not None else settings.CACHE_DISK_MAX_BYTES
+        if disk_dir is None and settings.CACHE_DISK_ENABLED:
+            disk_dir = settings.CACHE_DIR
+        self.disk_dir = disk_dir
+        self.shared = shared
+        self._entries: "OrderedDict[tuple, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._refreshing: dict[tuple, asyncio.Task] = {}
+        # Counters for hit-ratio reporting
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+    # ---- memory tier -------------------------------------------------------
+
+    def _store(self, key: tuple, entry: CacheEntry):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        self._entries[key] = entry
+        self._bytes += entry.nbytes
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self.evictions += 1
+            logger.debug("Evicted %s from series cache (%s bytes)", evicted_key, evicted.nbytes)
+
+    async def _lookup(self, key: tuple) -> CacheEntry | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            if self.shared is None or entry.is_fresh(time.time()):
+                return entry
+        # Missing or expired here: another worker may hold a newer copy
+        newer = await self._load_shared(key, newer_than=entry.fetched_at if entry is not None else 0.0)
+        if newer is None and entry is None and self.disk_dir:
+            newer = await asyncio.to_thread(self._load_from_disk, key)
+        if newer is not None:
+            self._store(key, newer)
+            return newer
+        return entry
+
+    # ---- shared tier -------------------------------------------------------
+
+    @staticmethod
+    def _shared_key(key: tuple) -> str:
+        return "|".join(map(str, key))
+
+    async def _load_shared(self, key: tuple, newer_than: float) -> CacheEntry | None:
+        if self.shared is None:
+            return None
+        found = await self.shared.get_series(self._shared_key(key), newer_than)
+        return CacheEntry(*found) if found is not None else None
+
+    async def shared_since(self, key: tuple, since: float) -> pd.DataFrame | None:
+        """A copy of `key` another worker stored after `since` (wall clock), or None.
+
+        Used as the `ready` check while waiting on another worker's fetch lease.
+        """
+        entry = await self._load_shared(key, newer_than=since)
+        if entry is None:
+            return None
+        self._store(key, entry)
+        return entry.df
+
+    # ---- disk tier ---------------------------------------------------------
+
+    def _disk_path(self, key: tuple) -> str:
+        name = "_".join(re.sub(r"[^A-Za-z0-9.-]", "-", str(part)) for part in key)
+        return os.path.join(self.disk_dir, f"{name}.pkl")
+
+    def _load_from_disk(self, key: tuple) -> CacheEntry | None:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                payload = pickle.load(f)
+            os.utime(path) # Recently used: evicted last
+            return CacheEntry(payload["df"], payload["fetched_at"], payload["expires_at"])
+        except Exception as e:
+            logger.warning("Could not read cache file %s: %s", path, e)
+            return None
+
+    def _save_to_disk(self, key: tuple, entry: CacheEntry):
+        if not self.disk_dir:
+            return
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            path = self._disk_path(key)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(
+                    {"df": entry.df, "fetched_at": entry.fetched_at, "expires_at": entry.expires_at},
+                    f, protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            os.replace(tmp_path, path) # Atomic swap so readers never see a partial file
+            self._evict_disk(keep=path)
+        except Exception as e:
+            logger.warning("Could not write cache file for %s: %s", key, e)
+
+    def _evict_disk(self, keep: str):
+        """Deletes the least recently used cache files until the directory fits disk_max_bytes."""
+        files = []
+        with os.scandir(self.disk_dir) as it:
+            for item in it:
+                if item.name.endswith(".pkl") and item.is_file():
+                    stat = item.stat()
+                    files.append((stat.st_mtime, stat.st_size, item.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass # Another worker evicted it first
+            total -= size
+            self.disk_evictions += 1
+            logger.debug("Evicted %s from disk cache (%s bytes)", path, size)
+
+    # ---- public API --------------------------------------------------------
+
+    def expires_at(self, key: tuple) -> float | None:
+        """Expiry (wall clock) of the in-process copy of `key`, or None when it is not cached here."""
+        entry = self._entries.get(key)
+        return entry.expires_at if entry is not None else None
+
+    async def get(self, key: tuple, allow_stale: bool = False) -> pd.DataFrame | None:
+        """Returns the cached DataFrame without fetching, or None."""
+        entry = await self._lookup(key)
+        if entry is None:
+            return None
+        now = time.time()
+        if entry.is_fresh(now) or (allow_stale and entry.is_servable(now)):
+            return entry.df
+        return None
+
+    async def put(self, key: tuple, df: pd.DataFrame):
+        fetched_at = time.time()
+        entry = CacheEntry(df, fetched_at, fetched_at + series_ttl())
+        self._store(key, entry)
+        if self.disk_dir:
+            await asyncio.to_thread(self._save_to_disk, key, entry)
+        if self.shared is not None:
+            try:
+                await self.shared.put_series(self._shared_key(key), df, entry.fetched_at, entry.expires_at)
+            except Exception as e:
+                logger.warning("Could not share cached series %s: %s", key, e)
+
+    async def put_fetched(self, key: tuple, df: pd.DataFrame):
+        """Caches a fetcher's result unless it is empty or already the cached copy (e.g. one taken from another worker)."""
+        entry = self._entries.get(key)
+        if not df.empty and (entry is None or entry.df is not df):
+            await self.put(key, df)
+
+    async def get_or_fetch(self, key: tuple, fetcher) -> pd.DataFrame:
+        """Returns a cached DataFrame, calling the async `fetcher()` on a miss.
+
+        Fresh entries are returned directly. Stale-but-servable entries are
+        returned immediately while `fetcher` runs in the background. Empty
+        results are never cached.
+        """
+        entry = await self._lookup(key)
+        now = time.time()
+        if entry is not None and entry.is_fresh(now):
+            self.hits += 1
+            return entry.df
+        if entry is not None and entry.is_servable(now):
+            self.stale_hits += 1
+            self._schedule_refresh(key, fetcher)
+            return entry.df
+
+        self.misses += 1
+        df = await fetcher()
+        await self.put_fetched(key, df)
+        return df
+
+    def _schedule_refresh(self, key: tuple, fetcher):
+        if key in self._refreshing:
+            return # A refresh for this key is already running
+
+        async def _refresh():
+            try:
+                df = await fetcher()
+                if not df.empty:
+                    await self.put_fetched(key, df)
+                    logger.info("Background refresh of %s complete", key)
+            except Exception as e:
+                logger.error("Background refresh of %s failed: %s", key, e)
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(_refresh())
+
+    async def invalidate(self, key: tuple):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.nbytes
+        if self.shared is not None:
+            await self.shared.delete_series(self._shared_key(key))
+        if self.disk_dir:
+            try:
+                os.remove(self._disk_path(key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else None,
+            "disk_tier": bool(self.disk_dir),
+            "disk_evictions": self.disk_evictions,
+            "shared_tier": self.shared.stats() if self.shared is not None else None,
+        }
+
+
+# Shared cache for daily OHLC series
+stock_cache = SeriesCache(shared=shared_state)
@@ -0,0 +1,104 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+OHLC_COLUMNS = ("Open", "High", "Low", "Close")
+
+
+def _bucket_edges(n: int, n_buckets: int) -> np.ndarray:
+    """Start offsets of `n_buckets` contiguous, near-equal buckets over n rows."""
+    return np.linspace(0, n, n_buckets + 1).astype(np.int64)[:-1]
+
+
+def ohlc_downsample(df: pd.DataFrame, max_points: int) -> pd.DataFrame:
+    """Aggregates bars into at most `max_points` buckets, candlestick-style.
+
+    Each bucket keeps the first bar's date and open, the highest high, the
+    lowest low and the last bar's close; volume is summed and any other column
+    takes the bucket's last value. Uses ufunc.reduceat, so it is one pass per column.
+    """
+    n = len(df)
+    if n <= max_points:
+        return df
+    starts = _bucket_edges(n, max_points)
+    ends = np.append(starts[1:], n) - 1
+    columns = {}
+    for column in df.columns:
+        values = df[column].to_numpy(dtype=np.float64)
+        if column == "Open":
+            columns[column] = values[starts]
+        elif column == "High":
+            columns[column] = np.maximum.reduceat(values, starts)
+        elif column == "Low":
+            columns[column] = np.minimum.reduceat(values, starts)
+        elif column == "Volume":
+            columns[column] = np.add.reduceat(values, starts)
+        else:
+            columns[column] = values[ends] # Close and anything else: last value in the bucket
+    return pd.DataFrame(columns, index=df.index[starts])
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of `n_out` points that best preserve the line's shape.
+
+    The first and last points are always kept. Each middle bucket picks the
+    point forming the largest triangle with the previously selected point and
+    the mean of the next bucket; the triangle areas of a bucket are computed in
+    one vectorized step.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64) # Middle buckets span [1, n-1)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = end, (edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[prev] - avg_x) * (y[start:end] - y[prev]) - (x[prev] - x[start:end]) * (avg_y - y[prev]))
+        prev = start + int(np.argmax(area))
+        selected[i + 1] = prev
+    return selected
+
+
+def lttb_downsample(df: pd.DataFrame, max_points: int, column: str = "Close") -> pd.DataFrame:
+    """Keeps the rows LTTB selects on `column` (for line charts)."""
+    if len(df) <= max_points:
+        return df
+    x = df.index.values.astype("datetime64[ms]").astype(np.float64)
+    return df.iloc[lttb_indices(x, df[column].to_numpy(dtype=np.float64), max_points)]
+
+
+class DownsampleCache:
+    """Small LRU of downsampled frames keyed by (symbol, period, resolution, chart, data version)."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+
+    def get_or_compute(self, key: tuple, compute) -> pd.DataFrame:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        result = compute()
+        self._entries[key] = result
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return result
+
+
+def downsample(df: pd.DataFrame, max_points: int, chart: str = "candlestick") -> pd.DataFrame:
+    """OHLC bucket aggregation for candlesticks, LTTB on Close for line charts."""
+    if chart == "line" or not all(column in df.columns for column in OHLC_COLUMNS):
+        return lttb_downsample(df, max_points)
+    return ohlc_downsample(df, max_points)
+
+
+# Shared cache for chart downsampling
+downsample_cache = DownsampleCache()
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+import numpy as np
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+POOL_KINDS = ("process", "thread", "inline")
+
+
+def _ready() -> bool:
+    return True
+
+
+class WorkerPool:
+    """Runs CPU-bound work (payload parsing, indicators, sentiment scoring) off the event loop.
+
+    kind is "process" (default: the work runs outside this interpreter, so it
+    never holds the loop's GIL; arguments and results are pickled, so only
+    module-level functions can be submitted), "thread" (arguments are shared,
+    not copied, but parsing and most pandas glue hold the GIL, so the loop
+    still stalls, see benchmarks/bench_event_loop.py) or "inline" (run
+    directly on the loop, for comparison). The executor is created on
+    application startup and shut down with it. Process children re-import
+    the main module, so scripts using the pool need the usual
+    `if __name__ == "__main__":` guard.
+    """
+
+    def __init__(self, kind: str, size: int):
+        if kind not in POOL_KINDS:
+            raise ValueError(f"Unknown worker pool kind '{kind}'. Use one of: {', '.join(POOL_KINDS)}")
+        self.kind = kind
+        self.size = size
+        self._executor: Executor | None = None
+        # Counters for health checks and monitoring
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.busy_seconds = 0.0
+
+    def start(self):
+        """Creates the executor. Safe to call more than once."""
+        if self._executor is not None or self.kind == "inline":
+            return
+        if self.kind == "process":
+            # Forking a process that already runs threads (asyncio.to_thread,
+            # the resolver) can copy a held lock into the child; start children
+            # from a clean forkserver (or spawn) instead
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            context = multiprocessing.get_context(method)
+            if method == "forkserver":
+                context.set_forkserver_preload(["numpy", "pandas"]) # Imported once, inherited by every child
+            self._executor = ProcessPoolExecutor(max_workers=self.size, mp_context=context)
+            # Start every child now (application startup) rather than on the first requests
+            for future in [self._executor.submit(_ready) for _ in range(self.size)]:
+                future.result()
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="cpu-worker")
+        logger.info("Worker pool started (%s, %s workers)", self.kind, self.size)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logger.info("Worker pool closed.")
+
+    async def run(self, fn, *args, **kwargs):
+        """Awaits fn(*args, **kwargs) executed on the pool."""
+        self.submitted += 1
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            if self.kind == "inline":
+                result = fn(*args, **kwargs)
+            else:
+                self.start() # Lazily start when used outside the app lifecycle (scripts, REPL)
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.busy_seconds += time.perf_counter() - start
+        self.completed += 1
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "size": self.size,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "busy_seconds": round(self.busy_seconds, 3),
+        }
+
+
+class LoopLagMonitor:
+    """Measures event-loop lag: how late a periodic sleep wakes up.
+
+    Anything that blocks the loop (parsing a large payload inline, a slow
+    pandas call) shows up here as lag, since every other request on the
+    worker waits just as long.
+    """
+
+    def __init__(self, interval: float, window: int = 600):
+        self.interval = interval
+        self._samples: deque = deque(maxlen=window) # Recent lags in seconds
+        self._task: asyncio.Task | None = None
+        self.max_lag = 0.0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._probe())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _probe(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self._samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag > 1.0:
+                logger.warning("Event loop blocked for %.2fs", lag)
+
+    def stats(self) -> dict:
+        """Lag over the recent window in milliseconds (max_ms is since startup)."""
+        if not self._samples:
+            return {"samples": 0, "max_ms": round(self.max_lag * 1000, 2)}
+        lags = np.fromiter(self._samples, dtype=np.float64) * 1000
+        return {
+            "samples": len(lags),
+            "last_ms": round(float(lags[-1]), 2),
+            "mean_ms": round(float(lags.mean()), 2),
+            "p99_ms": round(float(np.percentile(lags, 99)), 2),
+            "window_max_ms": round(float(lags.max()), 2),
+            "max_ms": round(self.max_lag * 1000, 2),
+        }
+
+
+# Shared instances, started/stopped by app.main
+cpu_pool = WorkerPool(settings.WORKER_POOL_KIND, settings.WORKER_POOL_SIZE)
+loop_monitor = LoopLagMonitor(settings.LOOP_LAG_INTERVAL)
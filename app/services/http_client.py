@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import aiohttp
+from config import settings
+from app.services.metrics import upstream_errors, upstream_request_duration, upstream_requests
+from app.services.rate_limiter import RateLimitExceeded, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying: transient upstream failures. 429 is not retried;
+# it means the provider's quota is spent, so retrying only spends more of it
+RETRYABLE_STATUSES = {500, 502, 503, 504}
+
+# Seconds to back off after a 429 that carries no usable Retry-After
+DEFAULT_RETRY_AFTER = 60.0
+
+
+def retry_after_seconds(value: str | None) -> float:
+    """Retry-After header (delay-seconds or an HTTP date) -> seconds from now."""
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    return DEFAULT_RETRY_AFTER
+
+
+class HTTPClient:
+    """App-lifetime pooled aiohttp client shared by all upstream services.
+
+    The session is created in the FastAPI startup hook and closed on shutdown.
+    Services call get_json() instead of opening their own ClientSession, so
+    connections (and TLS handshakes) to Alpha Vantage / NewsAPI are reused.
+    """
+
+    def __init__(self):
+        self._session: aiohttp.ClientSession | None = None
+        self._connector: aiohttp.TCPConnector | None = None
+        # Simple counters for pool-usage metrics
+        self.requests_total = 0
+        self.retries_total = 0
+        self.errors_total = 0
+        self.in_flight = 0
+        self.in_flight_per_host = defaultdict(int)
+
+    async def start(self):
+        """Creates the pooled session. Safe to call more than once."""
+        if self._session is not None and not self._session.closed:
+            return
+        self._connector = aiohttp.TCPConnector(
+            limit=settings.HTTP_POOL_LIMIT,
+            limit_per_host=settings.HTTP_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=settings.HTTP_DNS_CACHE_TTL,
+            use_dns_cache=True,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=settings.HTTP_TOTAL_TIMEOUT,
+            connect=settings.HTTP_CONNECT_TIMEOUT,
+        )
+        self._session = aiohttp.ClientSession(connector=self._connector, timeout=timeout)
+        logger.info(
+            f"Shared HTTP client started (pool limit {settings.HTTP_POOL_LIMIT}, "
+            f"per host {settings.HTTP_POOL_LIMIT_PER_HOST})"
+        )
+
+    async def close(self):
+        """Closes the pooled session and all kept-alive connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("Shared HTTP client closed.")
+        self._session = None
+        self._connector = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # Lazily start when used outside the app lifecycle (scripts, REPL)
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+
+    async def get(self, url: str, params: dict | None = None, response_type: str = "json", provider: str | None = None,
+                  limiter: TokenBucket | None = None):
+        """GETs a URL through the shared pool, retrying transient failures with backoff.
+
+        response_type is "json", "text" or "bytes". provider labels the call in
+        the upstream metrics (defaults to the host). With a `limiter`, every
+        attempt (retries included) first takes a token from it. Raises
+        aiohttp.ClientError (or asyncio.TimeoutError) once all retries are
+        exhausted, and RateLimitExceeded when the limiter's budget is spent or
+        the provider answers 429; a 429 also holds the limiter for the
+        provider's Retry-After.
+        """
+        session = await self._get_session()
+        host = urlsplit(url).netloc
+        provider = provider or host
+        attempts = settings.HTTP_MAX_RETRIES + 1
+
+        for attempt in range(attempts):
+            if limiter is not None:
+                await limiter.acquire() # Raises RateLimitExceeded when the budget is spent
+            self.requests_total += 1
+            self.in_flight += 1
+            self.in_flight_per_host[host] += 1
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                async with session.get(url, params=params) as response:
+                    outcome = str(response.status)
+                    if response.status == 429:
+                        retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+                        logger.warning("Upstream %s returned 429, backing off for %.0fs", host, retry_after)
+                        self.errors_total += 1
+                        upstream_errors.inc(provider=provider, error="RateLimitExceeded")
+                        if limiter is not None:
+                            await limiter.hold(retry_after)
+                        raise RateLimitExceeded(provider, retry_after)
+                    if response.status in RETRYABLE_STATUSES and attempt < attempts - 1:
+                        logger.warning("Upstream %s returned %s, retrying (%d/%d)", host, response.status, attempt + 1, attempts - 1)
+                    else:
+                        response.raise_for_status() # Raise HTTPError for bad responses (4XX or 5XX)
+                        if response_type == "bytes":
+                            return await response.read()
+                        if response_type == "text":
+                            return await response.text()
+                        return await response.json(content_type=None)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= attempts - 1:
+                    self.errors_total += 1
+                    upstream_errors.inc(provider=provider, error=type(e).__name__)
+                    raise
+                logger.warning("Connection error talking to %s: %r, retrying (%d/%d)", host, e, attempt + 1, attempts - 1)
+            except aiohttp.ClientError as e:
+                self.errors_total += 1
+                upstream_errors.inc(provider=provider, error=type(e).__name__)
+                raise
+            finally:
+                self.in_flight -= 1
+                self.in_flight_per_host[host] -= 1
+                upstream_requests.inc(provider=provider, outcome=outcome)
+                upstream_request_duration.observe(time.perf_counter() - start, provider=provider)
+
+            self.retries_total += 1
+            await asyncio.sleep(settings.HTTP_RETRY_BACKOFF * (2 ** attempt))
+
+    async def get_json(self, url: str, params: dict | None = None, provider: str | None = None, limiter: TokenBucket | None = None):
+        """Convenience wrapper returning the decoded JSON body."""
+        return await self.get(url, params=params, response_type="json", provider=provider, limiter=limiter)
+
+    def stats(self) -> dict:
+        """Pool-usage metrics for health checks and monitoring."""
+        connector = self._connector
+        acquired = len(getattr(connector, "_acquired", ())) if connector else 0
+        return {
+            "started": self._session is not None and not self._session.closed,
+            "pool_limit": settings.HTTP_POOL_LIMIT,
+            "pool_limit_per_host": settings.HTTP_POOL_LIMIT_PER_HOST,
+            "connections_in_use": acquired,
+            "in_flight": self.in_flight,
+            "in_flight_per_host": {h: n for h, n in self.in_flight_per_host.items() if n},
+            "requests_total": self.requests_total,
+            "retries_total": self.retries_total,
+            "errors_total": self.errors_total,
+        }
+
+
+# Single shared instance, started/stopped by app.main
+http_client = HTTPClient()
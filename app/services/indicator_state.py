@@ -0,0 +1,249 @@
+import math
+from collections import deque
+
+# Streaming counterparts of the engine in app.services.indicators. Each state
+# advances in O(1) per bar (Bollinger is O(window) with a small constant window)
+# and follows the same seeding conventions, so after replaying a history the
+# latest values match the vectorized results. States serialize to plain dicts
+# so they can be persisted next to the stored series.
+
+
+class RollingMeanState:
+    """Trailing simple moving average over `window` bars."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+        self.updates = 0
+
+    def update(self, x: float):
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(x)
+        self.total += x
+        self.updates += 1
+        if self.updates % (self.window * 50) == 0:
+            self.total = math.fsum(self.values) # Bound floating-point drift of the running sum
+
+    @property
+    def value(self) -> float | None:
+        return self.total / self.window if len(self.values) == self.window else None
+
+    def to_dict(self) -> dict:
+        return {"window": self.window, "values": list(self.values), "updates": self.updates}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RollingMeanState":
+        state = cls(data["window"])
+        state.values.extend(data["values"])
+        state.total = math.fsum(state.values)
+        state.updates = data["updates"]
+        return state
+
+
+class EMAState:
+    """Exponential average seeded with the mean of the first `window` values."""
+
+    def __init__(self, alpha: float, window: int):
+        self.alpha = alpha
+        self.window = window
+        self.count = 0
+        self.seed_total = 0.0
+        self.value: float | None = None
+
+    def update(self, x: float):
+        if self.value is not None:
+            self.value = self.alpha * x + (1.0 - self.alpha) * self.value
+            return
+        self.count += 1
+        self.seed_total += x
+        if self.count == self.window:
+            self.value = self.seed_total / self.window
+
+    def to_dict(self) -> dict:
+        return {"alpha": self.alpha, "window": self.window, "count": self.count,
+                "seed_total": self.seed_total, "value": self.value}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "EMAState":
+        state = cls(data["alpha"], data["window"])
+        state.count = data["count"]
+        state.seed_total = data["seed_total"]
+        state.value = data["value"]
+        return state
+
+
+class WilderRSIState:
+    """RSI with Wilder smoothing of average gains and losses."""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.prev_close: float | None = None
+        self.gains = EMAState(1.0 / period, period)
+        self.losses = EMAState(1.0 / period, period)
+
+    def update(self, close: float):
+        if self.prev_close is not None:
+            delta = close - self.prev_close
+            self.gains.update(max(delta, 0.0))
+            self.losses.update(max(-delta, 0.0))
+        self.prev_close = close
+
+    @property
+    def value(self) -> float | None:
+        if self.gains.value is None or self.losses.value is None:
+            return None
+        if self.losses.value == 0:
+            return 100.0
+        return 100.0 - 100.0 / (1.0 + self.gains.value / self.losses.value)
+
+    def to_dict(self) -> dict:
+        return {"period": self.period, "prev_close": self.prev_close,
+                "gains": self.gains.to_dict(), "losses": self.losses.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "WilderRSIState":
+        state = cls(data["period"])
+        state.prev_close = data["prev_close"]
+        state.gains = EMAState.from_dict(data["gains"])
+        state.losses = EMAState.from_dict(data["losses"])
+        return state
+
+
+class MACDState:
+    """MACD line (fast EMA - slow EMA) and its signal EMA."""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = EMAState(2.0 / (fast + 1), fast)
+        self.slow = EMAState(2.0 / (slow + 1), slow)
+        self.signal = EMAState(2.0 / (signal + 1), signal)
+
+    def update(self, close: float):
+        self.fast.update(close)
+        self.slow.update(close)
+        line = self.line
+        if line is not None:
+            self.signal.update(line)
+
+    @property
+    def line(self) -> float | None:
+        if self.fast.value is None or self.slow.value is None:
+            return None
+        return self.fast.value - self.slow.value
+
+    def to_dict(self) -> dict:
+        return {"fast": self.fast.to_dict(), "slow": self.slow.to_dict(), "signal": self.signal.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MACDState":
+        state = cls.__new__(cls)
+        state.fast = EMAState.from_dict(data["fast"])
+        state.slow = EMAState.from_dict(data["slow"])
+        state.signal = EMAState.from_dict(data["signal"])
+        return state
+
+
+class BollingerState:
+    """Bollinger Bands (population std) over the last `window` closes."""
+
+    def __init__(self, window: int = 20, num_std: float = 2.0):
+        self.window = window
+        self.num_std = num_std
+        self.values = deque(maxlen=window)
+
+    def update(self, close: float):
+        self.values.append(close)
+
+    def bands(self) -> tuple[float, float, float] | tuple[None, None, None]:
+        if len(self.values) < self.window:
+            return None, None, None
+        mean = math.fsum(self.values) / self.window
+        std = math.sqrt(math.fsum((v - mean) ** 2 for v in self.values) / self.window)
+        return mean + self.num_std * std, mean, mean - self.num_std * std
+
+    def to_dict(self) -> dict:
+        return {"window": self.window, "num_std": self.num_std, "values": list(self.values)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BollingerState":
+        state = cls(data["window"], data["num_std"])
+        state.values.extend(data["values"])
+        return state
+
+
+class AnalysisState:
+    """Streaming state for the indicators summarised by latest_analysis.
+
+    Tracks the date of the last bar folded in, so callers can tell which bars
+    of a series still need to be applied (or that history changed underneath).
+    """
+
+    def __init__(self):
+        self.ma50 = RollingMeanState(50)
+        self.ma200 = RollingMeanState(200)
+        self.rsi = WilderRSIState(14)
+        self.macd = MACDState(12, 26, 9)
+        self.bollinger = BollingerState(20, 2.0)
+        self.last_close: float | None = None
+        self.last_date: str | None = None
+        self.rows = 0
+
+    @classmethod
+    def from_history(cls, dates, closes) -> "AnalysisState":
+        """Full recompute by replaying every bar (used when history changes)."""
+        state = cls()
+        state.advance(dates, closes)
+        return state
+
+    def advance(self, dates, closes):
+        """Folds in new bars (oldest first). Dates are ISO strings or Timestamps."""
+        for date, close in zip(dates, closes):
+            close = float(close)
+            self.ma50.update(close)
+            self.ma200.update(close)
+            self.rsi.update(close)
+            self.macd.update(close)
+            self.bollinger.update(close)
+            self.last_close = close
+            self.last_date = str(date)[:10]
+            self.rows += 1
+
+    def latest(self) -> dict:
+        """Latest indicator values, keyed like the summary fields of latest_analysis."""
+        upper, _, lower = self.bollinger.bands()
+        return {
+            "current_price": self.last_close,
+            "ma50": self.ma50.value,
+            "ma200": self.ma200.value,
+            "rsi": self.rsi.value,
+            "macd": self.macd.line,
+            "macd_signal": self.macd.signal.value,
+            "bollinger_upper": upper,
+            "bollinger_lower": lower,
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "ma50": self.ma50.to_dict(),
+            "ma200": self.ma200.to_dict(),
+            "rsi": self.rsi.to_dict(),
+            "macd": self.macd.to_dict(),
+            "bollinger": self.bollinger.to_dict(),
+            "last_close": self.last_close,
+            "last_date": self.last_date,
+            "rows": self.rows,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AnalysisState":
+        state = cls.__new__(cls)
+        state.ma50 = RollingMeanState.from_dict(data["ma50"])
+        state.ma200 = RollingMeanState.from_dict(data["ma200"])
+        state.rsi = WilderRSIState.from_dict(data["rsi"])
+        state.macd = MACDState.from_dict(data["macd"])
+        state.bollinger = BollingerState.from_dict(data["bollinger"])
+        state.last_close = data["last_close"]
+        state.last_date = data["last_date"]
+        state.rows = data["rows"]
+        return state
@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+
+# Maps DataFrame columns (as produced by stock_analyzer) to indicator input names
+INPUT_COLUMNS = {"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"}
+
+
+class Indicator:
+    """A registered indicator: a pure function of float64 arrays plus its metadata.
+
+    `func` receives the arrays named in `inputs` (time on the last axis, so a
+    2-D array computes many symbols at once) and keyword parameters, and returns
+    a dict of output label -> array of the same shape. Inputs are never modified.
+    """
+
+    __slots__ = ("name", "func", "inputs", "params", "outputs")
+
+    def __init__(self, name: str, func, inputs: tuple, params: dict, outputs: tuple):
+        self.name = name
+        self.func = func
+        self.inputs = inputs
+        self.params = params
+        self.outputs = outputs
+
+    def column_names(self, params: dict) -> list[str]:
+        suffix = "_".join(f"{params[p]:g}" for p in self.params)
+        return [f"{label}_{suffix}" if suffix else label for label in self.outputs]
+
+
+INDICATORS: dict[str, Indicator] = {}
+
+
+def register(name: str, inputs: tuple, outputs: tuple, **params):
+    """Decorator adding an indicator function to the registry."""
+    def decorator(func):
+        INDICATORS[name] = Indicator(name, func, inputs, params, outputs)
+        return func
+    return decorator
+
+
+# ---- array helpers ---------------------------------------------------------
+
+def _rolling_sum(x: np.ndarray, window: int) -> np.ndarray:
+    """Trailing rolling sum along the last axis via cumsum; NaN until the window fills."""
+    out = np.full(x.shape, np.nan)
+    if window < 1 or x.shape[-1] < window:
+        return out
+    c = np.cumsum(x, axis=-1)
+    out[..., window - 1] = c[..., window - 1]
+    out[..., window:] = c[..., window:] - c[..., :-window]
+    return out
+
+
+def _ewm(x: np.ndarray, alpha: float, window: int) -> np.ndarray:
+    """Recursive exponential average along the last axis.
+
+    Seeded with the simple mean of the first `window` valid values (the usual
+    TA convention, also what Wilder smoothing uses), NaN before that. Leading
+    NaNs (e.g. from a diff) are skipped. The recursion itself runs in pandas'
+    compiled ewm over all rows at once.
+    """
+    out = np.full(x.shape, np.nan)
+    n = x.shape[-1]
+    valid = ~np.isnan(x).reshape(-1, n).any(axis=0)
+    if not valid.any():
+        return out
+    start = int(np.argmax(valid))
+    seed_end = start + window - 1
+    if seed_end >= n:
+        return out
+    seed = x[..., start:seed_end + 1].mean(axis=-1)
+    rows = np.concatenate([seed[..., None], x[..., seed_end + 1:]], axis=-1).reshape(-1, n - seed_end)
+    smoothed = pd.DataFrame(rows.T).ewm(alpha=alpha, adjust=False).mean().to_numpy().T
+    out[..., seed_end:] = smoothed.reshape(x.shape[:-1] + (n - seed_end,))
+    return out
+
+
+def _shift(x: np.ndarray, periods: int = 1) -> np.ndarray:
+    out = np.full(x.shape, np.nan)
+    out[..., periods:] = x[..., :-periods]
+    return out
+
+
+# ---- indicators --------------------------------------------------------------
+
+@register("sma", inputs=("close",), outputs=("SMA",), window=20)
+def sma(close, window):
+    return {"SMA": _rolling_sum(close, window) / window}
+
+
+@register("ema", inputs=("close",), outputs=("EMA",), span=20)
+def ema(close, span):
+    return {"EMA": _ewm(close, 2.0 / (span + 1), span)}
+
+
+@register("rsi", inputs=("close",), outputs=("RSI",), period=14)
+def rsi(close, period):
+    delta = close - _shift(close)
+    avg_gain = _ewm(np.clip(delta, 0.0, None), 1.0 / period, period) # clip keeps the leading NaN
+    avg_loss = _ewm(np.clip(-delta, 0.0, None), 1.0 / period, period)
+    rs = np.divide(avg_gain, avg_loss, out=np.full(close.shape, np.inf), where=avg_loss != 0)
+    return {"RSI": 100.0 - 100.0 / (1.0 + rs)}
+
+
+@register("macd", inputs=("close",), outputs=("MACD", "MACD_signal", "MACD_hist"), fast=12, slow=26, signal=9)
+def macd(close, fast, slow, signal):
+    line = _ewm(close, 2.0 / (fast + 1), fast) - _ewm(close, 2.0 / (slow + 1), slow)
+    signal_line = _ewm(line, 2.0 / (signal + 1), signal)
+    return {"MACD": line, "MACD_signal": signal_line, "MACD_hist": line - signal_line}
+
+
+@register("bollinger", inputs=("close",), outputs=("BB_upper", "BB_middle", "BB_lower"), window=20, num_std=2.0)
+def bollinger(close, window, num_std):
+    # Center on the first price so the sum-of-squares variance does not lose precision
+    centered = close - close[..., :1]
+    mean_c = _rolling_sum(centered, window) / window
+    var = np.maximum(_rolling_sum(centered * centered, window) / window - mean_c * mean_c, 0.0)
+    std = np.sqrt(var)
+    middle = mean_c + close[..., :1]
+    return {"BB_upper": middle + num_std * std, "BB_middle": middle, "BB_lower": middle - num_std * std}
+
+
+@register("atr", inputs=("high", "low", "close"), outputs=("ATR",), period=14)
+def atr(high, low, close, period):
+    prev_close = _shift(close)
+    true_range = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return {"ATR": _ewm(true_range, 1.0 / period, period)}
+
+
+@register("vwap", inputs=("high", "low", "close", "volume"), outputs=("VWAP",), window=20)
+def vwap(high, low, close, volume, window):
+    typical = (high + low + close) / 3.0
+    pv = _rolling_sum(typical * volume, window)
+    vol = _rolling_sum(volume, window)
+    return {"VWAP": np.divide(pv, vol, out=np.full(pv.shape, np.nan), where=vol > 0)}
+
+
+# ---- public API ----------------------------------------------------------------
+
+def parse_spec(spec: str) -> tuple[Indicator, dict]:
+    """Parses "name" or "name:arg1:arg2" (args in parameter order) into an indicator and params.
+
+    Raises ValueError for unknown names or bad arguments.
+    """
+    name, *args = spec.strip().lower().split(":")
+    indicator = INDICATORS.get(name)
+    if indicator is None:
+        raise ValueError(f"Unknown indicator '{name}'. Available: {', '.join(sorted(INDICATORS))}")
+    if len(args) > len(indicator.params):
+        raise ValueError(f"Too many arguments for '{name}' (takes {', '.join(indicator.params) or 'none'})")
+    params = dict(indicator.params)
+    for key, raw in zip(indicator.params, args):
+        try:
+            value = type(indicator.params[key])(raw)
+        except ValueError:
+            raise ValueError(f"Invalid value '{raw}' for {name} parameter '{key}'")
+        if value <= 0:
+            raise ValueError(f"{name} parameter '{key}' must be positive")
+        params[key] = value
+    return indicator, params
+
+
+def compute_indicators(inputs: dict, specs: list[str]) -> dict[str, np.ndarray]:
+    """Computes every indicator in `specs` over float64 input arrays.
+
+    `inputs` maps input names ("open", "high", "low", "close", "volume") to
+    arrays with time on the last axis; 2-D arrays compute a batch of symbols in
+    one pass. Returns output column name -> array.
+    """
+    arrays = {key: np.asarray(value, dtype=np.float64) for key, value in inputs.items()}
+    results = {}
+    for spec in specs:
+        indicator, params = parse_spec(spec)
+        missing = [name for name in indicator.inputs if name not in arrays]
+        if missing:
+            raise ValueError(f"Indicator '{indicator.name}' needs input(s): {', '.join(missing)}")
+        outputs = indicator.func(*(arrays[name] for name in indicator.inputs), **params)
+        for label, column in zip(indicator.outputs, indicator.column_names(params)):
+            results[column] = outputs[label]
+    return results
+
+
+def indicator_frame(df: pd.DataFrame, specs: list[str]) -> pd.DataFrame:
+    """Returns a new DataFrame of indicator columns aligned to `df.index` (df is not modified)."""
+    inputs = {
+        name: df[column].to_numpy(dtype=np.float64)
+        for name, column in INPUT_COLUMNS.items() if column in df.columns
+    }
+    return pd.DataFrame(compute_indicators(inputs, specs), index=df.index)
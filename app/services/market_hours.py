@@ -0,0 +1,34 @@
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+# US equity regular session (exchange holidays are not modelled)
+MARKET_TZ = ZoneInfo("America/New_York")
+MARKET_OPEN = time(9, 30)
+MARKET_CLOSE = time(16, 0)
+
+
+def market_now(now: datetime | None = None) -> datetime:
+    if now is None:
+        return datetime.now(MARKET_TZ)
+    if now.tzinfo is None:
+        now = now.replace(tzinfo=MARKET_TZ)
+    return now.astimezone(MARKET_TZ)
+
+
+def is_market_open(now: datetime | None = None) -> bool:
+    """True during the regular Mon-Fri trading session."""
+    now = market_now(now)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def seconds_until_next_open(now: datetime | None = None) -> float:
+    """Seconds until the next session opens (0 while the market is open)."""
+    now = market_now(now)
+    if is_market_open(now):
+        return 0.0
+    candidate = datetime.combine(now.date(), MARKET_OPEN, tzinfo=MARKET_TZ)
+    if now >= candidate:
+        candidate += timedelta(days=1)
+    while candidate.weekday() >= 5:
+        candidate += timedelta(days=1)
+    return (candidate - now).total_seconds()
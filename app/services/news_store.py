@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = ("hour", "day")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    url TEXT PRIMARY KEY,
+    title TEXT,
+    source TEXT,
+    published_at TEXT NOT NULL, -- UTC, '%Y-%m-%dT%H:%M:%SZ' (sorts chronologically)
+    sentiment TEXT NOT NULL,
+    score REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS query_articles (
+    query TEXT NOT NULL,
+    url TEXT NOT NULL REFERENCES articles(url),
+    published_at TEXT NOT NULL,
+    PRIMARY KEY (query, url)
+);
+CREATE INDEX IF NOT EXISTS query_articles_by_time ON query_articles (query, published_at);
+CREATE TABLE IF NOT EXISTS queries (
+    query TEXT PRIMARY KEY,
+    newest_published_at TEXT,
+    last_fetched REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rollups (
+    query TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    bucket_start TEXT NOT NULL,
+    articles INTEGER NOT NULL,
+    score_sum REAL NOT NULL,
+    positive INTEGER NOT NULL,
+    negative INTEGER NOT NULL,
+    neutral INTEGER NOT NULL,
+    PRIMARY KEY (query, bucket, bucket_start)
+);
+"""
+
+_ROLLUP_UPSERT = """
+INSERT INTO rollups (query, bucket, bucket_start, articles, score_sum, positive, negative, neutral)
+VALUES (?, ?, ?, 1, ?, ?, ?, ?)
+ON CONFLICT (query, bucket, bucket_start) DO UPDATE SET
+    articles = articles + 1,
+    score_sum = score_sum + excluded.score_sum,
+    positive = positive + excluded.positive,
+    negative = negative + excluded.negative,
+    neutral = neutral + excluded.neutral
+"""
+
+
+def normalize_timestamp(value: str | None) -> str | None:
+    """ISO 8601 timestamp (NewsAPI sends '...Z') -> UTC '%Y-%m-%dT%H:%M:%SZ', or None if unparseable."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def bucket_start(published_at: str, bucket: str) -> str:
+    """Start of the hour/day bucket a normalized timestamp falls in."""
+    if bucket == "hour":
+        return published_at[:13] + ":00:00Z"
+    return published_at[:10] + "T00:00:00Z"
+
+
+class NewsStore:
+    """SQLite store of scored news articles with per-query hourly/daily sentiment rollups.
+
+    Articles are deduplicated by URL, so each one is scored once no matter how
+    many fetches or queries return it. Rollups are maintained incrementally as
+    articles are linked to a query, so sentiment-over-time reads a handful of
+    pre-aggregated rows instead of rescanning (or refetching) articles.
+
+    Every query runs on a thread (asyncio.to_thread): with several workers the
+    file is shared, and waiting on another worker's write lock (up to the
+    10 s busy timeout) must not stall the event loop.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path if path is not None else settings.NEWS_STORE_PATH
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def _known_urls(self, urls: list[str]) -> set[str]:
+        if not urls:
+            return set()
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT url FROM articles WHERE url IN ({','.join('?' * len(urls))})", urls
+            ).fetchall()
+        return {row["url"] for row in rows}
+
+    def _add_articles(self, query: str, articles: list[dict]) -> int:
+        added = 0
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                for article in articles:
+                    if "sentiment" in article:
+                        conn.execute(
+                            "INSERT OR IGNORE INTO articles (url, title, source, published_at, sentiment, score) VALUES (?, ?, ?, ?, ?, ?)",
+                            (article["url"], article["title"], article["source"], article["published_at"], article["sentiment"], article["score"]),
+                        )
+                    linked = conn.execute(
+                        "INSERT OR IGNORE INTO query_articles (query, url, published_at) VALUES (?, ?, ?)",
+                        (query, article["url"], article["published_at"]),
+                    ).rowcount
+                    if not linked:
+                        continue # Already counted for this query
+                    added += 1
+                    sentiment, score = conn.execute("SELECT sentiment, score FROM articles WHERE url = ?", (article["url"],)).fetchone()
+                    for bucket in BUCKETS:
+                        conn.execute(_ROLLUP_UPSERT, (
+                            query, bucket, bucket_start(article["published_at"], bucket), score,
+                            int(sentiment == "positive"), int(sentiment == "negative"), int(sentiment == "neutral"),
+                        ))
+        return added
+
+    def _mark_fetched(self, query: str, fetched_at: float | None = None):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                newest = conn.execute("SELECT MAX(published_at) FROM query_articles WHERE query = ?", (query,)).fetchone()[0]
+                conn.execute(
+                    "INSERT INTO queries (query, newest_published_at, last_fetched) VALUES (?, ?, ?) "
+                    "ON CONFLICT (query) DO UPDATE SET newest_published_at = excluded.newest_published_at, last_fetched = excluded.last_fetched",
+                    (query, newest, fetched_at if fetched_at is not None else time.time()),
+                )
+
+    def _query_state(self, query: str) -> tuple[str | None, float | None]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT newest_published_at, last_fetched FROM queries WHERE query = ?", (query,)
+            ).fetchone()
+        return (row["newest_published_at"], row["last_fetched"]) if row else (None, None)
+
+    def _recent_articles(self, query: str, since: str, limit: int) -> list[dict]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT a.title, a.source, a.published_at, a.url, a.sentiment, a.score FROM query_articles q "
+                "JOIN articles a ON a.url = q.url WHERE q.query = ? AND q.published_at >= ? "
+                "ORDER BY q.published_at DESC LIMIT ?",
+                (query, since, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _rollups(self, query: str, bucket: str, since: str) -> list[dict]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT bucket_start, articles, score_sum, positive, negative, neutral FROM rollups "
+                "WHERE query = ? AND bucket = ? AND bucket_start >= ? ORDER BY bucket_start",
+                (query, bucket, bucket_start(since, bucket)),
+            ).fetchall()
+        return [
+            {
+                "start": row["bucket_start"],
+                "articles": row["articles"],
+                "mean_score": round(row["score_sum"] / row["articles"], 4),
+                "positive": row["positive"],
+                "negative": row["negative"],
+                "neutral": row["neutral"],
+            }
+            for row in rows
+        ]
+
+    def _ping(self) -> bool:
+        try:
+            with self._lock:
+                self._connection().execute("SELECT 1 FROM queries LIMIT 1").fetchall()
+            return True
+        except sqlite3.Error as e:
+            logger.warning("News store is unavailable: %s", e)
+            return False
+
+    async def known_urls(self, urls: list[str]) -> set[str]:
+        """The subset of `urls` already stored (and scored)."""
+        return await asyncio.to_thread(self._known_urls, urls)
+
+    async def add_articles(self, query: str, articles: list[dict]) -> int:
+        """Stores scored articles for a query and folds new query links into the rollups.
+
+        Each article dict has url, title, source and published_at (normalized),
+        plus sentiment and score unless the URL is already stored. Returns how
+        many articles were new for this query.
+        """
+        return await asyncio.to_thread(self._add_articles, query, articles)
+
+    async def mark_fetched(self, query: str, fetched_at: float | None = None):
+        """Records an upstream fetch for a query and its newest stored article."""
+        await asyncio.to_thread(self._mark_fetched, query, fetched_at)
+
+    async def query_state(self, query: str) -> tuple[str | None, float | None]:
+        """(newest stored published_at, last upstream fetch time) for a query."""
+        return await asyncio.to_thread(self._query_state, query)
+
+    async def recent_articles(self, query: str, since: str, limit: int) -> list[dict]:
+        """Newest-first articles for a query published at or after `since`."""
+        return await asyncio.to_thread(self._recent_articles, query, since, limit)
+
+    async def rollups(self, query: str, bucket: str, since: str) -> list[dict]:
+        """Pre-aggregated buckets for a query, oldest first."""
+        return await asyncio.to_thread(self._rollups, query, bucket, since)
+
+    async def ping(self) -> bool:
+        """True when the database can be opened and queried."""
+        return await asyncio.to_thread(self._ping)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Shared store, closed on application shutdown
+news_store = NewsStore()
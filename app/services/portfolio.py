@@ -0,0 +1,174 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def price_column(df: pd.DataFrame) -> str:
+    """Adjusted close when the series has it (splits and dividends would otherwise look like returns)."""
+    return "Adjusted close" if "Adjusted close" in df.columns else "Close"
+
+
+def align_prices(frames: list[pd.DataFrame]) -> tuple[np.ndarray, np.ndarray]:
+    """Puts several daily series on one date index.
+
+    Returns (dates, prices): the union of all dates (datetime64[ns]) and a
+    (dates x series) float64 matrix, NaN where a series has no bar that day.
+    """
+    indexes = [df.index.values for df in frames]
+    if all(len(index) == len(indexes[0]) and (index == indexes[0]).all() for index in indexes[1:]):
+        dates = indexes[0] # Usual case: every symbol traded on the same days
+    else:
+        dates = np.unique(np.concatenate(indexes))
+    prices = np.full((len(dates), len(frames)), np.nan)
+    for j, (df, index) in enumerate(zip(frames, indexes)):
+        prices[np.searchsorted(dates, index), j] = df[price_column(df)].to_numpy(dtype=np.float64)
+    return dates, prices
+
+
+def common_window(prices: np.ndarray) -> int:
+    """First row from which every column has a price (0 if a column has none at all)."""
+    valid = ~np.isnan(prices)
+    if not valid.any(axis=0).all():
+        return 0
+    return int(valid.argmax(axis=0).max())
+
+
+def forward_fill(prices: np.ndarray) -> np.ndarray:
+    """Carries each column's last price over gaps (halts, exchange holidays), without a Python loop."""
+    rows = np.arange(len(prices))[:, None]
+    last_valid = np.where(~np.isnan(prices), rows, 0)
+    np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+    return prices[last_valid, np.arange(prices.shape[1])]
+
+
+def rolling_std(returns: np.ndarray, window: int) -> np.ndarray:
+    """Sample standard deviation over a trailing window, per column, from running sums.
+
+    Row i covers returns[i:i + window]; the result has len(returns) - window + 1 rows.
+    """
+    x = returns if returns.ndim == 2 else returns[:, None]
+    zeros = np.zeros((1, x.shape[1]))
+    sums = np.concatenate([zeros, np.cumsum(x, axis=0)])
+    squares = np.concatenate([zeros, np.cumsum(x * x, axis=0)])
+    s = sums[window:] - sums[:-window]
+    s2 = squares[window:] - squares[:-window]
+    var = np.maximum((s2 - s * s / window) / (window - 1), 0.0) # Clip rounding noise below zero
+    std = np.sqrt(var)
+    return std if returns.ndim == 2 else std[:, 0]
+
+
+def drawdowns(wealth: np.ndarray) -> np.ndarray:
+    """Fall from the running peak (0 at a new high, -0.25 for 25% below it), per column."""
+    return wealth / np.maximum.accumulate(wealth, axis=0) - 1.0
+
+
+def analyze_portfolio(
+    dates: np.ndarray,
+    prices: np.ndarray,
+    weights: np.ndarray,
+    benchmark: np.ndarray | None = None,
+    confidence: float = 0.95,
+    window: int = 21,
+) -> dict:
+    """Risk and return statistics for a daily-rebalanced portfolio.
+
+    `prices` is the aligned (dates x symbols) matrix from align_prices and
+    `weights` the target weights (normalized here); `benchmark` is the
+    benchmark's price column on the same dates. Everything is computed as
+    whole-matrix NumPy operations over the window where all symbols (and the
+    benchmark) have prices. Returns, volatilities and covariances are
+    annualized with 252 trading days; VaR/CVaR are one-day losses at
+    `confidence`, as positive fractions of portfolio value.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    weights = weights / weights.sum()
+    if benchmark is not None:
+        prices = np.column_stack([prices, benchmark])
+    prices = forward_fill(prices) # Before slicing, so a gap on the first common day is filled too
+    start = common_window(prices)
+    prices, dates = prices[start:], dates[start:]
+    if benchmark is not None:
+        prices, benchmark = prices[:, :-1], prices[:, -1]
+    if len(prices) < window + 2:
+        raise ValueError(f"Not enough overlapping history: {len(prices)} common days, need at least {window + 2}.")
+
+    returns = prices[1:] / prices[:-1] - 1.0 # (days - 1) x symbols
+    n = len(returns)
+    mean = returns.mean(axis=0)
+    centered = returns - mean
+    cov = centered.T @ centered / (n - 1)
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = cov / np.outer(std, std) # NaN for a constant series
+    np.fill_diagonal(corr, 1.0)
+
+    # Portfolio: constant weights, rebalanced daily
+    port_returns = returns @ weights
+    port_var = float(weights @ cov @ weights)
+    port_std = np.sqrt(port_var)
+    wealth = np.cumprod(1.0 + port_returns)
+    port_drawdown = drawdowns(np.concatenate([[1.0], wealth]))
+    trough = int(port_drawdown.argmin())
+    peak = int(np.argmax(np.concatenate([[1.0], wealth])[:trough + 1]))
+
+    # One-day VaR/CVaR: historical (empirical quantile) and parametric (normal)
+    cutoff = np.quantile(port_returns, 1.0 - confidence)
+    tail = port_returns[port_returns <= cutoff]
+    z = NormalDist().inv_cdf(1.0 - confidence)
+
+    beta = None
+    if benchmark is not None:
+        bench_returns = benchmark[1:] / benchmark[:-1] - 1.0
+        bench_centered = bench_returns - bench_returns.mean()
+        bench_var = bench_centered @ bench_centered / (n - 1)
+        beta = centered.T @ bench_centered / (n - 1) / bench_var if bench_var > 0 else np.full(len(weights), np.nan)
+
+    years = n / TRADING_DAYS_PER_YEAR
+    rolling = rolling_std(returns, window) * np.sqrt(TRADING_DAYS_PER_YEAR)
+    port_rolling = rolling_std(port_returns, window) * np.sqrt(TRADING_DAYS_PER_YEAR)
+    asset_wealth = prices / prices[0]
+
+    return {
+        "start": pd.Timestamp(dates[0]).strftime('%Y-%m-%d'),
+        "end": pd.Timestamp(dates[-1]).strftime('%Y-%m-%d'),
+        "observations": n,
+        "weights": weights,
+        "portfolio": {
+            "annual_return": float(wealth[-1] ** (1.0 / years) - 1.0),
+            "annual_volatility": float(port_std * np.sqrt(TRADING_DAYS_PER_YEAR)),
+            "sharpe": float(port_returns.mean() / port_std * np.sqrt(TRADING_DAYS_PER_YEAR)) if port_std > 0 else None,
+            "var": {
+                "confidence": confidence,
+                "historical": float(-cutoff),
+                "parametric": float(-(port_returns.mean() + z * port_std)),
+            },
+            "cvar": float(-tail.mean()),
+            "max_drawdown": float(port_drawdown[trough]),
+            "max_drawdown_peak": pd.Timestamp(dates[peak]).strftime('%Y-%m-%d'),
+            "max_drawdown_trough": pd.Timestamp(dates[trough]).strftime('%Y-%m-%d'),
+            "current_drawdown": float(port_drawdown[-1]),
+            "beta": float(weights @ beta) if beta is not None else None,
+        },
+        "assets": {
+            "annual_return": asset_wealth[-1] ** (1.0 / years) - 1.0,
+            "annual_volatility": std * np.sqrt(TRADING_DAYS_PER_YEAR),
+            "rolling_volatility": rolling[-1],
+            "max_drawdown": drawdowns(asset_wealth).min(axis=0),
+            "beta": beta,
+            # Share of portfolio variance each position contributes (sums to 1)
+            "risk_contribution": weights * (cov @ weights) / port_var if port_var > 0 else None,
+        },
+        "series": {
+            "index": dates.astype("datetime64[ms]").astype(np.int64),
+            "value": np.concatenate([[1.0], wealth]),
+            "drawdown": port_drawdown,
+            # Trailing-window volatility, aligned to the window's last day (null before it fills)
+            "rolling_volatility": np.concatenate([np.full(window, np.nan), port_rolling]),
+        },
+        "rolling_window": window,
+        "covariance": cov * TRADING_DAYS_PER_YEAR,
+        "correlation": corr,
+    }
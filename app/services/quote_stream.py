@@ -0,0 +1,132 @@
+import asyncio
+import logging
+
+import numpy as np
+import pandas as pd
+from config import settings
+from app.services.stock_analyzer import fetch_stock_data
+
+logger = logging.getLogger(__name__)
+
+# Recent window the pollers read; cheap (compact series, served from the cache)
+STREAM_PERIOD = "1mo"
+BAR_FIELDS = ("Open", "High", "Low", "Close", "Volume")
+
+
+class Subscription:
+    """One client's view of the hub: a bounded queue of messages for its symbols."""
+
+    def __init__(self, symbols: list[str], queue_size: int):
+        self.symbols = symbols
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+
+def _bar_messages(df: pd.DataFrame) -> list[dict]:
+    """Rows as compact bar dicts with epoch-ms timestamps."""
+    times = df.index.values.astype("datetime64[ms]").astype(np.int64)
+    columns = [(field.lower(), df[field].to_numpy()) for field in BAR_FIELDS if field in df.columns]
+    return [
+        {"t": int(t), **{name: float(values[i]) for name, values in columns}}
+        for i, t in enumerate(times)
+    ]
+
+
+class QuoteHub:
+    """Fans out delta bars to any number of subscribers with one poller per symbol.
+
+    Upstream load scales with the number of distinct subscribed symbols, not the
+    number of viewers. Each poller reads the recent series (through the shared
+    cache, so it is coalesced and rate limited like any request) and publishes
+    only bars that are new or changed since its last poll. Subscribers whose
+    queue fills up are dropped instead of slowing everyone else down.
+    """
+
+    def __init__(self):
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._pollers: dict[str, asyncio.Task] = {}
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, symbols: list[str]) -> Subscription:
+        subscription = Subscription(symbols, settings.STREAM_QUEUE_SIZE)
+        for symbol in symbols:
+            self._subscribers.setdefault(symbol, set()).add(subscription)
+            if symbol not in self._pollers:
+                self._pollers[symbol] = asyncio.create_task(self._poll(symbol))
+                logger.info("Started quote poller for %s", symbol)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for symbol in subscription.symbols:
+            subscribers = self._subscribers.get(symbol)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                # Last viewer gone: stop polling this symbol
+                del self._subscribers[symbol]
+                poller = self._pollers.pop(symbol, None)
+                if poller is not None:
+                    poller.cancel()
+                    logger.info("Stopped quote poller for %s", symbol)
+
+    def _drop(self, subscription: Subscription):
+        subscription.dropped = True
+        self.dropped += 1
+        self.unsubscribe(subscription)
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None) # Tells the consumer to disconnect
+        logger.warning("Dropped slow stream subscriber for %s", ', '.join(subscription.symbols))
+
+    def _publish(self, symbol: str, message: dict):
+        for subscription in list(self._subscribers.get(symbol, ())):
+            try:
+                subscription.queue.put_nowait(message)
+                self.published += 1
+            except asyncio.QueueFull:
+                self._drop(subscription)
+
+    async def _poll(self, symbol: str):
+        last_bars: dict[int, dict] = {}
+        while True:
+            try:
+                df = await fetch_stock_data(symbol, period=STREAM_PERIOD)
+                if not df.empty:
+                    bars = _bar_messages(df)
+                    if last_bars:
+                        # Delta only: bars we have not sent yet or whose values moved (today's bar)
+                        changed = [bar for bar in bars if last_bars.get(bar["t"]) != bar]
+                        if changed:
+                            self._publish(symbol, {"type": "bars", "symbol": symbol, "bars": changed})
+                    last_bars = {bar["t"]: bar for bar in bars}
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Quote poller for %s failed: %s", symbol, e)
+            await asyncio.sleep(settings.STREAM_POLL_INTERVAL)
+
+    async def close(self):
+        for poller in self._pollers.values():
+            poller.cancel()
+        await asyncio.gather(*self._pollers.values(), return_exceptions=True)
+        self._pollers.clear()
+        for subscriptions in self._subscribers.values():
+            for subscription in subscriptions:
+                if subscription.queue.full():
+                    subscription.queue.get_nowait()
+                subscription.queue.put_nowait(None)
+        self._subscribers.clear()
+
+    def stats(self) -> dict:
+        return {
+            "symbols": len(self._pollers),
+            "subscriptions": len({s for subs in self._subscribers.values() for s in subs}),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+# Shared hub, closed on application shutdown
+quote_hub = QuoteHub()
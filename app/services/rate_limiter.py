@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import time
+
+from config import settings
+from app.services.shared_state import SharedState, shared_state
+
+logger = logging.getLogger(__name__)
+
+RATE_PERIODS = {
+    "s": 1, "sec": 1, "second": 1,
+    "m": 60, "min": 60, "minute": 60,
+    "h": 3600, "hour": 3600,
+    "d": 86400, "day": 86400,
+}
+
+
+class RateLimitExceeded(Exception):
+    """Raised when an upstream call would have to queue longer than allowed."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Rate limit for {name} exceeded, retry in {retry_after:.1f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def parse_rate(rate: str) -> tuple[int, int]:
+    """Parses strings like "100/hour" or "5/min" into (calls, period_seconds)."""
+    try:
+        count, unit = rate.strip().lower().split("/")
+        unit = unit.strip()
+        if unit not in RATE_PERIODS:
+            unit = unit.rstrip("s") # "hours" -> "hour"
+        return int(count), RATE_PERIODS[unit]
+    except (ValueError, KeyError):
+        raise ValueError(f"Invalid rate limit '{rate}', expected e.g. '100/hour'")
+
+
+class TokenBucket:
+    """Async token bucket: `calls` tokens per `period` seconds, bursting up to `calls`.
+
+    Callers reserve a token immediately (the balance may go negative) and sleep
+    until it is theirs, so waiters are served in arrival order without a lock.
+    A call that would wait longer than `max_wait` is rejected instead.
+    With `shared` state the balance lives there, so every worker process
+    spends from one budget instead of each getting its own.
+    """
+
+    def __init__(self, name: str, rate: str, max_wait: float | None = None, shared: SharedState | None = None):
+        self.name = name
+        self.capacity, period = parse_rate(rate)
+        self.refill_per_second = self.capacity / period
+        self.max_wait = max_wait if max_wait is not None else settings.RATE_LIMIT_MAX_WAIT
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self.shared = shared
+        # Counters
+        self.acquired = 0
+        self.queued = 0
+        self.rejected = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+    async def _take(self) -> float:
+        """Reserves a token; returns the balance left (negative: owed to earlier reservations)."""
+        if self.shared is not None:
+            return await self.shared.take_token(self.name, self.capacity, self.refill_per_second)
+        self._refill()
+        self._tokens -= 1
+        return self._tokens
+
+    async def _give_back(self):
+        if self.shared is not None:
+            await self.shared.return_token(self.name)
+        else:
+            self._tokens += 1
+
+    async def acquire(self):
+        tokens = await self._take()
+        if tokens >= 0:
+            self.acquired += 1
+            return
+        wait = -tokens / self.refill_per_second
+        if wait > self.max_wait:
+            await self._give_back() # Give the reservation back
+            self.rejected += 1
+            logger.warning("Rate limit for %s exceeded, rejecting call (would wait %.1fs)", self.name, wait)
+            raise RateLimitExceeded(self.name, wait)
+        self.queued += 1
+        logger.debug("Rate limit for %s: queued call for %.2fs", self.name, wait)
+        try:
+            await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            await self._give_back()
+            raise
+        self.acquired += 1
+
+    async def hold(self, seconds: float):
+        """Empties the bucket so no call is let through for `seconds` (the provider's Retry-After).
+
+        The balance only ever goes down here, so a longer hold already in place is kept.
+        """
+        owed = -seconds * self.refill_per_second
+        if self.shared is not None:
+            await self.shared.hold_tokens(self.name, self.capacity, self.refill_per_second, owed)
+        else:
+            self._refill()
+            self._tokens = min(self._tokens, owed)
+
+    def stats(self) -> dict:
+        if self.shared is not None:
+            tokens = self.shared.tokens(self.name, self.capacity, self.refill_per_second)
+        else:
+            self._refill()
+            tokens = self._tokens
+        return {
+            "capacity": self.capacity,
+            "tokens_available": max(0, round(tokens, 2)),
+            "shared": self.shared is not None,
+            "acquired": self.acquired,
+            "queued": self.queued,
+            "rejected": self.rejected,
+        }
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls so they share one in-flight task.
+
+    The shared task is shielded, so one caller being cancelled does not cancel
+    the upstream call for everyone else waiting on it. With `shared` state the
+    call is also coalesced across worker processes: it runs under a lease, and
+    other workers wait for the coroutine `ready(since)` to report the stored
+    result instead of calling upstream themselves.
+    """
+
+    def __init__(self, name: str, shared: SharedState | None = None):
+        self.name = name
+        self.shared = shared
+        self._in_flight: dict = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn, ready=None):
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        self.calls += 1
+        if self.shared is not None:
+            lease_key = f"{self.name}:{'|'.join(map(str, key)) if isinstance(key, tuple) else key}"
+            task = asyncio.ensure_future(self.shared.run_exclusive(lease_key, fn, ready))
+        else:
+            task = asyncio.ensure_future(fn())
+        self._in_flight[key] = task
+        task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+
+    def _done(self, key, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception() # Mark retrieved even if every waiter was cancelled
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._in_flight)}
+
+
+# One budget per upstream provider (shared by all workers when shared state is enabled)
+alpha_vantage_limiter = TokenBucket("alpha_vantage", settings.ALPHA_VANTAGE_RATE_LIMIT, shared=shared_state)
+news_api_limiter = TokenBucket("news_api", settings.NEWS_API_RATE_LIMIT, shared=shared_state)
@@ -1,108 +1,161 @@
 import aiohttp
 import logging
-from datetime import datetime, timedelta
+import time
+from datetime import datetime, timedelta, timezone
 from config import settings # For API keys
+from app.services.http_client import http_client # Shared pooled session
+from app.services.rate_limiter import RateLimitExceeded, SingleFlight, news_api_limiter
+from app.services.sentiment_engine import score_text, score_texts
+from app.services.executor import cpu_pool
+from app.services.news_store import news_store, normalize_timestamp
+from app.services.shared_state import shared_state
 
-# Placeholder for actual News API (or other source) base URL and key
-NEWS_API_BASE_URL = "https://newsapi.org/v2/everything" # Example
+# NewsAPI endpoint (configurable so load tests can use a local stand-in)
+NEWS_API_BASE_URL = settings.NEWS_API_BASE_URL
 
 logger = logging.getLogger(__name__)
 
+# Concurrent requests for the same query share one NewsAPI call (across workers with shared state)
+news_flights = SingleFlight("news_api", shared=shared_state)
+
+# Articles returned per request (newest first)
+ARTICLES_PER_RESPONSE = 10
+
 async def fetch_news_sentiment(query: str, from_days_ago: int = 7) -> list:
-    """Fetches news articles related to a query and performs basic sentiment scoring (placeholder)."""
-    logger.info(f"Fetching news for sentiment analysis on query: '{query}'")
+    """Returns the latest scored news articles for a query from the local store.
+
+    NewsAPI is called at most once per NEWS_REFRESH_INTERVAL per query, and only
+    for articles newer than the newest one stored; articles already stored are
+    never rescored.
+    """
+    logger.info("Fetching news for sentiment analysis on query: '%s'", query)
     if not settings.NEWS_API_KEY:
         logger.error("News API key is not configured.")
         return []
 
-    from_date = (datetime.now() - timedelta(days=from_days_ago)).strftime('%Y-%m-%d')
+    last_fetched = (await news_store.query_state(query))[1]
+    if last_fetched is None or time.time() - last_fetched >= settings.NEWS_REFRESH_INTERVAL:
+        await news_flights.do(
+            query,
+            lambda: _fetch_and_score_news(query, from_days_ago),
+            ready=lambda since: _refreshed_since(query, since), # Another worker refreshed the store meanwhile
+        )
+    else:
+        logger.info("Serving stored news for '%s' (refreshed %.0fs ago)", query, time.time() - last_fetched)
+
+    since = (datetime.now(timezone.utc) - timedelta(days=from_days_ago)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    articles = await news_store.recent_articles(query, since, ARTICLES_PER_RESPONSE)
+    for article in articles:
+        article["sentiment_score"] = round(article.pop("score"), 2)
+    return articles
+
+async def _refreshed_since(query: str, since: float) -> int | None:
+    """0 (nothing added here) if the query was fetched upstream after `since`, else None."""
+    last_fetched = (await news_store.query_state(query))[1]
+    return 0 if last_fetched is not None and last_fetched >= since else None
+
+async def _fetch_and_score_news(query: str, from_days_ago: int) -> int:
+    """Fetches articles newer than the newest stored one from NewsAPI; scores and stores the new ones.
+
+    Results come newest first, so pages are requested until one comes back
+    short (everything since the stored watermark has been seen) or
+    NEWS_MAX_PAGES is reached, in which case the older part of the gap is
+    skipped and logged. Shared by coalesced callers. Returns how many
+    articles were added.
+    """
+    # Read under the fetch lease: another worker may have refreshed the query since our check
+    newest, last_fetched = await news_store.query_state(query)
+    if last_fetched is not None and time.time() - last_fetched < settings.NEWS_REFRESH_INTERVAL:
+        return 0
+    # Incremental: only what was published since the newest stored article
+    from_date = newest or (datetime.now() - timedelta(days=from_days_ago)).strftime('%Y-%m-%d')
 
     params = {
         "q": query,
         "apiKey": settings.NEWS_API_KEY,
         "sortBy": "publishedAt", # or "relevancy", "popularity"
-        "pageSize": 10, # Number of articles to fetch
+        "pageSize": settings.NEWS_PAGE_SIZE, # Number of articles per page
         "from": from_date,
         "language": "en"
     }
 
-    articles_with_sentiment = []
+    added = 0
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(NEWS_API_BASE_URL, params=params) as response:
-                response.raise_for_status()
-                news_data = await response.json()
-                logger.debug(f"News API response for '{query}': {str(news_data)[:200]}...")
-        
-        if news_data.get("status") == "ok" and news_data.get("articles"):
-            for article in news_data["articles"]:
-                title = article.get("title", "")
-                description = article.get("description", "")
-                content_to_analyze = f"{title}. {description}" # Combine title and description
-                
-                # Placeholder sentiment analysis (very basic)
-                # In a real app, use a proper NLP library (NLTK Vader, spaCy, Transformers, etc.)
-                text_lower = content_to_analyze.lower()
-                score = 0 # Neutral
-                if any(positive_word in text_lower for positive_word in ["good", "great", "positive", "up", "profit", "buy"]):
-                    score += 0.5
-                if any(negative_word in text_lower for negative_word in ["bad", "poor", "negative", "down", "loss", "sell"]):
-                    score -= 0.5
-                
-                sentiment = "neutral"
-                if score > 0.1:
-                    sentiment = "positive"
-                elif score < -0.1:
-                    sentiment = "negative"
-
-                articles_with_sentiment.append({
-                    "title": title,
-                    "source": article.get("source", {}).get("name"),
-                    "published_at": article.get("publishedAt"),
-                    "url": article.get("url"),
-                    "sentiment": sentiment,
-                    "sentiment_score": round(score, 2)
-                })
-            logger.info(f"Processed {len(articles_with_sentiment)} articles for '{query}'")
-        else:
-            logger.warning(f"No articles found or error in News API response for '{query}': {news_data.get('message')}")
-            if "message" in news_data:
-                 logger.error(f"NewsAPI error for {query}: {news_data['message']}")
+        articles, complete = [], False
+        for page in range(1, settings.NEWS_MAX_PAGES + 1):
+            try:
+                # Every attempt spends from the budget; raises RateLimitExceeded when it is spent or NewsAPI answers 429
+                news_data = await http_client.get_json(NEWS_API_BASE_URL, params={**params, "page": page}, provider="news_api", limiter=news_api_limiter)
+            except RateLimitExceeded:
+                if page == 1:
+                    raise
+                break # Keep the newer pages already fetched
+            logger.debug("News API response for '%s' (page %s): %.200s...", query, page, news_data) # Only formatted when DEBUG is on
+            if news_data.get("status") != "ok":
+                logger.warning("Error in News API response for '%s' (page %s): %s", query, page, news_data.get('message'))
+                break
+            page_articles = news_data.get("articles") or []
+            articles.extend(
+                a for a in page_articles
+                if a.get("url") and normalize_timestamp(a.get("publishedAt"))
+            )
+            if len(page_articles) < settings.NEWS_PAGE_SIZE or page * settings.NEWS_PAGE_SIZE >= news_data.get("totalResults", 0):
+                complete = True
+                break
+
+        if articles:
+            # Only articles not stored yet are scored (title and description combined, in one batch)
+            known = await news_store.known_urls([a["url"] for a in articles])
+            fresh = [a for a in articles if a["url"] not in known]
+            scores = await cpu_pool.run(score_texts, [f"{a.get('title') or ''}. {a.get('description') or ''}" for a in fresh])
+            scored = {a["url"]: result for a, result in zip(fresh, scores)}
+            added = await news_store.add_articles(query, [
+                {
+                    "url": article["url"],
+                    "title": article.get("title", ""),
+                    "source": (article.get("source") or {}).get("name"),
+                    "published_at": normalize_timestamp(article.get("publishedAt")),
+                    **scored.get(article["url"], {}), # Known articles keep their stored score
+                }
+                for article in articles
+            ])
+            logger.info("Fetched %s articles for '%s' in %s pages: %s scored, %s new for this query", len(articles), query, page, len(fresh), added)
+        if articles or complete:
+            await news_store.mark_fetched(query)
+        if articles and not complete and newest:
+            logger.warning(
+                "Stopped paging news for '%s' after %s pages without reaching the stored articles; those published between %s and %s were skipped",
+                query, page, newest, normalize_timestamp(articles[-1].get("publishedAt")),
+            )
 
+    except RateLimitExceeded:
+        raise # Let the API layer answer 429 instead of an empty result
     except aiohttp.ClientError as e:
-        logger.error(f"AIOHTTP client error fetching news for '{query}': {e}")
+        logger.error("AIOHTTP client error fetching news for '%s': %s", query, e)
     except Exception as e:
-        logger.error(f"General error fetching/processing news for '{query}': {e}", exc_info=True)
+        logger.error("General error fetching/processing news for '%s': %s", query, e, exc_info=True)
     
-    return articles_with_sentiment
+    return added
+
+async def sentiment_rollups(query: str, bucket: str = "day", days: int = 30) -> list[dict]:
+    """Stored hourly/daily sentiment aggregates for a query (no upstream call)."""
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    return await news_store.rollups(query, bucket, since)
 
 async def analyze_text_sentiment(text: str) -> dict:
-    """Analyzes a given piece of text for sentiment (placeholder)."""
-    logger.info(f"Analyzing sentiment for text: '{text[:50]}...'")
-    # Placeholder sentiment analysis - replace with a real NLP model
-    text_lower = text.lower()
-    score = 0
-    positive_keywords = ["excellent", "amazing", "fantastic", "love", "good", "great", "positive", "recommend", "strong buy"]
-    negative_keywords = ["terrible", "awful", "bad", "poor", "hate", "negative", "avoid", "strong sell"]
-
-    for kw in positive_keywords:
-        if kw in text_lower:
-            score += 0.2
-    for kw in negative_keywords:
-        if kw in text_lower:
-            score -= 0.2
-    
-    # Normalize score (crude example)
-    score = max(-1, min(1, score))
-
-    sentiment_label = "neutral"
-    if score >= 0.1:
-        sentiment_label = "positive"
-    elif score <= -0.1:
-        sentiment_label = "negative"
-    
-    logger.info(f"Sentiment for text: {sentiment_label}, Score: {score:.2f}")
-    return {"text": text, "sentiment": sentiment_label, "score": round(score, 2)}
+    """Analyzes a given piece of text for sentiment with the shared lexicon engine."""
+    logger.info("Analyzing sentiment for text: '%s...'", text[:50])
+    result = score_text(text)
+    logger.info("Sentiment for text: %s, Score: %.2f", result['sentiment'], result['score'])
+    return {"text": text, "sentiment": result["sentiment"], "score": round(result["score"], 2)}
+
+async def analyze_texts_sentiment(texts: list[str]) -> list[dict]:
+    """Scores a batch of texts in one pass of the lexicon engine."""
+    logger.info("Analyzing sentiment for a batch of %s texts", len(texts))
+    return [
+        {"sentiment": result["sentiment"], "score": round(result["score"], 2)}
+        for result in await cpu_pool.run(score_texts, texts)
+    ]
 
 # Example usage (for testing this module directly)
 # import asyncio
@@ -0,0 +1,110 @@
+import math
+from functools import lru_cache
+
+# Lexicon-based sentiment scorer shared by every sentiment code path.
+#
+# The lexicon is compiled once into hash tables of single words and word pairs.
+# Texts are tokenized in C: lowercased, encoded, every byte that is not
+# [a-z0-9] turned into a space with bytes.translate, then split. The scoring
+# loop then does one set lookup per word. Matching is per word, so "up" no
+# longer fires inside "support" or "upgrade", and the cost does not grow with
+# the size of the lexicon.
+
+# term -> weight (positive or negative)
+LEXICON = {
+    # Strong signals
+    "excellent": 2.0, "amazing": 2.0, "fantastic": 2.0, "love": 2.0, "strong buy": 2.0,
+    "outperform": 1.5, "surge": 1.5, "surges": 1.5, "soar": 1.5, "soars": 1.5, "record high": 1.5,
+    "terrible": -2.0, "awful": -2.0, "hate": -2.0, "strong sell": -2.0,
+    "underperform": -1.5, "plunge": -1.5, "plunges": -1.5, "crash": -1.5, "bankruptcy": -2.0,
+    # Regular signals
+    "good": 1.0, "great": 1.5, "positive": 1.0, "profit": 1.0, "profits": 1.0, "buy": 1.0,
+    "recommend": 1.0, "beat": 1.0, "beats": 1.0, "rally": 1.0, "upgrade": 1.0, "upgraded": 1.0, "gain": 0.75, "gains": 0.75,
+    "bad": -1.0, "poor": -1.0, "negative": -1.0, "loss": -1.0, "losses": -1.0, "sell": -1.0,
+    "avoid": -1.0, "miss": -1.0, "misses": -1.0, "downgrade": -1.0, "downgraded": -1.0, "lawsuit": -1.0,
+    # Weak / ambiguous direction words
+    "up": 0.5, "rise": 0.5, "rises": 0.5, "down": -0.5, "fall": -0.5, "falls": -0.5, "drop": -0.5, "drops": -0.5,
+}
+
+NEGATORS = ("not", "no", "never", "without", "hardly", "neither", "nor") # Plus the "n't" contraction
+NEGATION_WINDOW = 3 # A negator flips terms up to this many words after it
+NORMALIZATION_ALPHA = 15.0 # score = raw / sqrt(raw^2 + alpha), maps to (-1, 1)
+LABEL_THRESHOLD = 0.05
+
+# Bytes kept in words: [a-z0-9]; everything else (punctuation, whitespace,
+# UTF-8 bytes of non-ASCII characters) splits them
+_WORD_BYTES = bytes(c if 48 <= c <= 57 or 97 <= c <= 122 else 32 for c in range(256))
+
+# Compiled lexicon (bytes keys, like the words): single words, and word pairs keyed by their first word
+_UNIGRAMS: dict[bytes, float] = {}
+_BIGRAMS: dict[bytes, dict[bytes, float]] = {}
+for _term, _weight in LEXICON.items():
+    _words = _term.lower().encode().split()
+    if len(_words) == 1:
+        _UNIGRAMS[_words[0]] = _weight
+    else:
+        _BIGRAMS.setdefault(_words[0], {})[_words[1]] = _weight
+_NEGATORS = frozenset(word.encode() for word in NEGATORS)
+# Every word the scoring loop has to look at
+_KEYWORDS = frozenset(_UNIGRAMS) | frozenset(_BIGRAMS) | _NEGATORS
+
+
+def _tokenize(text: str) -> list[bytes]:
+    """Lowercase [a-z0-9]+ words of `text` as bytes, with "n't" read as "not"."""
+    data = text.lower().encode().replace(b"n't", b" not").replace("n\u2019t".encode(), b" not")
+    return data.translate(_WORD_BYTES).split()
+
+
+def _label(score: float) -> str:
+    if score >= LABEL_THRESHOLD:
+        return "positive"
+    if score <= -LABEL_THRESHOLD:
+        return "negative"
+    return "neutral"
+
+
+@lru_cache(maxsize=4096) # Sums of a few dozen weights repeat a lot
+def _normalized(value: float) -> tuple[str, float]:
+    """(label, score) for a raw weight sum: raw / sqrt(raw^2 + alpha), rounded."""
+    score = value / math.sqrt(value * value + NORMALIZATION_ALPHA) if value else 0.0
+    return _label(score), round(score, 4)
+
+
+def score_text(text: str) -> dict:
+    """Scores a single text. Returns {"sentiment", "score", "matches"}.
+
+    Each matched term adds its weight, flipped when a negator appears within
+    NEGATION_WINDOW words before it. The raw sum is squashed into (-1, 1) so
+    long texts do not saturate.
+    """
+    words = _tokenize(text)
+    value, matched = 0.0, 0
+    negated_at, consumed = -NEGATION_WINDOW - 1, -1
+    for i, word in enumerate(words):
+        if word not in _KEYWORDS or i <= consumed: # consumed: second word of a matched pair
+            continue
+        pairs = _BIGRAMS.get(word)
+        if pairs is not None and i + 1 < len(words) and words[i + 1] in pairs:
+            weight, consumed = pairs[words[i + 1]], i + 1
+        else:
+            weight = _UNIGRAMS.get(word)
+            if weight is None:
+                if word in _NEGATORS:
+                    negated_at = i
+                continue
+        if i - negated_at <= NEGATION_WINDOW:
+            weight = -weight
+        value += weight
+        matched += 1
+    label, score = _normalized(value)
+    return {"sentiment": label, "score": score, "matches": matched}
+
+
+def score_texts(texts: list[str]) -> list[dict]:
+    """Scores many texts (see score_text), in input order.
+
+    Per text rather than over one joined buffer: a headline is only a dozen
+    words, and walking them directly is cheaper than the separators and hit
+    index a joined pass needs to keep texts apart.
+    """
+    return [score_text(text) for text in texts]
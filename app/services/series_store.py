@@ -0,0 +1,171 @@
+import json
+import logging
+import os
+import re
+import shutil
+
+import numpy as np
+import pandas as pd
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SeriesStore:
+    """Append-only columnar store of settled daily bars, one directory per series.
+
+    Each series directory holds the dates as raw int64 (days since epoch), one
+    raw little-endian float64 file per column and a small meta.json. New bars
+    are appended to every column file and only then committed by rewriting
+    meta.json atomically, so a crash mid-append leaves the previous row count
+    valid. Loading is a handful of np.fromfile calls, no parsing.
+    """
+
+    def __init__(self, root: str | None = None):
+        self.root = root if root is not None else settings.SERIES_STORE_DIR
+
+    def _series_dir(self, symbol: str, function: str) -> str:
+        name = re.sub(r"[^A-Za-z0-9.-]", "-", f"{symbol}_{function}")
+        return os.path.join(self.root, name)
+
+    def _read_meta(self, series_dir: str) -> dict | None:
+        try:
+            with open(os.path.join(series_dir, "meta.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self, series_dir: str, meta: dict):
+        tmp_path = os.path.join(series_dir, "meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(series_dir, "meta.json"))
+
+    def load(self, symbol: str, function: str) -> pd.DataFrame | None:
+        """Returns the stored series (oldest bar first) or None if nothing is stored."""
+        series_dir = self._series_dir(symbol, function)
+        meta = self._read_meta(series_dir)
+        if not meta or meta["rows"] == 0:
+            return None
+        rows = meta["rows"]
+        try:
+            days = np.fromfile(os.path.join(series_dir, "dates.i8"), dtype="<i8", count=rows)
+            columns = {
+                name: np.fromfile(os.path.join(series_dir, f"c{i}.f8"), dtype="<f8", count=rows)
+                for i, name in enumerate(meta["columns"])
+            }
+        except (OSError, ValueError) as e:
+            logger.warning("Stored series for %s (%s) is unreadable: %s", symbol, function, e)
+            return None
+        if len(days) != rows or any(len(values) != rows for values in columns.values()):
+            logger.warning("Stored series for %s (%s) is truncated, ignoring it", symbol, function)
+            return None
+        index = pd.DatetimeIndex(days.astype("datetime64[D]").astype("datetime64[ns]"))
+        return pd.DataFrame(columns, index=index)
+
+    def write(self, symbol: str, function: str, df: pd.DataFrame):
+        """Replaces the stored series entirely (used after a full refetch)."""
+        series_dir = self._series_dir(symbol, function)
+        tmp_dir = f"{series_dir}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        self._write_columns(tmp_dir, df, mode="wb")
+        self._write_meta(tmp_dir, {"columns": list(df.columns), "rows": len(df)})
+        shutil.rmtree(series_dir, ignore_errors=True)
+        os.replace(tmp_dir, series_dir)
+        logger.info("Stored full series for %s (%s): %s bars", symbol, function, len(df))
+
+    def append(self, symbol: str, function: str, df: pd.DataFrame):
+        """Appends bars newer than the stored ones. Columns must match the stored series."""
+        if df.empty:
+            return
+        series_dir = self._series_dir(symbol, function)
+        meta = self._read_meta(series_dir)
+        if meta is None:
+            self.write(symbol, function, df)
+            return
+        if list(df.columns) != meta["columns"]:
+            raise ValueError(f"Column mismatch appending to {symbol} ({function})")
+        rows = meta["rows"]
+        # Drop any bytes left behind by an append that never committed
+        for path in self._column_paths(series_dir, len(meta["columns"])):
+            with open(path, "r+b") as f:
+                f.truncate(rows * 8)
+        self._write_columns(series_dir, df, mode="ab")
+        meta["rows"] = rows + len(df)
+        self._write_meta(series_dir, meta)
+        logger.info("Appended %s bars to stored series for %s (%s)", len(df), symbol, function)
+
+    def _column_paths(self, series_dir: str, n_columns: int) -> list[str]:
+        return [os.path.join(series_dir, "dates.i8")] + [
+            os.path.join(series_dir, f"c{i}.f8") for i in range(n_columns)
+        ]
+
+    def _write_columns(self, series_dir: str, df: pd.DataFrame, mode: str):
+        days = df.index.values.astype("datetime64[D]").astype("<i8")
+        paths = self._column_paths(series_dir, len(df.columns))
+        with open(paths[0], mode) as f:
+            days.tofile(f)
+        for path, name in zip(paths[1:], df.columns):
+            with open(path, mode) as f:
+                df[name].to_numpy(dtype="<f8").tofile(f)
+
+    def load_state(self, symbol: str, function: str, name: str) -> dict | None:
+        """Loads a JSON state blob (e.g. streaming indicator state) kept next to the series."""
+        path = os.path.join(self._series_dir(symbol, function), f"{name}.json")
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.warning("Stored %s state for %s (%s) is unreadable: %s", name, symbol, function, e)
+            return None
+
+    def save_state(self, symbol: str, function: str, name: str, state: dict):
+        """Atomically writes a JSON state blob next to the series. A full rewrite of the series drops it."""
+        series_dir = self._series_dir(symbol, function)
+        if not os.path.isdir(series_dir):
+            return
+        tmp_path = os.path.join(series_dir, f"{name}.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, os.path.join(series_dir, f"{name}.json"))
+
+    def delete(self, symbol: str, function: str):
+        shutil.rmtree(self._series_dir(symbol, function), ignore_errors=True)
+
+
+def merge_recent_bars(stored: pd.DataFrame, recent: pd.DataFrame, settled_before: pd.Timestamp):
+    """Merges a recent (compact) download into a stored series.
+
+    Returns (merged, new_settled_bars), or None when the stored history can no
+    longer be trusted and a full refetch is required: the recent window does not
+    reach back to the stored bars (a gap), the columns changed, or overlapping
+    bars differ (a split/dividend re-adjusted the history).
+    Only bars dated before `settled_before` are returned for persisting; later
+    bars (today's, still moving) are kept in the merged frame only.
+    """
+    if list(recent.columns) != list(stored.columns):
+        return None
+    last_stored = stored.index[-1]
+    if recent.index[0] > last_stored:
+        return None # Gap between stored history and the recent window
+
+    overlap = recent.index[recent.index <= last_stored]
+    if not overlap.isin(stored.index).all():
+        return None # Provider now reports bars we never stored
+    if len(overlap):
+        old = stored.loc[overlap].to_numpy()
+        new = recent.loc[overlap].to_numpy()
+        if old.shape != new.shape or not np.allclose(old, new, rtol=1e-6, atol=1e-9, equal_nan=True):
+            return None
+
+    newer = recent[recent.index > last_stored]
+    new_settled = newer[newer.index < settled_before]
+    merged = pd.concat([stored, newer]) if len(newer) else stored
+    return merged, new_settled
+
+
+# Shared store for persisted daily series
+series_store = SeriesStore()
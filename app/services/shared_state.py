@@ -0,0 +1,277 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL -- Wall-clock seconds: comparable across processes
+);
+CREATE TABLE IF NOT EXISTS series (
+    key TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+# Takes one token in a single statement, so concurrent workers never both spend the last one
+_TAKE_TOKEN = """
+INSERT INTO buckets (name, tokens, updated) VALUES (:name, :capacity - 1, :now)
+ON CONFLICT (name) DO UPDATE SET
+    tokens = MIN(:capacity, tokens + MAX(0, :now - updated) * :rate) - 1,
+    updated = MAX(updated, :now)
+RETURNING tokens
+"""
+
+# Lowers a bucket's balance to :tokens (never raises it), e.g. to hold calls for a provider's Retry-After
+_HOLD_TOKENS = """
+INSERT INTO buckets (name, tokens, updated) VALUES (:name, MIN(:capacity, :tokens), :now)
+ON CONFLICT (name) DO UPDATE SET
+    tokens = MIN(MIN(:capacity, tokens + MAX(0, :now - updated) * :rate), :tokens),
+    updated = MAX(updated, :now)
+"""
+
+# Takes a free or expired lease; a live lease held by someone else is left alone
+_ACQUIRE_LEASE = """
+INSERT INTO leases (key, owner, expires_at) VALUES (:key, :owner, :expires_at)
+ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+WHERE leases.expires_at < :now OR leases.owner = excluded.owner
+"""
+
+
+SERIES_MAGIC = b"FTS1"
+
+
+def encode_series(df: pd.DataFrame) -> bytes:
+    """Raw little-endian encoding of a float series, read back by decode_series.
+
+    Layout: b"FTS1", uint32 header length, UTF-8 JSON header
+    {"rows", "columns", "index", "index_name"}, then the index as int64 ticks
+    of its datetime64 unit, then each float64 column in header order.
+    """
+    index = df.index.values
+    header = json.dumps({"rows": len(df), "columns": list(df.columns), "index": str(index.dtype), "index_name": df.index.name}).encode()
+    columns = df.to_numpy(dtype="<f8").T # (columns x rows), column by column
+    return b"".join([SERIES_MAGIC, struct.pack("<I", len(header)), header, index.view("<i8").tobytes(), columns.tobytes()])
+
+
+def decode_series(payload: bytes) -> pd.DataFrame:
+    """Inverse of encode_series: one copy out of the buffer, no per-value parsing."""
+    if payload[:4] != SERIES_MAGIC:
+        raise ValueError("Not an encoded series")
+    (header_len,) = struct.unpack_from("<I", payload, 4)
+    header = json.loads(payload[8:8 + header_len])
+    rows, columns = header["rows"], header["columns"]
+    offset = 8 + header_len
+    index = np.frombuffer(payload, dtype="<i8", count=rows, offset=offset).view(header["index"])
+    values = np.frombuffer(payload, dtype="<f8", count=rows * len(columns), offset=offset + rows * 8)
+    # (columns x rows) transposed is the block layout pandas stores frames in; copied once out of the read-only buffer
+    return pd.DataFrame(values.reshape(len(columns), rows).T, index=pd.DatetimeIndex(index, name=header["index_name"]), columns=columns, copy=True)
+
+
+class SharedState:
+    """Cross-process state for running several workers: rate-limit budgets, parsed series and fetch leases.
+
+    Backed by one SQLite file in WAL mode, so every uvicorn worker on the host
+    sees the same provider budgets and the same cached series. Leases make
+    sure a series (or news query) is fetched upstream by one worker at a time
+    while the others wait for its result instead of repeating the call.
+
+    Statements that write or move series payloads run on a thread
+    (asyncio.to_thread), so waiting on another worker's write lock (up to the
+    10 s busy timeout) or copying a large series never stalls the event loop.
+    The synchronous reads behind health checks and metrics (tokens, ping) use
+    a second connection with its own lock: a writer thread holding the first
+    one never blocks them, and WAL lets them read while another connection writes.
+    """
+
+    def __init__(self, path: str | None = None, lease_ttl: float | None = None):
+        self.path = path if path is not None else settings.SHARED_STATE_PATH
+        self.lease_ttl = lease_ttl if lease_ttl is not None else settings.SHARED_LEASE_TTL
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._read_conn: sqlite3.Connection | None = None
+        self._read_lock = threading.Lock()
+        # Counters
+        self.series_hits = 0
+        self.lease_waits = 0
+
+    def _open(self, timeout: float) -> sqlite3.Connection:
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Autocommit: every statement here is its own atomic transaction
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=timeout)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = self._open(timeout=10)
+        return self._conn
+
+    def _read(self, sql: str, params=()):
+        """One row from a read on the reader connection (called on the event loop, so a short busy timeout)."""
+        if self.path == ":memory:":
+            return self._execute(sql, params, "one") # A second connection would open a different database
+        with self._read_lock:
+            if self._read_conn is None:
+                self._read_conn = self._open(timeout=1)
+            return self._read_conn.execute(sql, params).fetchone()
+
+    def _execute(self, sql: str, params=(), fetch: str | None = None):
+        with self._lock:
+            cursor = self._connection().execute(sql, params)
+            if fetch == "one":
+                return cursor.fetchone()
+            return cursor.rowcount
+
+    # ---- rate-limit budgets ------------------------------------------------
+
+    async def take_token(self, name: str, capacity: int, refill_per_second: float) -> float:
+        """Refills and takes one token from a shared bucket; returns the balance left (negative: owed)."""
+        params = {"name": name, "capacity": capacity, "rate": refill_per_second, "now": time.time()}
+        return (await asyncio.to_thread(self._execute, _TAKE_TOKEN, params, "one"))[0]
+
+    async def return_token(self, name: str):
+        await asyncio.to_thread(self._execute, "UPDATE buckets SET tokens = tokens + 1 WHERE name = ?", (name,))
+
+    async def hold_tokens(self, name: str, capacity: int, refill_per_second: float, tokens: float):
+        """Lowers a shared bucket's balance to `tokens` (negative: owed) unless it is already lower."""
+        params = {"name": name, "capacity": capacity, "rate": refill_per_second, "tokens": tokens, "now": time.time()}
+        await asyncio.to_thread(self._execute, _HOLD_TOKENS, params)
+
+    def tokens(self, name: str, capacity: int, refill_per_second: float) -> float:
+        """Current balance of a shared bucket (full if it was never used)."""
+        row = self._read("SELECT tokens, updated FROM buckets WHERE name = ?", (name,))
+        if row is None:
+            return float(capacity)
+        tokens, updated = row
+        return min(capacity, tokens + max(0.0, time.time() - updated) * refill_per_second)
+
+    # ---- parsed series -----------------------------------------------------
+
+    def _read_series(self, key: str, newer_than: float) -> tuple[pd.DataFrame, float, float] | None:
+        row = self._execute(
+            "SELECT payload, fetched_at, expires_at FROM series WHERE key = ? AND fetched_at > ?", (key, newer_than), "one"
+        )
+        if row is None:
+            return None
+        try:
+            df = decode_series(row[0])
+        except Exception as e:
+            logger.warning("Shared series %s is unreadable: %s", key, e)
+            return None
+        return df, row[1], row[2]
+
+    async def get_series(self, key: str, newer_than: float = 0.0) -> tuple[pd.DataFrame, float, float] | None:
+        """(df, fetched_at, expires_at) for a key if stored and fetched after `newer_than`.
+
+        The payload is only read (and decoded) when it is newer, so polling is a cheap indexed lookup.
+        """
+        found = await asyncio.to_thread(self._read_series, key, newer_than)
+        if found is not None:
+            self.series_hits += 1
+        return found
+
+    def _write_series(self, key: str, df: pd.DataFrame, fetched_at: float, expires_at: float):
+        self._execute(
+            "INSERT INTO series (key, fetched_at, expires_at, payload) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET fetched_at = excluded.fetched_at, expires_at = excluded.expires_at, payload = excluded.payload "
+            "WHERE excluded.fetched_at >= series.fetched_at",
+            (key, fetched_at, expires_at, encode_series(df)),
+        )
+
+    async def put_series(self, key: str, df: pd.DataFrame, fetched_at: float, expires_at: float):
+        await asyncio.to_thread(self._write_series, key, df, fetched_at, expires_at)
+
+    async def delete_series(self, key: str):
+        await asyncio.to_thread(self._execute, "DELETE FROM series WHERE key = ?", (key,))
+
+    # ---- fetch leases ------------------------------------------------------
+
+    async def acquire_lease(self, key: str) -> bool:
+        now = time.time()
+        params = {"key": key, "owner": self.owner, "expires_at": now + self.lease_ttl, "now": now}
+        return await asyncio.to_thread(self._execute, _ACQUIRE_LEASE, params) > 0
+
+    async def release_lease(self, key: str):
+        await asyncio.to_thread(self._execute, "DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner))
+
+    async def run_exclusive(self, key: str, fn, ready=None, poll_interval: float = 0.1):
+        """Awaits fn() while holding the lease on `key`, so only one worker runs it at a time.
+
+        While another worker holds the lease, `await ready(since)` is polled and
+        its result returned as soon as it is not None (e.g. the series that
+        worker stored after `since`). If the holder finishes (or its lease
+        expires) without that, this worker takes the lease and runs fn() itself.
+        """
+        since = time.time()
+        waited = False
+        while not await self.acquire_lease(key):
+            waited = True
+            await asyncio.sleep(poll_interval)
+            result = await ready(since) if ready is not None else None
+            if result is not None:
+                self.lease_waits += 1
+                return result
+        try:
+            if waited and ready is not None:
+                # The previous holder may have finished between our last poll and the acquire
+                result = await ready(since)
+                if result is not None:
+                    self.lease_waits += 1
+                    return result
+            return await fn()
+        finally:
+            await self.release_lease(key)
+
+    def _ping(self) -> bool:
+        try:
+            self._read("SELECT 1 FROM leases LIMIT 1")
+            return True
+        except sqlite3.Error as e:
+            logger.warning("Shared state is unavailable: %s", e)
+            return False
+
+    async def ping(self) -> bool:
+        """True when the database can be opened and queried."""
+        return await asyncio.to_thread(self._ping)
+
+    def stats(self) -> dict:
+        return {"path": self.path, "series_hits": self.series_hits, "lease_waits": self.lease_waits}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        with self._read_lock:
+            if self._read_conn is not None:
+                self._read_conn.close()
+                self._read_conn = None
+
+
+# Shared across workers when SHARED_STATE_ENABLED (the default with WORKERS > 1); None for a single process
+shared_state = SharedState() if settings.SHARED_STATE_ENABLED else None
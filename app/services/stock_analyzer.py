@@ -1,124 +1,264 @@
+import asyncio
+import time
 import pandas as pd
 import aiohttp # For asynchronous HTTP requests
 from datetime import datetime, timedelta
 import logging
 from config import settings # Assuming API key is here
+from app.services.http_client import http_client # Shared pooled session
+from app.services.cache import stock_cache
+from app.services.rate_limiter import RateLimitExceeded, SingleFlight, alpha_vantage_limiter
+from app.services.series_store import merge_recent_bars, series_store
+from app.services.market_hours import market_now
+from app.services.indicator_state import AnalysisState
+from app.services.executor import cpu_pool
+from app.services.av_parser import parse_series
+from app.services.shared_state import shared_state
 
 logger = logging.getLogger(__name__)
 
-# Placeholder for actual Alpha Vantage (or other API) base URL and key
-ALPHA_VANTAGE_BASE_URL = "https://www.alphavantage.co/query"
+# Alpha Vantage endpoint (configurable so load tests can use a local stand-in)
+ALPHA_VANTAGE_BASE_URL = settings.ALPHA_VANTAGE_BASE_URL
 
-async def fetch_stock_data(symbol: str, period: str = "1y") -> pd.DataFrame:
-    """Fetches historical stock data (e.g., daily) for a given symbol and period."""
-    logger.info(f"Fetching stock data for {symbol}, period: {period}")
-    if not settings.ALPHA_VANTAGE_API_KEY:
-        logger.error("Alpha Vantage API key is not configured.")
-        return pd.DataFrame() # Return empty DataFrame if API key is missing
+# Function used for long periods; its full history is a superset of every shorter period
+FULL_HISTORY_FUNCTION = "TIME_SERIES_DAILY_ADJUSTED"
+
+# Concurrent cache misses for the same (symbol, function) share one upstream call,
+# across worker processes too when shared state is enabled
+series_flights = SingleFlight("alpha_vantage", shared=shared_state)
 
-    # Determine function and outputsize based on period (simplified)
+def _select_function(period: str) -> tuple[str, str]:
+    """Maps a period to the Alpha Vantage function and outputsize that cover it."""
     # Alpha Vantage's free tier has limitations on data size and frequency
     if period in ["1mo", "3mo"]:
-        av_function = "TIME_SERIES_DAILY"
-        outputsize = "compact" # Last 100 data points
-    else: # For "1y", "5y", "max" - adjust as needed, might require TIME_SERIES_DAILY_ADJUSTED for longer periods
-        av_function = "TIME_SERIES_DAILY_ADJUSTED"
-        outputsize = "full" # Full history (can be large)
+        return "TIME_SERIES_DAILY", "compact" # Last 100 data points
+    # For "1y", "5y", "max" - adjust as needed, might require TIME_SERIES_DAILY_ADJUSTED for longer periods
+    return FULL_HISTORY_FUNCTION, "full" # Full history (can be large)
+
+# Calendar days covered by each period; 'max' is everything fetched
+PERIOD_DAYS = {"1mo": 30, "3mo": 90, "1y": 365, "5y": 365*5, "10y": 365*10}
 
+def slice_period(df: pd.DataFrame, period: str) -> pd.DataFrame:
+    """Returns the rows of a full parsed series that fall inside `period`."""
+    # Filter by period (rough estimation, AV outputsize can be tricky)
+    days = PERIOD_DAYS.get(period)
+    if days is not None:
+        # The index is sorted, so the period is a contiguous tail: a positional
+        # slice instead of a boolean mask that copies every column
+        return df.iloc[df.index.searchsorted(datetime.now() - timedelta(days=days)):]
+    # 'max' uses all data fetched by 'full' outputsize. Shallow copy so callers
+    # that reassign the index or add columns never touch the cached frame.
+    return df.copy(deep=False)
+
+async def _download_series(symbol: str, av_function: str, outputsize: str) -> pd.DataFrame:
+    """Downloads and parses one Alpha Vantage series (unsliced, oldest bar first)."""
     params = {
         "function": av_function,
         "symbol": symbol,
         "outputsize": outputsize,
         "apikey": settings.ALPHA_VANTAGE_API_KEY,
-        "datatype": "json" # Or "csv"
+        "datatype": settings.ALPHA_VANTAGE_DATATYPE # CSV is much cheaper to parse than JSON
     }
 
+    # Every attempt (retries too) spends from the budget; raises RateLimitExceeded when it is spent
+    body = await http_client.get(ALPHA_VANTAGE_BASE_URL, params=params, response_type="bytes", provider="alpha_vantage", limiter=alpha_vantage_limiter)
+    logger.debug("Alpha Vantage API response for %s: %r...", symbol, body[:200]) # Log snippet of response
+
+    # Decoding and DataFrame construction run on the worker pool (multi-megabyte payloads)
+    result = await cpu_pool.run(parse_series, body)
+    if isinstance(result, pd.DataFrame):
+        return result
+
+    logger.warning("Unexpected data format from Alpha Vantage for %s: %s", symbol, list(result.keys()))
+    if "Error Message" in result:
+        logger.error("Alpha Vantage API Error for %s: %s", symbol, result['Error Message'])
+    elif "Information" in result: # E.g., API call frequency limit
+        logger.warning("Alpha Vantage API Info for %s: %s", symbol, result['Information'])
+    return pd.DataFrame()
+
+# Name of the streaming indicator state persisted next to each stored series
+ANALYSIS_STATE = "analysis_state"
+
+async def _stored_analysis_state(symbol: str, av_function: str, stored: pd.DataFrame) -> AnalysisState:
+    """Returns the persisted indicator state for a stored series, replaying history if it is missing or out of step."""
+    data = await asyncio.to_thread(series_store.load_state, symbol, av_function, ANALYSIS_STATE)
+    if data is not None:
+        state = AnalysisState.from_dict(data)
+        if state.rows == len(stored) and state.last_date == stored.index[-1].strftime('%Y-%m-%d'):
+            return state
+    logger.info("Recomputing indicator state for %s (%s) from %s stored bars", symbol, av_function, len(stored))
+    state = await cpu_pool.run(AnalysisState.from_history, stored.index, stored['Close'].to_numpy())
+    await asyncio.to_thread(series_store.save_state, symbol, av_function, ANALYSIS_STATE, state.to_dict())
+    return state
+
+async def _full_refetch(symbol: str, av_function: str) -> pd.DataFrame:
+    """Downloads the complete history and replaces the stored series with its settled bars."""
+    df = await _download_series(symbol, av_function, "full")
+    if not df.empty:
+        settled = df[df.index < pd.Timestamp(market_now().date())]
+        await asyncio.to_thread(series_store.write, symbol, av_function, settled)
+        if len(settled) and 'Close' in settled.columns:
+            # History changed: this is the only place indicator state is rebuilt from scratch
+            state = await cpu_pool.run(AnalysisState.from_history, settled.index, settled['Close'].to_numpy())
+            await asyncio.to_thread(series_store.save_state, symbol, av_function, ANALYSIS_STATE, state.to_dict())
+    return df
+
+async def _update_series(symbol: str, av_function: str, outputsize: str) -> pd.DataFrame:
+    """Returns the full series, downloading only the compact window when history is stored.
+
+    Settled bars are persisted per symbol; a warm symbol costs one compact call
+    (~100 bars) instead of the full multi-megabyte history. The full history is
+    refetched only when nothing is stored, or when the compact window reveals a
+    gap or re-adjusted bars (splits/dividends).
+    """
+    if outputsize != "full" or not settings.INCREMENTAL_UPDATES:
+        return await _download_series(symbol, av_function, outputsize)
+
+    # Store reads and writes are file I/O: they run on a thread, like the shared-state calls
+    stored = await asyncio.to_thread(series_store.load, symbol, av_function)
+    if stored is None:
+        logger.info("No stored history for %s (%s), fetching full series", symbol, av_function)
+        return await _full_refetch(symbol, av_function)
+
+    recent = await _download_series(symbol, av_function, "compact")
+    if recent.empty:
+        logger.warning("Compact update for %s returned no data, serving stored history", symbol)
+        return stored
+
+    merged = merge_recent_bars(stored, recent, settled_before=pd.Timestamp(market_now().date()))
+    if merged is None:
+        logger.info("Stored history for %s (%s) has a gap or was re-adjusted, refetching full series", symbol, av_function)
+        return await _full_refetch(symbol, av_function)
+
+    df, new_settled = merged
+    if len(new_settled):
+        state = await _stored_analysis_state(symbol, av_function, stored)
+        await asyncio.to_thread(series_store.append, symbol, av_function, new_settled)
+        state.advance(new_settled.index, new_settled['Close'].to_numpy()) # O(1) per new bar
+        await asyncio.to_thread(series_store.save_state, symbol, av_function, ANALYSIS_STATE, state.to_dict())
+    logger.info("Incremental update for %s: %s new settled bars, %s total", symbol, len(new_settled), len(df))
+    return df
+
+async def fetch_stock_data(symbol: str, period: str = "1y") -> pd.DataFrame:
+    """Fetches historical stock data (e.g., daily) for a given symbol and period.
+
+    The full parsed series is cached per (symbol, function) and every period is
+    served as a slice of it, so switching periods does not hit the provider.
+    """
+    logger.info("Fetching stock data for %s, period: %s", symbol, period)
+    if not settings.ALPHA_VANTAGE_API_KEY:
+        logger.error("Alpha Vantage API key is not configured.")
+        return pd.DataFrame() # Return empty DataFrame if API key is missing
+
+    av_function, outputsize = _select_function(period)
+
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(ALPHA_VANTAGE_BASE_URL, params=params) as response:
-                response.raise_for_status() # Raise HTTPError for bad responses (4XX or 5XX)
-                data = await response.json()
-                logger.debug(f"Alpha Vantage API response for {symbol}: {str(data)[:200]}...") # Log snippet of response
-
-        # Process data based on function (TIME_SERIES_DAILY, TIME_SERIES_INTRADAY, etc.)
-        # This parsing logic needs to be robust to AV API response structure
-        if "Time Series (Daily)" in data:
-            df = pd.DataFrame.from_dict(data["Time Series (Daily)"], orient='index')
-        elif "Monthly Adjusted Time Series" in data: # Example for monthly
-             df = pd.DataFrame.from_dict(data["Monthly Adjusted Time Series"], orient='index')
-        # Add more conditions based on the AV functions you use
-        else:
-            logger.warning(f"Unexpected data format from Alpha Vantage for {symbol}: {list(data.keys())}")
-            if "Error Message" in data:
-                logger.error(f"Alpha Vantage API Error for {symbol}: {data['Error Message']}")
-            elif "Information" in data: # E.g., API call frequency limit
-                logger.warning(f"Alpha Vantage API Info for {symbol}: {data['Information']}")
-            return pd.DataFrame()
-        
-        df.index = pd.to_datetime(df.index)
-        df = df.astype(float) # Ensure numeric types
-        # Standardize column names (Alpha Vantage uses "1. open", "2. high", etc.)
-        df.rename(columns=lambda x: x.split('. ')[-1].capitalize(), inplace=True)
-        df = df.sort_index(ascending=True)
-        
-        # Filter by period (rough estimation, AV outputsize can be tricky)
-        # For more precise period filtering, you might fetch 'full' and then slice
-        if period == "1mo":
-            df = df[df.index >= (datetime.now() - timedelta(days=30))]
-        elif period == "3mo":
-            df = df[df.index >= (datetime.now() - timedelta(days=90))]
-        elif period == "1y":
-            df = df[df.index >= (datetime.now() - timedelta(days=365))]
-        elif period == "5y":
-            df = df[df.index >= (datetime.now() - timedelta(days=365*5))]
-        # 'max' uses all data fetched by 'full' outputsize
-
-        logger.info(f"Successfully fetched and processed data for {symbol}. Shape: {df.shape}")
+        # A fresh full-history entry already covers the short periods
+        df = await stock_cache.get((symbol, FULL_HISTORY_FUNCTION)) if av_function != FULL_HISTORY_FUNCTION else None
+        if df is None:
+            key = (symbol, av_function)
+
+            async def fetch_and_publish():
+                # Another worker may have stored it between our cache miss and taking the lease
+                cached = await stock_cache.get(key)
+                if cached is not None:
+                    return cached
+                # Cached (and shared) before the lease is released, so workers
+                # waiting on it find the series instead of fetching it again
+                fetched = await _update_series(symbol, av_function, outputsize)
+                await stock_cache.put_fetched(key, fetched)
+                return fetched
+
+            df = await stock_cache.get_or_fetch(
+                key,
+                lambda: series_flights.do(
+                    key,
+                    fetch_and_publish,
+                    ready=lambda since: stock_cache.shared_since(key, since), # Another worker fetched it meanwhile
+                ),
+            )
+        if df.empty:
+            return df
+
+        df = slice_period(df, period)
+        logger.info("Successfully fetched and processed data for %s. Shape: %s", symbol, df.shape)
         return df
 
+    except RateLimitExceeded:
+        raise # Let the API layer answer 429 instead of an empty result
     except aiohttp.ClientError as e:
-        logger.error(f"AIOHTTP client error fetching data for {symbol}: {e}")
+        logger.error("AIOHTTP client error fetching data for %s: %s", symbol, e)
         return pd.DataFrame()
     except Exception as e:
-        logger.error(f"General error fetching/processing data for {symbol}: {e}", exc_info=True)
+        logger.error("General error fetching/processing data for %s: %s", symbol, e, exc_info=True)
         return pd.DataFrame()
 
-async def analyze_stock_data(df: pd.DataFrame) -> dict:
-    """Performs basic analysis on the stock data DataFrame (e.g., calculate indicators)."""
-    if df.empty:
-        return {"error": "No data to analyze"}
+def series_expires_at(symbol: str, period: str = "1y") -> float | None:
+    """When the cached series fetch_stock_data(symbol, period) just served expires (wall clock), or None if it is not cached."""
+    av_function, _ = _select_function(period)
+    if av_function != FULL_HISTORY_FUNCTION:
+        # Short periods are served from a fresh full-history entry when there is one
+        expires_at = stock_cache.expires_at((symbol, FULL_HISTORY_FUNCTION))
+        if expires_at is not None and expires_at > time.time():
+            return expires_at
+    return stock_cache.expires_at((symbol, av_function))
 
-    analysis = {}
-    try:
-        # Example: Calculate 50-day and 200-day moving averages
-        if 'Close' in df.columns:
-            df['MA50'] = df['Close'].rolling(window=50).mean()
-            df['MA200'] = df['Close'].rolling(window=200).mean()
-            analysis['current_price'] = df['Close'].iloc[-1] if not df.empty else None
-            analysis['ma50'] = df['MA50'].iloc[-1] if not df.empty and not pd.isna(df['MA50'].iloc[-1]) else None
-            analysis['ma200'] = df['MA200'].iloc[-1] if not df.empty and not pd.isna(df['MA200'].iloc[-1]) else None
-            # Simple buy/sell signal (very naive)
-            if analysis['ma50'] and analysis['ma200']:
-                if analysis['ma50'] > analysis['ma200']:
-                    analysis['signal'] = "Potential Buy (Golden Cross pattern if recent)"
-                else:
-                    analysis['signal'] = "Potential Sell (Death Cross pattern if recent)"
-            else:
-                analysis['signal'] = "Not enough data for MA signal"
+async def fetch_many(symbols: list[str], period: str = "1y", concurrency: int | None = None) -> dict:
+    """Fetches several symbols concurrently (bounded by a semaphore) through the same cache.
+
+    Returns symbol -> DataFrame, or symbol -> Exception for symbols that failed,
+    so one bad symbol never fails the whole batch.
+    """
+    semaphore = asyncio.Semaphore(concurrency or settings.BATCH_CONCURRENCY)
+
+    async def fetch_one(symbol: str):
+        async with semaphore:
+            return await fetch_stock_data(symbol, period=period)
+
+    results = await asyncio.gather(*(fetch_one(symbol) for symbol in symbols), return_exceptions=True)
+    return dict(zip(symbols, results))
+
+def _summarize(values: dict) -> dict:
+    """Builds the analysis summary (latest indicator values plus a naive MA signal)."""
+    analysis = dict(values)
+    # Simple buy/sell signal (very naive)
+    if analysis['ma50'] and analysis['ma200']:
+        if analysis['ma50'] > analysis['ma200']:
+            analysis['signal'] = "Potential Buy (Golden Cross pattern if recent)"
         else:
-            logger.warning("'Close' column not found for MA calculation.")
-            analysis['signal'] = "Close price data missing for analysis"
-
-        # Add more indicators: RSI, MACD, Bollinger Bands, etc.
-        # For Plotly, you might want to return the DataFrame with these indicators added
-        # or specific data points for a summary.
-        analysis["data_for_chart_with_indicators"] = df.to_dict(orient='split')
-        logger.info(f"Stock data analysis completed. Signal: {analysis.get('signal')}")
-        
-    except Exception as e:
-        logger.error(f"Error during stock data analysis: {e}", exc_info=True)
-        analysis["error"] = str(e)
-    
+            analysis['signal'] = "Potential Sell (Death Cross pattern if recent)"
+    else:
+        analysis['signal'] = "Not enough data for MA signal"
+    return analysis
+
+async def latest_analysis(symbol: str) -> dict:
+    """Analysis summary for the latest bar, using the persisted streaming indicator state.
+
+    The stored state already covers every settled bar, so only the bars after it
+    (normally just today's) are folded in: the cost does not grow with history
+    length. Without stored state the history is replayed once.
+    """
+    df = await fetch_stock_data(symbol, period="max")
+    if df.empty or 'Close' not in df.columns:
+        return {"error": "No data to analyze"}
+
+    state = None
+    if settings.INCREMENTAL_UPDATES:
+        data = await asyncio.to_thread(series_store.load_state, symbol, FULL_HISTORY_FUNCTION, ANALYSIS_STATE)
+        if data is not None:
+            state = AnalysisState.from_dict(data)
+            last_date = pd.Timestamp(state.last_date)
+            if last_date not in df.index or df.index.get_loc(last_date) + 1 != state.rows:
+                state = None # Stored state does not line up with this series
+
+    if state is None:
+        state = await cpu_pool.run(AnalysisState.from_history, df.index, df['Close'].to_numpy())
+    else:
+        tail = df[df.index > pd.Timestamp(state.last_date)]
+        state.advance(tail.index, tail['Close'].to_numpy())
+
+    analysis = _summarize(state.latest())
+    analysis['as_of'] = state.last_date
     return analysis
 
 # Example usage (for testing this module directly)
@@ -129,11 +269,10 @@ async def analyze_stock_data(df: pd.DataFrame) -> dict:
 #     if not df.empty:
 #         print(f"--- Data for {symbol} ---")
 #         print(df.tail())
-#         analysis_results = await analyze_stock_data(df.copy()) # Pass a copy for analysis
+#         analysis_results = await latest_analysis(symbol)
 #         print(f"--- Analysis for {symbol} ---")
 #         for key, value in analysis_results.items():
-#             if key != "data_for_chart_with_indicators": # Don't print the full df
-#                 print(f"{key}: {value}")
+#             print(f"{key}: {value}")
 #     else:
 #         print(f"Could not fetch data for {symbol}")
 
@@ -2,8 +2,11 @@
  * Updates the stock chart on the stock.html page.
  * Fetches data from the /api/stocks/stock/{symbol}/data endpoint.
  * @param {string} symbol - The stock symbol.
+ * @param {Object} [options]
+ * @param {boolean} [options.refresh=false] - Redraw the existing chart in place (no loading message,
+ *     no new quote subscription, errors only logged); used to pick up streamed bars on a downsampled chart.
  */
-async function updateStockChart(symbol) {
+async function updateStockChart(symbol, {refresh = false} = {}) {
     const chartContainer = document.getElementById('stockChartContainer');
     const periodSelect = document.getElementById('periodSelect');
     const selectedPeriod = periodSelect ? periodSelect.value : '1y'; // Default to 1y if not found
@@ -13,48 +16,56 @@ async function updateStockChart(symbol) {
         return;
     }
 
-    chartContainer.innerHTML = `<p>Loading chart data for ${symbol} (${selectedPeriod})...</p>`;
+    if (!refresh) {
+        chartContainer.innerHTML = `<p>Loading chart data for ${symbol} (${selectedPeriod})...</p>`;
+    }
 
     try {
         // Use APP_CONFIG.apiBaseUrl defined in base.html for API endpoint construction
-        const apiUrl = `${APP_CONFIG.apiBaseUrl}/stocks/stock/${symbol}/data?period=${selectedPeriod}`;
+        // No point sending more bars than the chart has pixels; the server buckets long ranges
+        const maxPoints = Math.max(100, Math.round(chartContainer.clientWidth || 1000));
+        const apiUrl = `${APP_CONFIG.apiBaseUrl}/stocks/stock/${symbol}/data?period=${selectedPeriod}&format=columns&max_points=${maxPoints}`;
         console.log("Fetching chart data from:", apiUrl);
-        const response = await fetch(apiUrl);
+        // A refresh revalidates with the server (ETag) instead of reusing the browser's cached copy
+        const response = await fetch(apiUrl, refresh ? {cache: 'no-cache'} : {});
 
         if (!response.ok) {
             const errorData = await response.json();
             throw new Error(errorData.detail || `Error fetching chart data: ${response.status}`);
         }
 
-        const data = await response.json(); // Expects data in {index: [...], columns: [...], data: [[...], ...]} format
+        const data = await response.json(); // Expects column-oriented data: {index: [epoch ms, ...], columns: {Open: [...], ...}}
 
         if (!data || !data.index || data.index.length === 0) {
             chartContainer.innerHTML = `<p>No chart data available for ${symbol} for the selected period.</p>`;
             return;
         }
 
-        // Find column indices for OHLC data (case-insensitive matching for flexibility)
-        const findColIndex = (name) => data.columns.findIndex(col => col.toLowerCase() === name.toLowerCase());
-        
-        const dateIndex = data.index;
-        const openIndex = findColIndex('Open');
-        const highIndex = findColIndex('High');
-        const lowIndex = findColIndex('Low');
-        const closeIndex = findColIndex('Close');
-        const volumeIndex = findColIndex('Volume'); // Optional
-
-        if ([openIndex, highIndex, lowIndex, closeIndex].some(idx => idx === -1)) {
-            console.error("Missing one or more OHLC columns in the data:", data.columns);
+        // Find columns by name (case-insensitive matching for flexibility)
+        const findColumn = (name) => {
+            const key = Object.keys(data.columns).find(col => col.toLowerCase() === name.toLowerCase());
+            return key === undefined ? null : data.columns[key];
+        };
+
+        const dateIndex = data.index; // Epoch milliseconds, understood by Plotly's date axis
+        const openValues = findColumn('Open');
+        const highValues = findColumn('High');
+        const lowValues = findColumn('Low');
+        const closeValues = findColumn('Close');
+        const volumeValues = findColumn('Volume'); // Optional
+
+        if ([openValues, highValues, lowValues, closeValues].some(values => values === null)) {
+            console.error("Missing one or more OHLC columns in the data:", Object.keys(data.columns));
             chartContainer.innerHTML = "<p>Chart data is missing required OHLC columns. Cannot render chart.</p>";
             return;
         }
 
         const traceCandlestick = {
             x: dateIndex,
-            open: data.data.map(row => row[openIndex]),
-            high: data.data.map(row => row[highIndex]),
-            low: data.data.map(row => row[lowIndex]),
-            close: data.data.map(row => row[closeIndex]),
+            open: openValues,
+            high: highValues,
+            low: lowValues,
+            close: closeValues,
             type: 'candlestick',
             name: symbol,
             increasing: {line: {color: '#26a69a'}, fillcolor: '#26a69a'}, // Tealish green
@@ -83,10 +94,10 @@ async function updateStockChart(symbol) {
         const plotData = [traceCandlestick];
 
         // Add Volume bar chart if volume data is available
-        if (volumeIndex !== -1) {
+        if (volumeValues !== null) {
             const traceVolume = {
                 x: dateIndex,
-                y: data.data.map(row => row[volumeIndex]),
+                y: volumeValues,
                 type: 'bar',
                 name: 'Volume',
                 yaxis: 'y2', // Plot on a secondary y-axis
@@ -105,12 +116,132 @@ async function updateStockChart(symbol) {
             layout.yaxis2.domain = [0, 0.2]; // Volume chart takes bottom 20%
         }
         
+        // The server only sends fewer points than asked for when it did not bucket the series
+        chartContainer.dataset.downsampled = String(dateIndex.length >= maxPoints);
+
+        if (refresh) {
+            Plotly.react(chartContainer, plotData, layout, {responsive: true});
+            return;
+        }
         Plotly.newPlot(chartContainer, plotData, layout, {responsive: true});
         console.log(`Chart for ${symbol} (${selectedPeriod}) rendered successfully.`);
 
+        subscribeToQuotes(symbol); // Keep the chart live without refetching the history
+
     } catch (error) {
         console.error(`Error rendering chart for ${symbol}:`, error);
-        chartContainer.innerHTML = `<p class="error-message">Failed to load chart data for ${symbol}: ${error.message}</p>`;
+        if (!refresh) {
+            chartContainer.innerHTML = `<p class="error-message">Failed to load chart data for ${symbol}: ${error.message}</p>`;
+        }
+    }
+}
+
+// Currently open quote stream (WebSocket or EventSource); both expose close()
+let quoteStream = null;
+// Pending refetch of a downsampled chart, so a burst of streamed bars costs one request
+let chartRefreshTimer = null;
+
+/**
+ * Subscribes to delta bars for a symbol over WebSocket, falling back to SSE
+ * when the WebSocket cannot connect. New bars extend the existing chart traces.
+ * @param {string} symbol - The stock symbol.
+ */
+function subscribeToQuotes(symbol) {
+    if (quoteStream) {
+        quoteStream.close();
+        quoteStream = null;
+    }
+    const query = `symbols=${encodeURIComponent(symbol)}`;
+    const onMessage = (message) => {
+        if (message.type === 'bars') {
+            applyStreamBars(symbol, message.bars);
+        }
+    };
+    const openSse = () => {
+        const source = new EventSource(`${APP_CONFIG.apiBaseUrl}/stocks/stream/sse?${query}`);
+        source.addEventListener('bars', (event) => onMessage(JSON.parse(event.data)));
+        return source;
+    };
+
+    if (!('WebSocket' in window)) {
+        quoteStream = openSse();
+        return;
+    }
+    const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+    const socket = new WebSocket(`${protocol}://${window.location.host}${APP_CONFIG.apiBaseUrl}/stocks/stream?${query}`);
+    let opened = false;
+    socket.onopen = () => { opened = true; };
+    socket.onmessage = (event) => onMessage(JSON.parse(event.data));
+    socket.onclose = () => {
+        // WebSocket blocked (proxy, firewall): use Server-Sent Events instead
+        if (!opened && quoteStream === socket) {
+            console.warn("Quote WebSocket unavailable, falling back to SSE.");
+            quoteStream = openSse();
+        }
+    };
+    quoteStream = socket;
+}
+
+/**
+ * Applies streamed bars ({t: epoch ms, open, high, low, close, volume}) to the chart.
+ * Bars after the last point are appended with Plotly.extendTraces; an update of
+ * the last bar (today's, still trading) patches it in place.
+ *
+ * A downsampled chart's points are buckets of many bars, keyed by the first
+ * bar's date, and the last bucket already contains the bar being updated, so
+ * its volume cannot be corrected here. Such charts are refetched instead
+ * (the server re-buckets the updated series) at most once per second.
+ * @param {string} symbol - The stock symbol.
+ * @param {Array<Object>} bars - Delta bars, oldest first.
+ */
+function applyStreamBars(symbol, bars) {
+    const chart = document.getElementById('stockChartContainer');
+    if (!chart || !chart.data || chart.data.length === 0) {
+        return;
+    }
+    if (chart.dataset.downsampled === 'true') {
+        if (chartRefreshTimer === null) {
+            chartRefreshTimer = setTimeout(() => {
+                chartRefreshTimer = null;
+                updateStockChart(symbol, {refresh: true});
+            }, 1000);
+        }
+        return;
+    }
+    const candles = chart.data[0];
+    const volumeTrace = chart.data.length > 1 ? chart.data[1] : null;
+    const lastIndex = candles.x.length - 1;
+    const lastTime = lastIndex >= 0 ? candles.x[lastIndex] : -Infinity;
+
+    const newBars = bars.filter(bar => bar.t > lastTime);
+    const lastBarUpdate = bars.find(bar => bar.t === lastTime);
+
+    if (lastBarUpdate) {
+        candles.open[lastIndex] = lastBarUpdate.open;
+        candles.high[lastIndex] = lastBarUpdate.high;
+        candles.low[lastIndex] = lastBarUpdate.low;
+        candles.close[lastIndex] = lastBarUpdate.close;
+        if (volumeTrace && lastBarUpdate.volume !== undefined) {
+            volumeTrace.y[lastIndex] = lastBarUpdate.volume;
+        }
+    }
+
+    if (newBars.length > 0) {
+        Plotly.extendTraces(chart, {
+            x: [newBars.map(bar => bar.t)],
+            open: [newBars.map(bar => bar.open)],
+            high: [newBars.map(bar => bar.high)],
+            low: [newBars.map(bar => bar.low)],
+            close: [newBars.map(bar => bar.close)]
+        }, [0]);
+        if (volumeTrace) {
+            Plotly.extendTraces(chart, {
+                x: [newBars.map(bar => bar.t)],
+                y: [newBars.map(bar => bar.volume)]
+            }, [1]);
+        }
+    } else if (lastBarUpdate) {
+        Plotly.redraw(chart); // Only the last point changed
     }
 }
 
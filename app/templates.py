@@ -1,6 +1,15 @@
+from datetime import datetime
 from fastapi.templating import Jinja2Templates
 from pathlib import Path
 from config import settings
 
 templates_dir_path = Path(settings.TEMPLATES_DIR).resolve()
-templates = Jinja2Templates(directory=templates_dir_path) 
\ No newline at end of file
+templates = Jinja2Templates(directory=templates_dir_path)
+
+def format_date(value, fmt: str = "%Y-%m-%d") -> str:
+    """Jinja filter: formats a datetime, or the current time for "now" (e.g. {{ "now"|date("%Y") }})."""
+    if value == "now":
+        value = datetime.now()
+    return value.strftime(fmt)
+
+templates.env.filters["date"] = format_date
@@ -0,0 +1 @@
+# This file makes 'benchmarks' a Python package (run scripts with python -m benchmarks.<name>)
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""Event-loop lag benchmark for the CPU worker pool.
+
+Parses synthetic full-history Alpha Vantage payloads concurrently while a lag
+probe runs on the same loop, once per pool kind (inline parsing on the loop,
+thread pool, process pool). Each pool is started (process workers spawned)
+before timing begins. Run from the project root:
+
+    python -m benchmarks.bench_event_loop --payloads 16 --years 25
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import pandas as pd
+
+from app.services.executor import POOL_KINDS, LoopLagMonitor, WorkerPool
+from app.services.av_parser import parse_series
+from benchmarks.bench_indicators import TRADING_DAYS_PER_YEAR, synthetic_bars
+
+
+def synthetic_payload(n_bars: int) -> bytes:
+    """A TIME_SERIES_DAILY-shaped JSON body with n_bars daily bars."""
+    bars = synthetic_bars(1, n_bars)
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=n_bars).strftime('%Y-%m-%d')
+    series = {
+        date: {
+            "1. open": f"{bars['open'][0][i]:.4f}",
+            "2. high": f"{bars['high'][0][i]:.4f}",
+            "3. low": f"{bars['low'][0][i]:.4f}",
+            "4. close": f"{bars['close'][0][i]:.4f}",
+            "5. volume": str(int(bars['volume'][0][i])),
+        }
+        for i, date in enumerate(dates)
+    }
+    return json.dumps({"Meta Data": {}, "Time Series (Daily)": series}).encode()
+
+
+async def run_case(kind: str, size: int, body: bytes, n_payloads: int) -> tuple[float, dict]:
+    pool = WorkerPool(kind, size)
+    pool.start()
+    monitor = LoopLagMonitor(interval=0.01, window=100_000)
+    monitor.start()
+    await asyncio.sleep(0.05) # Let the probe take a baseline sample
+    start = time.perf_counter()
+    await asyncio.gather(*(pool.run(parse_series, body) for _ in range(n_payloads)))
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(0.05)
+    await monitor.close()
+    pool.close()
+    return elapsed, monitor.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--payloads", type=int, default=16)
+    parser.add_argument("--years", type=int, default=25)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    body = synthetic_payload(args.years * TRADING_DAYS_PER_YEAR)
+    print(f"{args.payloads} payloads of {len(body) / 1024 / 1024:.1f} MiB, {args.workers} workers")
+    for kind in POOL_KINDS[::-1]: # inline first, as the baseline
+        elapsed, lag = asyncio.run(run_case(kind, args.workers, body, args.payloads))
+        print(f"{kind:8s} {elapsed * 1000:8.1f} ms total   loop lag p99 {lag['p99_ms']:8.1f} ms   max {lag['max_ms']:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Throughput benchmark for the vectorized indicator engine.
+
+Generates synthetic daily OHLCV bars (random walk) for many symbols and times
+computing every registered indicator, both as one 2-D batch and symbol by
+symbol. Run from the project root:
+
+    python -m benchmarks.bench_indicators --symbols 500 --years 20
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.services.indicators import compute_indicators, indicator_frame
+
+TRADING_DAYS_PER_YEAR = 252
+ALL_INDICATORS = ["sma:50", "sma:200", "ema:20", "rsi:14", "macd", "bollinger", "atr", "vwap"]
+
+
+def synthetic_bars(n_symbols: int, n_bars: int, seed: int = 42) -> dict[str, np.ndarray]:
+    """Random-walk OHLCV arrays shaped (n_symbols, n_bars)."""
+    rng = np.random.default_rng(seed)
+    log_returns = rng.normal(0.0003, 0.02, size=(n_symbols, n_bars))
+    close = 100.0 * np.exp(np.cumsum(log_returns, axis=1))
+    open_ = close * np.exp(rng.normal(0, 0.005, size=close.shape))
+    spread = np.abs(rng.normal(0, 0.01, size=close.shape)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.integers(100_000, 10_000_000, size=close.shape).astype(np.float64)
+    return {"open": open_, "high": high, "low": low, "close": close, "volume": volume}
+
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    n_bars = args.years * TRADING_DAYS_PER_YEAR
+    bars = synthetic_bars(args.symbols, n_bars)
+    total_bars = args.symbols * n_bars
+    print(f"{args.symbols} symbols x {n_bars} daily bars ({total_bars:,} bars), indicators: {', '.join(ALL_INDICATORS)}")
+
+    batch = best_of(args.repeat, lambda: compute_indicators(bars, ALL_INDICATORS))
+    print(f"batch (2-D arrays):      {batch * 1000:8.1f} ms  {total_bars / batch / 1e6:8.2f} M bars/s")
+
+    frames = [
+        pd.DataFrame({column.capitalize(): bars[column][i] for column in bars})
+        for i in range(args.symbols)
+    ]
+    per_symbol = best_of(args.repeat, lambda: [indicator_frame(df, ALL_INDICATORS) for df in frames])
+    print(f"per symbol (DataFrames): {per_symbol * 1000:8.1f} ms  {total_bars / per_symbol / 1e6:8.2f} M bars/s")
+
+    # Baseline: the previous analyze_stock_data approach (pandas rolling, MA50/MA200 only)
+    def legacy():
+        for df in frames:
+            df['Close'].rolling(window=50).mean()
+            df['Close'].rolling(window=200).mean()
+
+    baseline = best_of(args.repeat, legacy)
+    print(f"legacy MA50/MA200 only:  {baseline * 1000:8.1f} ms  {total_bars / baseline / 1e6:8.2f} M bars/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Parse-time and peak-memory benchmark for Alpha Vantage payloads.
+
+Compares the legacy dict-of-dicts DataFrame path with the NumPy parsers in
+app.services.av_parser, for both the JSON and the CSV datatype, on a
+synthetic full-history TIME_SERIES_DAILY_ADJUSTED response. Run from the
+project root:
+
+    python -m benchmarks.bench_parser --years 20
+"""
+import argparse
+import json
+import tracemalloc
+
+import pandas as pd
+
+from app.services.av_parser import parse_csv, parse_json
+from benchmarks.bench_indicators import TRADING_DAYS_PER_YEAR, best_of, synthetic_bars
+
+FIELDS = ["open", "high", "low", "close", "adjusted_close", "volume", "dividend_amount", "split_coefficient"]
+
+
+def synthetic_rows(n_bars: int) -> list[tuple]:
+    """(date, *FIELDS) rows, newest first like Alpha Vantage sends them."""
+    bars = synthetic_bars(1, n_bars)
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=n_bars).strftime('%Y-%m-%d')
+    rows = []
+    for i, date in enumerate(dates):
+        close = bars['close'][0][i]
+        rows.append((date, f"{bars['open'][0][i]:.4f}", f"{bars['high'][0][i]:.4f}", f"{bars['low'][0][i]:.4f}",
+                     f"{close:.4f}", f"{close:.4f}", str(int(bars['volume'][0][i])), "0.0000", "1.0"))
+    return rows[::-1]
+
+
+def json_payload(rows: list[tuple]) -> bytes:
+    series = {row[0]: {f"{i + 1}. {field.replace('_', ' ')}": value for i, (field, value) in enumerate(zip(FIELDS, row[1:]))} for row in rows}
+    return json.dumps({"Meta Data": {}, "Time Series (Daily)": series}).encode()
+
+
+def csv_payload(rows: list[tuple]) -> bytes:
+    lines = [",".join(("timestamp",) + tuple(FIELDS))] + [",".join(row) for row in rows]
+    return ("\r\n".join(lines) + "\r\n").encode()
+
+
+def legacy_parse(body: bytes) -> pd.DataFrame:
+    # What _download_series did before: json -> from_dict -> to_datetime -> astype -> rename -> sort_index
+    data = json.loads(body)
+    df = pd.DataFrame.from_dict(data["Time Series (Daily)"], orient='index')
+    df.index = pd.to_datetime(df.index)
+    df = df.astype(float)
+    df.rename(columns=lambda x: x.split('. ')[-1].capitalize(), inplace=True)
+    return df.sort_index(ascending=True)
+
+
+def peak_memory(fn) -> int:
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.years * TRADING_DAYS_PER_YEAR)
+    json_body, csv_body = json_payload(rows), csv_payload(rows)
+    print(f"{len(rows)} bars: JSON {len(json_body) / 1024:.0f} KiB, CSV {len(csv_body) / 1024:.0f} KiB")
+
+    cases = [
+        ("legacy json", lambda: legacy_parse(json_body)),
+        ("numpy json", lambda: parse_json(json_body)),
+        ("numpy csv", lambda: parse_csv(csv_body)),
+    ]
+    expected = legacy_parse(json_body)
+    baseline_time = baseline_peak = None
+    for label, fn in cases:
+        pd.testing.assert_frame_equal(fn(), expected, check_freq=False, check_names=False, check_index_type=False)
+        elapsed = best_of(args.repeat, fn)
+        peak = peak_memory(fn)
+        baseline_time = baseline_time or elapsed
+        baseline_peak = baseline_peak or peak
+        print(f"{label:12s} {elapsed * 1000:8.2f} ms ({baseline_time / elapsed:5.1f}x)  peak {peak / 1024 / 1024:7.2f} MiB ({baseline_peak / peak:4.1f}x less)")
+
+
+if __name__ == "__main__":
+    main()
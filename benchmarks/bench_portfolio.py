@@ -0,0 +1,113 @@
+"""Latency benchmark for the portfolio analytics behind /api/portfolio/analyze.
+
+Builds synthetic daily series for many symbols (plus a benchmark), shaped like
+the cached daily-adjusted frames, then times aligning them onto one date
+index, computing the full statistics (returns, covariance/correlation, rolling
+volatility, VaR/CVaR, drawdown, beta) and serializing the response. The last
+case submits the work through a process pool the way the route does (price
+columns pickled to the child, JSON body pickled back), which is what a cache
+miss costs once the series are cached. Results are checked against pandas.
+Run from the project root:
+
+    python -m benchmarks.bench_portfolio --symbols 500 --years 10
+"""
+import argparse
+import asyncio
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.api.portfolio import _portfolio_body, _price_frames
+from app.services.executor import WorkerPool
+from app.services.portfolio import align_prices, analyze_portfolio, price_column
+from benchmarks.bench_indicators import TRADING_DAYS_PER_YEAR, best_of, synthetic_bars
+
+
+def synthetic_frames(n_symbols: int, n_bars: int, missing: float) -> list[pd.DataFrame]:
+    """Per-symbol daily-adjusted frames on business days, each missing a random `missing` share of days."""
+    bars = synthetic_bars(n_symbols, n_bars)
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=n_bars)
+    rng = np.random.default_rng(7)
+    frames = []
+    for i in range(n_symbols):
+        keep = rng.random(n_bars) >= missing if missing else slice(None)
+        close = bars["close"][i][keep]
+        frames.append(pd.DataFrame({
+            "Open": bars["open"][i][keep], "High": bars["high"][i][keep], "Low": bars["low"][i][keep], "Close": close,
+            "Adjusted close": close, "Volume": bars["volume"][i][keep],
+            "Dividend amount": np.zeros(len(close)), "Split coefficient": np.ones(len(close)),
+        }, index=dates[keep]))
+    return frames
+
+
+async def run_on_pool(repeat: int, symbols: list[str], frames: list[pd.DataFrame], weights: list[float],
+                      benchmark: pd.DataFrame, *rest) -> tuple[float, bytes]:
+    """Best-of timing of the route's pool call: price columns out, serialized body back."""
+    pool = WorkerPool("process", 1)
+    pool.start()
+    try:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            body = await pool.run(_portfolio_body, symbols, _price_frames(frames), weights, _price_frames([benchmark])[0], *rest)
+            timings.append(time.perf_counter() - start)
+        return min(timings), body
+    finally:
+        pool.close()
+
+
+def check_against_pandas(frames: list[pd.DataFrame], weights: np.ndarray, benchmark: pd.DataFrame):
+    dates, prices = align_prices(frames + [benchmark])
+    result = analyze_portfolio(dates, prices[:, :-1], weights, prices[:, -1])
+
+    closes = pd.concat([df[price_column(df)] for df in frames + [benchmark]], axis=1, sort=True).ffill().dropna()
+    returns = closes.pct_change().iloc[1:]
+    assets, bench = returns.iloc[:, :-1], returns.iloc[:, -1]
+    np.testing.assert_allclose(result["covariance"], assets.cov().to_numpy() * TRADING_DAYS_PER_YEAR, rtol=1e-8, atol=1e-12)
+    np.testing.assert_allclose(result["correlation"], assets.corr().to_numpy(), rtol=1e-8, atol=1e-12)
+    np.testing.assert_allclose(result["assets"]["beta"], (assets.apply(lambda col: col.cov(bench)) / bench.var()).to_numpy(), rtol=1e-8)
+    port = assets.to_numpy() @ (weights / weights.sum())
+    wealth = np.cumprod(1 + port)
+    assert np.isclose(result["portfolio"]["max_drawdown"], (wealth / np.maximum.accumulate(np.maximum(wealth, 1.0)) - 1).min())
+    rolling = pd.Series(port).rolling(21).std().to_numpy()[-1] * np.sqrt(TRADING_DAYS_PER_YEAR)
+    assert np.isclose(result["series"]["rolling_volatility"][-1], rolling)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--missing", type=float, default=0.01, help="Share of days each symbol has no bar (exercises alignment)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    n_bars = args.years * TRADING_DAYS_PER_YEAR
+    frames = synthetic_frames(args.symbols + 1, n_bars, args.missing)
+    frames, benchmark = frames[:-1], frames[-1]
+    weights = np.random.default_rng(3).random(args.symbols)
+    check_against_pandas(frames[:50], weights[:50], benchmark)
+    print(f"{args.symbols} symbols x {n_bars} bars ({args.years} years), {args.missing:.0%} missing days per symbol")
+
+    aligned = best_of(args.repeat, lambda: align_prices(frames + [benchmark]))
+    dates, prices = align_prices(frames + [benchmark])
+    analysis = best_of(args.repeat, lambda: analyze_portfolio(dates, prices[:, :-1], weights, prices[:, -1]))
+    symbols = [f"S{i}" for i in range(args.symbols)]
+    meta = {"benchmark": "BENCH", "period": "10y", "excluded": {}}
+    total = best_of(args.repeat, lambda: _portfolio_body(symbols, frames, list(weights), benchmark, 0.95, 21, False, meta))
+    body = _portfolio_body(symbols, frames, list(weights), benchmark, 0.95, 21, False, meta)
+    pooled, pooled_body = asyncio.run(run_on_pool(args.repeat, symbols, frames, list(weights), benchmark, 0.95, 21, False, meta))
+    assert pooled_body == body
+    full_args = len(pickle.dumps(frames, protocol=pickle.HIGHEST_PROTOCOL))
+    sent_args = len(pickle.dumps(_price_frames(frames), protocol=pickle.HIGHEST_PROTOCOL))
+
+    print(f"{'align series':<28} {aligned * 1000:>9.1f} ms")
+    print(f"{'analytics':<28} {analysis * 1000:>9.1f} ms")
+    print(f"{'align + analytics + JSON':<28} {total * 1000:>9.1f} ms ({len(body) / 1e6:.1f} MB body)")
+    print(f"{'same, through process pool':<28} {pooled * 1000:>9.1f} ms "
+          f"({sent_args / 1e6:.1f} MB pickled to the worker, {full_args / 1e6:.1f} MB for the full frames)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Throughput benchmark for the compiled sentiment engine.
+
+Scores synthetic headlines with the legacy per-keyword substring scan and with
+the lexicon engine (translate/split tokenizer, one set lookup per word). Run
+from the project root:
+
+    python -m benchmarks.bench_sentiment --headlines 100000
+"""
+import argparse
+import random
+
+from app.services.sentiment_engine import LEXICON, score_text, score_texts
+from benchmarks.bench_indicators import best_of
+
+LEGACY_POSITIVE = ["good", "great", "excellent", "positive", "up", "rise", "profit", "buy", "strong", "recommend", "beat", "love", "amazing", "fantastic"]
+LEGACY_NEGATIVE = ["bad", "poor", "terrible", "negative", "down", "fall", "loss", "sell", "weak", "avoid", "miss", "hate", "awful", "drop"]
+
+SUBJECTS = ["Apple", "Tesla", "Microsoft", "Nvidia", "Amazon", "The Fed", "Oil prices", "Bank stocks"]
+PHRASES = [
+    "surges after earnings beat", "shares fall on weak guidance", "analysts upgrade to strong buy",
+    "is not a good investment, says fund", "posts record high profits", "faces lawsuit over data practices",
+    "trades flat ahead of the report", "misses revenue estimates", "rally continues for a third day",
+    "never recovered from the crash", "announces new product line", "drops after downgrade",
+]
+
+
+def synthetic_headlines(n: int, seed: int = 42) -> list[str]:
+    rng = random.Random(seed)
+    return [f"{rng.choice(SUBJECTS)} {rng.choice(PHRASES)}. {rng.choice(SUBJECTS)} {rng.choice(PHRASES)}" for _ in range(n)]
+
+
+def legacy_score(text: str, positive=LEGACY_POSITIVE, negative=LEGACY_NEGATIVE) -> float:
+    # What analyze_text_sentiment did before: one substring scan per keyword
+    text_lower = text.lower()
+    score = 0.0
+    if any(word in text_lower for word in positive):
+        score += 0.5
+    if any(word in text_lower for word in negative):
+        score -= 0.5
+    return score
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--headlines", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    headlines = synthetic_headlines(args.headlines)
+    full_positive = [term for term, weight in LEXICON.items() if weight > 0]
+    full_negative = [term for term, weight in LEXICON.items() if weight < 0]
+    print(f"{len(headlines)} headlines, {len(LEXICON)} lexicon terms")
+    cases = [
+        ("legacy keyword scan", lambda: [legacy_score(h) for h in headlines]),
+        # The substring scan's cost grows with the lexicon; the engine's does not
+        ("legacy, full lexicon", lambda: [legacy_score(h, full_positive, full_negative) for h in headlines]),
+        ("engine, one per call", lambda: [score_text(h) for h in headlines]),
+        ("engine, one batch", lambda: score_texts(headlines)),
+    ]
+    baseline = None
+    for label, fn in cases:
+        elapsed = best_of(args.repeat, fn)
+        baseline = baseline or elapsed
+        print(f"{label:22s} {elapsed * 1000:9.1f} ms  {len(headlines) / elapsed:10.0f} texts/s ({baseline / elapsed:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
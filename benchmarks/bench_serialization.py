@@ -0,0 +1,53 @@
+"""Serialization benchmark for the chart-data response formats.
+
+Compares the legacy orient='split' payload with the column-oriented JSON,
+raw binary and (if pyarrow is installed) Arrow formats on a synthetic daily
+series. Run from the project root:
+
+    python -m benchmarks.bench_serialization --years 25
+"""
+import argparse
+import json
+
+import pandas as pd
+
+from app.api.responses import FORMAT_ARROW, FORMAT_BINARY, FORMAT_COLUMNS, frame_response, pa
+from benchmarks.bench_indicators import TRADING_DAYS_PER_YEAR, best_of, synthetic_bars
+
+
+def legacy_split(df: pd.DataFrame) -> bytes:
+    # What get_stock_json_data did before: strftime index, to_dict('split'), stdlib JSON via FastAPI
+    df = df.copy(deep=False)
+    df.index = df.index.strftime('%Y-%m-%d')
+    return json.dumps(df.to_dict(orient='split')).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=25)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    n_bars = args.years * TRADING_DAYS_PER_YEAR
+    bars = synthetic_bars(1, n_bars)
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=n_bars)
+    df = pd.DataFrame({column.capitalize(): bars[column][0] for column in bars}, index=index)
+    print(f"{n_bars} daily bars x {len(df.columns)} columns")
+
+    cases = [("split (legacy)", lambda: legacy_split(df))]
+    for fmt in (FORMAT_COLUMNS, FORMAT_BINARY) + ((FORMAT_ARROW,) if pa is not None else ()):
+        for float32 in (False, True):
+            label = f"{fmt}{' float32' if float32 else ''}"
+            cases.append((label, lambda fmt=fmt, float32=float32: frame_response(df, fmt, float32).body))
+
+    baseline_time = baseline_size = None
+    for label, fn in cases:
+        elapsed = best_of(args.repeat, fn)
+        size = len(fn())
+        baseline_time = baseline_time or elapsed
+        baseline_size = baseline_size or size
+        print(f"{label:18s} {elapsed * 1000:8.2f} ms ({baseline_time / elapsed:5.1f}x)  {size / 1024:9.1f} KiB ({baseline_size / size:4.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Local stand-in for the Alpha Vantage and NewsAPI endpoints.
+
+Serves synthetic (or recorded) TIME_SERIES_DAILY / TIME_SERIES_DAILY_ADJUSTED
+payloads in JSON or CSV, and NewsAPI /v2/everything results, with
+configurable latency and rate limits, so the app can be load tested without
+spending real API quota. Run from the project root:
+
+    python -m benchmarks.fake_provider --port 9100 --latency 80 --rate 600
+
+then start the app with
+ALPHA_VANTAGE_BASE_URL=http://127.0.0.1:9100/query and
+NEWS_API_BASE_URL=http://127.0.0.1:9100/v2/everything.
+
+Recorded payloads: --recordings DIR serves DIR/<SYMBOL>.json or
+DIR/<SYMBOL>.csv (as saved from the real API) instead of synthetic data.
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+from aiohttp import web
+
+from benchmarks.bench_indicators import TRADING_DAYS_PER_YEAR, synthetic_bars
+from benchmarks.bench_sentiment import synthetic_headlines
+
+FULL_YEARS = 20
+COMPACT_BARS = 100
+ADJUSTED_FIELDS = ["open", "high", "low", "close", "adjusted_close", "volume", "dividend_amount", "split_coefficient"]
+DAILY_FIELDS = ["open", "high", "low", "close", "volume"]
+NEWS_MAX_RESULTS = 1000 # Articles a query matches at most
+
+
+class SlidingWindowLimit:
+    """At most `limit` calls per `window` seconds (None: unlimited)."""
+
+    def __init__(self, limit: int | None, window: float = 60.0):
+        self.limit = limit
+        self.window = window
+        self._calls: deque = deque()
+
+    def allow(self) -> bool:
+        if self.limit is None:
+            return True
+        now = time.monotonic()
+        while self._calls and now - self._calls[0] >= self.window:
+            self._calls.popleft()
+        if len(self._calls) >= self.limit:
+            return False
+        self._calls.append(now)
+        return True
+
+
+def _seed(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=4).digest(), "little")
+
+
+class FakeProvider:
+    """aiohttp app serving both providers; counts calls per endpoint."""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, rate_per_minute: int | None = None,
+                 recordings: str | None = None, full_years: int = FULL_YEARS):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.recordings = recordings
+        self.full_years = full_years
+        self.limits = {"alpha_vantage": SlidingWindowLimit(rate_per_minute), "news_api": SlidingWindowLimit(rate_per_minute)}
+        self.calls = {"alpha_vantage": 0, "news_api": 0, "rate_limited": 0}
+        self._series: dict[str, list[tuple]] = {}
+        self._runner: web.AppRunner | None = None
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/query", self.alpha_vantage)
+        app.router.add_get("/v2/everything", self.news)
+        app.router.add_get("/stats", self.stats)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 9100):
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _delay(self):
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+    def _rows(self, symbol: str) -> list[tuple]:
+        """Synthetic adjusted daily rows for a symbol, newest first (deterministic per symbol)."""
+        rows = self._series.get(symbol)
+        if rows is None:
+            n_bars = self.full_years * TRADING_DAYS_PER_YEAR
+            bars = synthetic_bars(1, n_bars, seed=_seed(symbol))
+            dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=n_bars).strftime('%Y-%m-%d')
+            rows = []
+            for i, date in enumerate(dates):
+                close = f"{bars['close'][0][i]:.4f}"
+                rows.append((date, f"{bars['open'][0][i]:.4f}", f"{bars['high'][0][i]:.4f}", f"{bars['low'][0][i]:.4f}",
+                             close, close, str(int(bars['volume'][0][i])), "0.0000", "1.0"))
+            rows = self._series[symbol] = rows[::-1]
+        return rows
+
+    def _recorded(self, symbol: str, datatype: str) -> web.Response | None:
+        if not self.recordings:
+            return None
+        path = os.path.join(self.recordings, f"{symbol}.{datatype}")
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return web.Response(body=f.read(), content_type="text/csv" if datatype == "csv" else "application/json")
+
+    async def alpha_vantage(self, request: web.Request) -> web.Response:
+        await self._delay()
+        if not self.limits["alpha_vantage"].allow():
+            # Alpha Vantage answers 200 with a note instead of a 429
+            self.calls["rate_limited"] += 1
+            return web.json_response({"Information": "Thank you for using Alpha Vantage! Our standard API rate limit has been reached."})
+        self.calls["alpha_vantage"] += 1
+
+        query = request.query
+        symbol = query.get("symbol", "").upper()
+        if not symbol:
+            return web.json_response({"Error Message": "Invalid API call. Please retry or visit the documentation."})
+        datatype = query.get("datatype", "json")
+        recorded = self._recorded(symbol, datatype)
+        if recorded is not None:
+            return recorded
+
+        adjusted = query.get("function") == "TIME_SERIES_DAILY_ADJUSTED"
+        rows = self._rows(symbol)
+        if query.get("outputsize") != "full":
+            rows = rows[:COMPACT_BARS]
+        fields = ADJUSTED_FIELDS if adjusted else DAILY_FIELDS
+        columns = range(1, 9) if adjusted else (1, 2, 3, 4, 6)
+
+        if datatype == "csv":
+            lines = [",".join(["timestamp"] + fields)] + [",".join([row[0]] + [row[i] for i in columns]) for row in rows]
+            return web.Response(text="\r\n".join(lines) + "\r\n", content_type="text/csv")
+        labels = [f"{n}. {field.replace('_', ' ')}" for n, field in enumerate(fields, start=1)]
+        series = {row[0]: {label: row[i] for label, i in zip(labels, columns)} for row in rows}
+        return web.json_response({
+            "Meta Data": {"2. Symbol": symbol},
+            "Time Series (Daily)": series,
+        })
+
+    async def news(self, request: web.Request) -> web.Response:
+        await self._delay()
+        if not self.limits["news_api"].allow():
+            self.calls["rate_limited"] += 1
+            return web.json_response({"status": "error", "code": "rateLimited", "message": "You have made too many requests recently."}, status=429)
+        self.calls["news_api"] += 1
+
+        query = request.query.get("q", "")
+        page_size = int(request.query.get("pageSize", 20))
+        page = int(request.query.get("page", 1))
+        since = request.query.get("from")
+        now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+        # A new article every 30 minutes, newest first, back to `from` (at most NEWS_MAX_RESULTS)
+        latest = now - timedelta(minutes=now.minute % 30)
+        total = NEWS_MAX_RESULTS
+        if since:
+            oldest = datetime.fromisoformat(since.replace("Z", "+00:00"))
+            oldest = oldest if oldest.tzinfo else oldest.replace(tzinfo=timezone.utc)
+            total = max(0, min(total, int((latest - oldest) / timedelta(minutes=30)) + 1))
+        first = (page - 1) * page_size
+        headlines = synthetic_headlines(first + page_size, seed=_seed(query) + int(latest.timestamp()))
+        articles = []
+        for i in range(first, min(first + page_size, total)):
+            published_at = (latest - timedelta(minutes=30 * i)).strftime('%Y-%m-%dT%H:%M:%SZ')
+            articles.append({
+                "source": {"id": None, "name": "Fake Wire"},
+                "title": f"{query}: {headlines[i]}",
+                "description": headlines[i],
+                "url": f"https://news.example/{query}/{published_at}",
+                "publishedAt": published_at,
+            })
+        return web.json_response({"status": "ok", "totalResults": total, "articles": articles})
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.calls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.0, help="Added latency per call in ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- latency jitter in ms")
+    parser.add_argument("--rate", type=int, default=None, help="Calls allowed per minute per provider (default: unlimited)")
+    parser.add_argument("--recordings", default=None, help="Directory of recorded <SYMBOL>.json / <SYMBOL>.csv payloads")
+    parser.add_argument("--years", type=int, default=FULL_YEARS, help="Years of synthetic full history")
+    args = parser.parse_args()
+
+    provider = FakeProvider(args.latency, args.jitter, args.rate, args.recordings, args.years)
+    print(f"Fake provider on http://{args.host}:{args.port} (latency {args.latency} ms, rate {args.rate or 'unlimited'}/min)")
+    web.run_app(provider.app(), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
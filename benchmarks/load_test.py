@@ -0,0 +1,322 @@
+"""Offline load test: the app under uvicorn against the local fake provider.
+
+Starts benchmarks.fake_provider in-process, launches the app in a uvicorn
+subprocess pointed at it (temporary series/news stores, upstream rate limits
+lifted unless --rate is given), then drives a weighted mix of chart data,
+HTML page, news sentiment and rollup requests from --concurrency clients for
+--duration seconds. Reports p50/p95/p99 latency, RPS and errors per endpoint
+plus server RSS, and saves everything as JSON under benchmarks/results/ so
+runs can be compared across commits. Run from the project root:
+
+    python -m benchmarks.load_test --duration 30 --concurrency 32 --latency 80
+    python -m benchmarks.load_test --compare benchmarks/results/<earlier>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import aiohttp
+import numpy as np
+
+from benchmarks.fake_provider import FULL_YEARS, FakeProvider
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> (weight, path template); {symbol} is filled per request
+ENDPOINTS = {
+    "stock_data": (5, "/api/stocks/stock/{symbol}/data?period=1y"),
+    "stock_page": (2, "/api/stocks/stock/{symbol}"),
+    "news_sentiment": (2, "/api/sentiment/sentiment/news?query={symbol}"),
+    "sentiment_rollups": (1, "/api/sentiment/sentiment/rollups?query={symbol}&bucket=hour&days=2"),
+}
+DEFAULT_SYMBOLS = ["AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "TSLA", "META", "JPM"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def git_revision() -> str | None:
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=PROJECT_ROOT, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{sha}-dirty" if dirty else sha
+
+
+def rss_mb(pid: int) -> float | None:
+    """Resident set size of a process and its children (uvicorn workers) in MiB; Linux only."""
+    total_kb = 0
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            pids += [int(child) for child in f.read().split()]
+    except OSError:
+        pass
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            if p == pid:
+                return None
+    return round(total_kb / 1024, 1)
+
+
+def summarize(latencies: list[float], statuses: dict[int, int], errors: int, elapsed: float) -> dict:
+    """Latency percentiles (ms), throughput and outcome counts for one endpoint (or all)."""
+    requests = sum(statuses.values()) + errors
+    summary = {
+        "requests": requests,
+        "rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "errors": errors + sum(count for status, count in statuses.items() if status >= 400),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    }
+    if latencies:
+        ms = np.asarray(latencies) * 1000
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        summary.update({
+            "mean_ms": round(float(ms.mean()), 2),
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+            "max_ms": round(float(ms.max()), 2),
+        })
+    return summary
+
+
+class LoadGenerator:
+    """Closed-loop clients: each sends its next request as soon as the previous one completes."""
+
+    def __init__(self, base_url: str, endpoints: dict, symbols: list[str], concurrency: int, seed: int = 42):
+        self.base_url = base_url
+        self.names = list(endpoints)
+        self.paths = [endpoints[name][1] for name in self.names]
+        self.weights = [endpoints[name][0] for name in self.names]
+        self.symbols = symbols
+        self.concurrency = concurrency
+        self.random = random.Random(seed)
+        self._reset()
+
+    def _reset(self):
+        self.latencies = {name: [] for name in self.names}
+        self.statuses = {name: {} for name in self.names}
+        self.errors = {name: 0 for name in self.names}
+
+    async def _client(self, session: aiohttp.ClientSession, deadline: float):
+        while time.perf_counter() < deadline:
+            i = self.random.choices(range(len(self.names)), self.weights)[0]
+            name = self.names[i]
+            url = self.base_url + self.paths[i].format(symbol=self.random.choice(self.symbols))
+            start = time.perf_counter()
+            try:
+                async with session.get(url) as response:
+                    await response.read()
+                    status = response.status
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                self.errors[name] += 1
+                continue
+            self.latencies[name].append(time.perf_counter() - start)
+            self.statuses[name][status] = self.statuses[name].get(status, 0) + 1
+
+    async def run(self, duration: float, warmup: float = 0.0) -> tuple[dict, float]:
+        """Runs the mix for `duration` seconds after `warmup`; returns per-endpoint results and elapsed time."""
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        headers = {"Accept-Encoding": "gzip, br"}
+        async with aiohttp.ClientSession(connector=connector, headers=headers, timeout=aiohttp.ClientTimeout(total=60)) as session:
+            if warmup > 0:
+                deadline = time.perf_counter() + warmup
+                await asyncio.gather(*(self._client(session, deadline) for _ in range(self.concurrency)))
+                self._reset()
+            start = time.perf_counter()
+            deadline = start + duration
+            await asyncio.gather(*(self._client(session, deadline) for _ in range(self.concurrency)))
+            elapsed = time.perf_counter() - start
+
+        results = {name: summarize(self.latencies[name], self.statuses[name], self.errors[name], elapsed) for name in self.names}
+        all_statuses: dict[int, int] = {}
+        for statuses in self.statuses.values():
+            for status, count in statuses.items():
+                all_statuses[status] = all_statuses.get(status, 0) + count
+        all_latencies = [latency for name in self.names for latency in self.latencies[name]]
+        results["total"] = summarize(all_latencies, all_statuses, sum(self.errors.values()), elapsed)
+        return results, elapsed
+
+
+def start_app(port: int, provider_url: str, workdir: str, args) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "ALPHA_VANTAGE_BASE_URL": f"{provider_url}/query",
+        "NEWS_API_BASE_URL": f"{provider_url}/v2/everything",
+        "ALPHA_VANTAGE_API_KEY": env.get("ALPHA_VANTAGE_API_KEY") or "load-test",
+        "NEWS_API_KEY": env.get("NEWS_API_KEY") or "load-test",
+        # Our own limiter would otherwise dominate the numbers; the fake provider enforces --rate
+        "DEFAULT_RATE_LIMIT": "1000000/minute",
+        "ALPHA_VANTAGE_RATE_LIMIT": "1000000/minute",
+        "NEWS_API_RATE_LIMIT": "1000000/minute",
+        "SERIES_STORE_DIR": os.path.join(workdir, "series"),
+        "NEWS_STORE_PATH": os.path.join(workdir, "news.sqlite3"),
+        "CACHE_DIR": os.path.join(workdir, "cache"),
+        "WORKERS": str(args.workers), # Enables shared state between workers unless SHARED_STATE_ENABLED says otherwise
+        "SHARED_STATE_PATH": os.path.join(workdir, "shared_state.sqlite3"),
+        "LOG_LEVEL": "WARNING",
+    })
+    command = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+               "--log-level", "warning", "--no-access-log"]
+    if args.workers > 1:
+        command += ["--workers", str(args.workers)]
+    return subprocess.Popen(command, cwd=PROJECT_ROOT, env=env)
+
+
+async def wait_until_healthy(base_url: str, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"App exited during startup with code {process.returncode}")
+            try:
+                async with session.get(f"{base_url}/api/health") as response:
+                    if response.status < 500:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"App did not become healthy within {timeout:.0f}s")
+
+
+async def sample_rss(pid: int, samples: list, interval: float = 0.5):
+    while True:
+        value = rss_mb(pid)
+        if value is not None:
+            samples.append(value)
+        await asyncio.sleep(interval)
+
+
+async def run(args) -> dict:
+    provider = FakeProvider(args.latency, args.jitter, args.rate, args.recordings, args.years)
+    provider_port, app_port = free_port(), free_port()
+    await provider.start(port=provider_port)
+    base_url = f"http://127.0.0.1:{app_port}"
+    endpoints = {name: ENDPOINTS[name] for name in args.endpoints}
+
+    with tempfile.TemporaryDirectory(prefix="load-test-") as workdir:
+        process = start_app(app_port, f"http://127.0.0.1:{provider_port}", workdir, args)
+        rss_samples: list[float] = []
+        sampler = None
+        try:
+            await wait_until_healthy(base_url, process)
+            rss_start = rss_mb(process.pid)
+            sampler = asyncio.create_task(sample_rss(process.pid, rss_samples))
+            generator = LoadGenerator(base_url, endpoints, args.symbols, args.concurrency)
+            results, elapsed = await generator.run(args.duration, args.warmup)
+            rss_end = rss_mb(process.pid)
+        finally:
+            if sampler is not None:
+                sampler.cancel()
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            await provider.close()
+
+    return {
+        "timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        "git": git_revision(),
+        "python": sys.version.split()[0],
+        "config": {
+            "duration": args.duration, "warmup": args.warmup, "concurrency": args.concurrency, "workers": args.workers,
+            "symbols": args.symbols, "endpoints": {name: endpoints[name][1] for name in endpoints},
+            "weights": {name: endpoints[name][0] for name in endpoints},
+            "provider": {"latency_ms": args.latency, "jitter_ms": args.jitter, "rate_per_minute": args.rate,
+                         "recordings": args.recordings, "years": args.years},
+        },
+        "elapsed_s": round(elapsed, 2),
+        "endpoints": results,
+        "server": {
+            "rss_start_mb": rss_start,
+            "rss_peak_mb": max(rss_samples) if rss_samples else None,
+            "rss_end_mb": rss_end,
+        },
+        "upstream_calls": dict(provider.calls),
+    }
+
+
+def print_report(report: dict, baseline: dict | None = None):
+    print(f"{report['git'] or 'unknown revision'}: {report['config']['concurrency']} clients, "
+          f"{report['elapsed_s']}s, provider latency {report['config']['provider']['latency_ms']} ms")
+    header = f"{'endpoint':<18} {'requests':>9} {'rps':>8} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, result in report["endpoints"].items():
+        print(f"{name:<18} {result['requests']:>9} {result['rps']:>8} {result['errors']:>7} "
+              f"{result.get('p50_ms', '-'):>9} {result.get('p95_ms', '-'):>9} {result.get('p99_ms', '-'):>9}")
+        if baseline and name in baseline.get("endpoints", {}):
+            before = baseline["endpoints"][name]
+            deltas = []
+            for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+                if before.get(key) and result.get(key) is not None:
+                    deltas.append(f"{key} {(result[key] - before[key]) / before[key] * 100:+.1f}%")
+            if deltas:
+                print(f"{'':<18} vs {baseline.get('git') or 'baseline'}: {', '.join(deltas)}")
+    server = report["server"]
+    print(f"Server RSS: start {server['rss_start_mb']} MiB, peak {server['rss_peak_mb']} MiB, end {server['rss_end_mb']} MiB")
+    print(f"Upstream calls: {report['upstream_calls']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds first (fills caches and stores)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--symbols", type=lambda value: value.upper().split(","), default=DEFAULT_SYMBOLS, help="Comma-separated symbols")
+    parser.add_argument("--endpoints", type=lambda value: value.split(","), default=list(ENDPOINTS),
+                        help=f"Comma-separated subset of: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--latency", type=float, default=50.0, help="Fake provider latency per call in ms")
+    parser.add_argument("--jitter", type=float, default=10.0, help="Fake provider latency jitter in ms")
+    parser.add_argument("--rate", type=int, default=None, help="Fake provider calls per minute per provider (default: unlimited)")
+    parser.add_argument("--recordings", default=None, help="Directory of recorded <SYMBOL>.json / <SYMBOL>.csv payloads")
+    parser.add_argument("--years", type=int, default=FULL_YEARS, help="Years of synthetic full history")
+    parser.add_argument("--output", default=None, help="Results file (default: benchmarks/results/<timestamp>-<revision>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.endpoints if name not in ENDPOINTS]
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(unknown)}")
+
+    report = asyncio.run(run(args))
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = report["timestamp"].replace(":", "").replace("-", "")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{report['git'] or 'unknown'}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,10 +10,82 @@ class Settings:
     # API Keys - store these in your .env file
     ALPHA_VANTAGE_API_KEY: str = os.getenv("ALPHA_VANTAGE_API_KEY")
     NEWS_API_KEY: str = os.getenv("NEWS_API_KEY") # Example for news fetching
+    ALPHA_VANTAGE_DATATYPE: str = os.getenv("ALPHA_VANTAGE_DATATYPE", "csv") # csv or json
+    # Upstream endpoints; point these at benchmarks/fake_provider.py for offline load tests
+    ALPHA_VANTAGE_BASE_URL: str = os.getenv("ALPHA_VANTAGE_BASE_URL", "https://www.alphavantage.co/query")
+    NEWS_API_BASE_URL: str = os.getenv("NEWS_API_BASE_URL", "https://newsapi.org/v2/everything")
     # TWITTER_API_KEY: str = os.getenv("TWITTER_API_KEY") # Example for Twitter
 
     # Rate Limiting (example, implement as needed)
-    DEFAULT_RATE_LIMIT: str = "100/hour"
+    DEFAULT_RATE_LIMIT: str = os.getenv("DEFAULT_RATE_LIMIT", "100/hour")
+    ALPHA_VANTAGE_RATE_LIMIT: str = os.getenv("ALPHA_VANTAGE_RATE_LIMIT", DEFAULT_RATE_LIMIT) # Upstream calls allowed per window
+    NEWS_API_RATE_LIMIT: str = os.getenv("NEWS_API_RATE_LIMIT", DEFAULT_RATE_LIMIT)
+    RATE_LIMIT_MAX_WAIT: float = float(os.getenv("RATE_LIMIT_MAX_WAIT", "10")) # Seconds a call may queue before being rejected
+
+    # Shared HTTP client (one pooled aiohttp session for all upstream calls)
+    HTTP_POOL_LIMIT: int = int(os.getenv("HTTP_POOL_LIMIT", "100")) # Total open connections
+    HTTP_POOL_LIMIT_PER_HOST: int = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "10")) # Per upstream host
+    HTTP_KEEPALIVE_TIMEOUT: float = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30")) # Seconds an idle connection is kept
+    HTTP_DNS_CACHE_TTL: int = int(os.getenv("HTTP_DNS_CACHE_TTL", "300")) # Seconds
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+    HTTP_TOTAL_TIMEOUT: float = float(os.getenv("HTTP_TOTAL_TIMEOUT", "30"))
+    HTTP_MAX_RETRIES: int = int(os.getenv("HTTP_MAX_RETRIES", "2")) # Retries after the first attempt
+    HTTP_RETRY_BACKOFF: float = float(os.getenv("HTTP_RETRY_BACKOFF", "0.5")) # Base delay, doubled per retry
+
+    # Stock series cache (in-process LRU plus optional on-disk tier)
+    CACHE_MAX_BYTES: int = int(os.getenv("CACHE_MAX_BYTES", str(256 * 1024 * 1024))) # Memory bound for cached DataFrames
+    CACHE_TTL_MARKET_OPEN: int = int(os.getenv("CACHE_TTL_MARKET_OPEN", "300")) # Seconds while the session is open
+    CACHE_POST_CLOSE_WINDOW: int = int(os.getenv("CACHE_POST_CLOSE_WINDOW", "3600")) # Keep short TTLs until the daily bar settles
+    CACHE_STALE_SECONDS: int = int(os.getenv("CACHE_STALE_SECONDS", "86400")) # How long expired entries may still be served
+    CACHE_DISK_ENABLED: bool = os.getenv("CACHE_DISK_ENABLED", "False").lower() == "true"
+    CACHE_DIR: str = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache"))
+    CACHE_DISK_MAX_BYTES: int = int(os.getenv("CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024))) # Least recently used files are deleted beyond this
+
+    # Incremental daily-bar updates: settled bars are persisted per symbol and
+    # only the compact window is downloaded to extend them
+    INCREMENTAL_UPDATES: bool = os.getenv("INCREMENTAL_UPDATES", "True").lower() == "true"
+    SERIES_STORE_DIR: str = os.getenv("SERIES_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "series"))
+
+    # Multi-symbol batch endpoint
+    BATCH_MAX_SYMBOLS: int = int(os.getenv("BATCH_MAX_SYMBOLS", "100"))
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "8")) # Symbols fetched at the same time
+
+    # Portfolio analytics
+    PORTFOLIO_MAX_SYMBOLS: int = int(os.getenv("PORTFOLIO_MAX_SYMBOLS", "500"))
+    PORTFOLIO_BENCHMARK: str = os.getenv("PORTFOLIO_BENCHMARK", "SPY") # Default benchmark for beta
+
+    # HTTP response caching and compression
+    RESPONSE_CACHE_MAX_BYTES: int = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))) # Rendered pages and chart data
+    HTTP_STALE_WHILE_REVALIDATE: int = int(os.getenv("HTTP_STALE_WHILE_REVALIDATE", "60")) # Seconds browsers may reuse an expired response
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "500")) # Smaller bodies are sent as-is
+
+    # Worker pool for CPU-bound work (payload parsing, indicators, sentiment scoring)
+    WORKER_POOL_KIND: str = os.getenv("WORKER_POOL_KIND", "process") # process, thread (the GIL still stalls the loop), or inline (on the event loop)
+    # Per uvicorn worker: by default the cores are split between WORKERS pools instead of each taking up to 4
+    WORKER_POOL_SIZE: int = int(os.getenv("WORKER_POOL_SIZE", str(max(1, min(4, (os.cpu_count() or 1) // max(1, int(os.getenv("WORKERS", "1"))))))))
+    LOOP_LAG_INTERVAL: float = float(os.getenv("LOOP_LAG_INTERVAL", "0.25")) # Seconds between event-loop lag probes
+    HEALTH_MAX_LOOP_LAG_MS: float = float(os.getenv("HEALTH_MAX_LOOP_LAG_MS", "500")) # p99 lag above this reports "degraded"
+
+    # Sentiment
+    SENTIMENT_BATCH_MAX: int = int(os.getenv("SENTIMENT_BATCH_MAX", "10000")) # Texts per POST /sentiment/batch
+    NEWS_STORE_PATH: str = os.getenv("NEWS_STORE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "news.sqlite3"))
+    NEWS_REFRESH_INTERVAL: int = int(os.getenv("NEWS_REFRESH_INTERVAL", "900")) # Seconds before a query asks NewsAPI for newer articles
+    NEWS_PAGE_SIZE: int = int(os.getenv("NEWS_PAGE_SIZE", "50")) # Articles per NewsAPI page (at most 100)
+    NEWS_MAX_PAGES: int = int(os.getenv("NEWS_MAX_PAGES", "5")) # Pages one refresh may request to catch up with the stored articles
+
+    # Real-time quote streaming (WebSocket / SSE)
+    STREAM_POLL_INTERVAL: float = float(os.getenv("STREAM_POLL_INTERVAL", "60")) # Seconds between upstream polls per symbol
+    STREAM_QUEUE_SIZE: int = int(os.getenv("STREAM_QUEUE_SIZE", "100")) # Pending messages before a slow client is dropped
+    STREAM_MAX_SYMBOLS: int = int(os.getenv("STREAM_MAX_SYMBOLS", "20")) # Per connection
+    STREAM_HEARTBEAT: float = float(os.getenv("STREAM_HEARTBEAT", "15")) # Seconds between keep-alive messages
+
+    # Production launch (run.py) and state shared between worker processes
+    HOST: str = os.getenv("HOST", "0.0.0.0")
+    PORT: int = int(os.getenv("PORT", "8000"))
+    WORKERS: int = int(os.getenv("WORKERS", "1")) # uvicorn worker processes, each with its own WORKER_POOL_SIZE pool; DEBUG reload needs 1
+    SHARED_STATE_ENABLED: bool = os.getenv("SHARED_STATE_ENABLED", str(WORKERS > 1)).lower() == "true" # Rate budgets, series cache and fetch leases in SQLite
+    SHARED_STATE_PATH: str = os.getenv("SHARED_STATE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "shared_state.sqlite3"))
+    SHARED_LEASE_TTL: float = float(os.getenv("SHARED_LEASE_TTL", "120")) # Seconds before a dead worker's fetch lease can be taken over
 
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
@@ -1,3 +1,4 @@
+import os
 import uvicorn
 from config import settings
 import logging
@@ -18,11 +19,27 @@ if __name__ == "__main__":
     logger.info(f"Starting Uvicorn server for {settings.PROJECT_NAME}")
     logger.info(f"Debug mode: {settings.DEBUG}")
     logger.info(f"Log file path: {settings.LOG_FILE_PATH}")
-    
+
+    # Production: several worker processes, one per core; they share upstream
+    # rate budgets and cached series through settings.SHARED_STATE_PATH
+    workers = max(1, settings.WORKERS)
+    if workers > 1:
+        if settings.DEBUG:
+            logger.warning("Auto-reload is not available with several workers; running without it")
+        if not settings.SHARED_STATE_ENABLED:
+            logger.warning("Shared state is disabled: each worker will keep its own cache and rate-limit budget")
+        if settings.WORKER_POOL_KIND == "process" and workers * settings.WORKER_POOL_SIZE > (os.cpu_count() or 1):
+            logger.warning(
+                f"{workers} workers x {settings.WORKER_POOL_SIZE} pool processes exceeds the {os.cpu_count()} CPUs; "
+                "lower WORKER_POOL_SIZE (or leave it unset to split the CPUs between workers)"
+            )
+        logger.info(f"Starting {workers} workers")
+
     uvicorn.run(
         "app.main:app", 
-        host="0.0.0.0", 
-        port=8000, 
-        reload=settings.DEBUG, # Reload only in debug mode
+        host=settings.HOST, 
+        port=settings.PORT, 
+        reload=settings.DEBUG and workers == 1, # Reload only in debug mode
+        workers=workers,
         log_level=settings.LOG_LEVEL.lower()
     ) 
\ No newline at end of file